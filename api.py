@@ -1,20 +1,40 @@
-import csv
-import datetime
+import base64
+import binascii
+import hashlib
+import json
+import math
+from datetime import date
 from functools import wraps
 
 import jwt
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, make_response, request
 from flask_cors import CORS
 
+from modules.agregats import charger_agregats
 from modules.auth import (charger_utilisateurs, creer_admin_initial,
-                          creer_compte, verifier_connexion)
-from modules.commandes import (annuler_commande, charger_commandes,
-                               charger_lignes_commandes, charger_commande_complete,
-                               creer_commande, valider_commande)
-from modules.produits import (ajouter_produit, charger_produits,
-                              modifier_produit, supprimer_produit,
-                              trouver_produit)
-from modules.stats import calculer_statistiques, top_produits, get_evolution_ventes_json, get_revenus_par_produit_json
+                          creer_compte, parcourir_utilisateurs,
+                          verifier_connexion)
+from modules.commandes import (COLONNES_COMMANDES,
+                               ajouter_lignes_aux_commandes, annuler_commande,
+                               charger_commandes, creer_commande,
+                               parcourir_commandes, traiter_commandes,
+                               valider_commande)
+from modules.export import flux_csv, normaliser_depuis
+from modules.hachage import HachageSurcharge
+from modules.jetons import (creer_jeton, revoquer_jeton,
+                            statistiques_cache_jetons, verifier_jeton)
+from modules.limiteur import LimiteurDebit
+from modules.produits import (COLONNES_PRODUITS, ajouter_produit,
+                              charger_produits, compter_produits,
+                              modifier_produit, page_produits, produits_par_ids,
+                              parcourir_produits, rechercher_produits,
+                              statistiques_cache_produits,
+                              supprimer_produit, trouver_produit)
+from modules.rendu_graphiques import (FORMATS_IMAGES, GRAPHIQUES,
+                                      image_graphique)
+from modules.stats import (GRANULARITES, calculer_statistiques, get_evolution_ventes_json,
+                           get_revenus_par_produit_json, top_produits)
+from modules.version import version_donnees
 
 app = Flask(__name__)
 CORS(app)
@@ -26,61 +46,125 @@ SECRET_KEY = "votre_cle_secrete_tres_longue_et_complexe"
 # ==================== MIDDLEWARE AUTH ====================
 
 
-def token_requis(f):
-    """Décorateur pour protéger les routes."""
+def _extraire_jeton():
+    """Jeton du header Authorization ("Bearer " facultatif), ou None."""
+    token = request.headers.get("Authorization")
+    if token and token.startswith("Bearer "):
+        token = token[7:]
+    return token or None
+
+
+def _authentification_requise(role=None):
+    """
+    Middleware commun aux routes protégées : vérifie le jeton (via le cache
+    de modules.jetons), renseigne request.utilisateur / request.role, et
+    contrôle le rôle si `role` est fourni.
+    """
+    def decorateur(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            token = _extraire_jeton()
+            if not token:
+                return jsonify({"erreur": "Token manquant"}), 401
+
+            try:
+                data = verifier_jeton(token, SECRET_KEY)
+            except jwt.ExpiredSignatureError:
+                return jsonify({"erreur": "Token expiré"}), 401
+            except jwt.InvalidTokenError:
+                return jsonify({"erreur": "Token invalide"}), 401
 
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = request.headers.get("Authorization")
+            request.utilisateur = data["username"]
+            request.role = data.get("role", "user")
 
-        if not token:
-            return jsonify({"erreur": "Token manquant"}), 401
+            if role and request.role != role:
+                return jsonify({"erreur": "Accès refusé. Droits administrateur requis."}), 403
 
-        try:
-            # Enlever "Bearer " si présent
-            if token.startswith("Bearer "):
-                token = token[7:]
+            return f(*args, **kwargs)
 
-            data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            request.utilisateur = data["username"]
-            request.role = data.get("role", "user")
-        except jwt.ExpiredSignatureError:
-            return jsonify({"erreur": "Token expiré"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"erreur": "Token invalide"}), 401
+        return decorated
 
-        return f(*args, **kwargs)
-    return decorated
+    return decorateur
 
 
-def admin_requis(f):
-    """Décorateur pour protéger les routes admin."""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = request.headers.get("Authorization")
+# Décorateurs pour protéger les routes (utilisateur connecté / administrateur)
+token_requis = _authentification_requise()
+admin_requis = _authentification_requise(role="admin")
 
-        if not token:
-            return jsonify({"erreur": "Token manquant"}), 401
 
-        try:
-            # Enlever "Bearer " si présent
-            if token.startswith("Bearer "):
-                token = token[7:]
+# ==================== CACHE HTTP ====================
 
-            data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            request.utilisateur = data["username"]
-            request.role = data.get("role", "user")
 
-            # Vérifier le rôle admin
-            if request.role != "admin":
-                return jsonify({"erreur": "Accès refusé. Droits administrateur requis."}), 403
+def cache_http(*sources, cache_control="public, no-cache"):
+    """
+    Décorateur pour les routes GET en lecture seule.
+
+    L'ETag est dérivé de la version des sources de données (voir
+    modules.version) et de l'URL complète : si le client renvoie le même
+    ETag (If-None-Match), on répond 304 sans relire ni recalculer quoi que ce soit.
+    """
+    def decorateur(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            version = version_donnees(*sources)
+            if version is None:
+                # Données absentes : pas de version fiable, donc ni ETag ni 304
+                return f(*args, **kwargs)
+
+            empreinte = f"{version}|{request.full_path}"
+            etag = hashlib.sha1(empreinte.encode(), usedforsecurity=False).hexdigest()
+
+            if etag in request.if_none_match:
+                reponse = app.response_class(status=304)
+            else:
+                reponse = make_response(f(*args, **kwargs))
+                if reponse.status_code != 200:
+                    return reponse
 
-        except jwt.ExpiredSignatureError:
-            return jsonify({"erreur": "Token expiré"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"erreur": "Token invalide"}), 401
+            reponse.set_etag(etag)
+            reponse.headers["Cache-Control"] = cache_control
+            if cache_control.startswith("private"):
+                reponse.vary.add("Authorization")
+            return reponse
 
-        return f(*args, **kwargs)
+        return decorated
+
+    return decorateur
+
+
+# ==================== LIMITATION DE DÉBIT ====================
+
+# Routes d'authentification (hachage coûteux) : rafale autorisée puis débit soutenu.
+# Par adresse IP contre les rafales d'une même machine, par nom d'utilisateur
+# contre le bourrage d'identifiants réparti sur beaucoup d'adresses.
+limiteur_ip = LimiteurDebit(capacite=20, debit=1.0)
+limiteur_username = LimiteurDebit(capacite=5, debit=0.2)
+
+
+def limite_authentification(f):
+    """Décorateur : refuse (429) les tentatives au-delà du débit autorisé."""
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        data = request.get_json(silent=True) or {}
+        verifications = [limiteur_ip.autoriser(request.remote_addr)]
+        if isinstance(data.get("username"), str):
+            verifications.append(limiteur_username.autoriser(data["username"].lower()))
+
+        attente = max(attente for _autorise, attente in verifications)
+        if attente:
+            reponse = jsonify({"erreur": "Trop de tentatives, réessayez plus tard."})
+            reponse.status_code = 429
+            reponse.headers["Retry-After"] = str(math.ceil(attente))
+            return reponse
+
+        try:
+            return f(*args, **kwargs)
+        except HachageSurcharge:
+            reponse = jsonify({"erreur": "Service surchargé, réessayez plus tard."})
+            reponse.status_code = 503
+            reponse.headers["Retry-After"] = "1"
+            return reponse
 
     return decorated
 
@@ -89,6 +173,7 @@ def admin_requis(f):
 
 
 @app.route("/api/auth/login", methods=["POST"])
+@limite_authentification
 def login():
     """Authentification et génération du token JWT."""
     data = request.get_json()
@@ -101,11 +186,7 @@ def login():
     if user:
         # CORRECTION: Inclure le rôle dans le token JWT
         user_role = user.get("role", "user")
-        token = jwt.encode({
-            "username": user["username"],
-            "role": user_role,
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=24)
-        }, SECRET_KEY, algorithm="HS256")
+        token = creer_jeton(user["username"], user_role, SECRET_KEY)
 
         # CORRECTION: Renvoyer le rôle dans la réponse
         return jsonify({
@@ -118,7 +199,16 @@ def login():
     return jsonify({"erreur": message}), 401
 
 
+@app.route("/api/auth/logout", methods=["POST"])
+@token_requis
+def logout():
+    """Déconnexion : le jeton est révoqué jusqu'à son expiration."""
+    revoquer_jeton(_extraire_jeton(), SECRET_KEY)
+    return jsonify({"message": "Déconnexion réussie"})
+
+
 @app.route("/api/auth/register", methods=["POST"])
+@limite_authentification
 def register():
     """Création de compte."""
     data = request.get_json()
@@ -136,30 +226,119 @@ def register():
 
 # ==================== PRODUITS ENDPOINTS ====================
 
+LIMITE_MAX_PRODUITS = 500
+
+
+def _encoder_curseur(cle):
+    """Curseur opaque à partir de la clé de tri du dernier produit d'une page."""
+    if cle is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(cle).encode()).decode()
+
+
+def _decoder_curseur(curseur):
+    """Clé de tri contenue dans un curseur ; lève ValueError s'il est invalide."""
+    if not curseur:
+        return None
+    try:
+        cle = json.loads(base64.urlsafe_b64decode(curseur.encode()))
+    except (ValueError, binascii.Error):
+        raise ValueError("Curseur invalide")
+    if not isinstance(cle, list) or not cle:
+        raise ValueError("Curseur invalide")
+    return cle
+
+
+def _filtres_produits():
+    """Filtres de la liste des produits lus dans la requête."""
+    filtres = {
+        "prix_min": request.args.get("prix_min", type=float),
+        "prix_max": request.args.get("prix_max", type=float),
+        "en_stock": request.args.get("en_stock", "").lower() in ("1", "true", "oui"),
+        "prefixe": request.args.get("prefixe") or None,
+    }
+    for nom in ("prix_min", "prix_max"):
+        if nom in request.args and filtres[nom] is None:
+            raise ValueError(f"Paramètre {nom} invalide")
+    return filtres
+
+
+def _ids_produits(valeur):
+    """Ids du paramètre ids=1,2,3 ; lève ValueError s'il est invalide ou trop long."""
+    try:
+        ids = [int(morceau) for morceau in valeur.split(",") if morceau.strip()]
+    except ValueError:
+        raise ValueError("Paramètre ids invalide")
+    if len(ids) > LIMITE_MAX_PRODUITS:
+        raise ValueError(f"Au plus {LIMITE_MAX_PRODUITS} ids par requête")
+    return ids
+
 
 @app.route("/api/products", methods=["GET"])
+@cache_http("produits", cache_control="public, max-age=5, must-revalidate")
 def get_produits():
-    """Liste tous les produits avec pagination."""
-    produits = charger_produits()
+    """
+    Liste les produits, filtrés et triés côté serveur.
 
-    # Pagination
-    page = request.args.get("page", 1, type=int)
-    limite = request.args.get("limite", 10, type=int)
+    Paramètres : tri (id, prix, nom), prix_min, prix_max, en_stock=1, prefixe,
+    limite, et curseur (valeur "suivant" de la page précédente). Avec
+    ids=1,2,3, retourne seulement ces produits, en un appel.
 
-    debut = (page - 1) * limite
-    fin = debut + limite
+    Sans curseur, la réponse garde le format de l'ancienne pagination par
+    numéro (page=, 1 par défaut) : total, page et pages, plus le curseur
+    "suivant". Avec un curseur, le total n'est pas recompté à chaque page.
+    """
+    try:
+        if "ids" in request.args:
+            produits = produits_par_ids(_ids_produits(request.args["ids"]))
+            return jsonify({"produits": produits, "total": len(produits)})
+
+        filtres = _filtres_produits()
+        tri = request.args.get("tri", "id")
+        limite = min(max(request.args.get("limite", 10, type=int), 1), LIMITE_MAX_PRODUITS)
+        apres = _decoder_curseur(request.args.get("curseur"))
+
+        if apres is None:
+            # Pagination par numéro de page (parcourt les pages précédentes)
+            page = max(request.args.get("page", 1, type=int), 1)
+            produits, suivante = page_produits(tri, limite=limite,
+                                               decalage=(page - 1) * limite, **filtres)
+            total = compter_produits(**filtres)
+            return jsonify({
+                "produits": produits,
+                "total": total,
+                "page": page,
+                "pages": (total + limite - 1) // limite,
+                "limite": limite,
+                "suivant": _encoder_curseur(suivante),
+            })
+
+        produits, suivante = page_produits(tri, apres=apres, limite=limite, **filtres)
+    except ValueError as e:
+        return jsonify({"erreur": str(e)}), 400
 
-    return jsonify(
-        {
-            "produits": produits[debut:fin],
-            "total": len(produits),
-            "page": page,
-            "pages": (len(produits) + limite - 1) // limite,
-        }
-    )
+    return jsonify({
+        "produits": produits,
+        "limite": limite,
+        "suivant": _encoder_curseur(suivante),
+    })
+
+
+@app.route("/api/products/search", methods=["GET"])
+@cache_http("produits", cache_control="public, max-age=5, must-revalidate")
+def rechercher_produits_api():
+    """Recherche plein texte dans les produits (?q=, classés par pertinence)."""
+    requete = request.args.get("q", "").strip()
+    if not requete:
+        return jsonify({"erreur": "Paramètre q requis"}), 400
+
+    limite = min(max(request.args.get("limite", 20, type=int), 1), LIMITE_MAX_PRODUITS)
+    produits = rechercher_produits(requete, limite)
+    return jsonify({"produits": produits, "total": len(produits), "q": requete})
 
 
 @app.route("/api/products/<int:id>", methods=["GET"])
+@cache_http("produits", cache_control="public, max-age=5, must-revalidate")
 def get_produit(id):
     """Détails d'un produit."""
     produits = charger_produits()
@@ -251,11 +430,10 @@ def delete_produit(id):
 def get_commandes():
     """Liste toutes les commandes de l'utilisateur connecté avec leurs lignes."""
     commandes = charger_commandes(username=request.utilisateur)
-    
-    # Enrichir chaque commande avec ses lignes de produits
-    for commande in commandes:
-        commande["lignes"] = charger_lignes_commandes(commande["id"])
-    
+
+    # Enrichir chaque commande avec ses lignes (une seule lecture du CSV)
+    ajouter_lignes_aux_commandes(commandes)
+
     return jsonify({"commandes": commandes, "total": len(commandes)})
 
 
@@ -305,7 +483,6 @@ def post_commande():
     return jsonify({"erreur": "Format invalide. Utilisez 'items' (liste) ou 'produit_id' + 'quantite'"}), 400
 
 
-
 @app.route("/api/orders/<int:id>/validate", methods=["POST"])
 @token_requis
 def post_valider_commande(id):
@@ -332,6 +509,7 @@ def post_annuler_commande(id):
 
 
 @app.route("/api/stats", methods=["GET"])
+@cache_http("produits", "agregats", cache_control="public, max-age=5, must-revalidate")
 def get_stats():
     """Statistiques agrégées."""
     stats = calculer_statistiques()
@@ -342,27 +520,23 @@ def get_stats():
 
 # ==================== ADMIN ENDPOINTS ====================
 
-@app.route("/api/admin/stats", methods=["GET"])
-def get_admin_stats():
-    """Statistiques globales pour l'admin."""
-    produits = charger_produits()
-    commandes = charger_commandes()
-    utilisateurs = charger_utilisateurs()
-
-    # Calculer les stats
+def _statistiques_admin(produits, agregats, utilisateurs):
+    """Statistiques globales de l'admin à partir de données déjà chargées."""
+    # Calculer les stats (commandes : agrégats tenus à jour à chaque événement)
     total_produits = len(produits)
     stock_total = sum(p["quantite"] for p in produits)
     valeur_stock = sum(p["prix"] * p["quantite"] for p in produits)
 
-    total_commandes = len(commandes)
-    commandes_attente = len([c for c in commandes if c["statut"] == "en_attente"])
-    commandes_validees = len([c for c in commandes if c["statut"] == "validee"])
+    par_statut = agregats["commandes_par_statut"]
+    total_commandes = sum(par_statut.values())
+    commandes_attente = par_statut.get("en_attente", 0)
+    commandes_validees = par_statut.get("validee", 0)
 
-    ca_total = sum(c["total"] for c in commandes if c["statut"] == "validee")
+    ca_total = agregats["chiffre_affaires"]
 
     total_users = len(utilisateurs)
 
-    return jsonify({
+    return {
         "produits": {
             "total": total_produits,
             "stock_total": stock_total,
@@ -377,23 +551,129 @@ def get_admin_stats():
         "utilisateurs": {
             "total": total_users
         }
+    }
+
+
+def _utilisateurs_sans_secrets(utilisateurs):
+    """Retire les mots de passe hashés et les salts."""
+    return [
+        {
+            "id": user["id"],
+            "username": user["username"],
+            "role": user.get("role", "user"),
+            "created_at": user["created_at"]
+        }
+        for user in utilisateurs
+    ]
+
+
+def _graphique_top_produits(top):
+    """Format JSON du graphique des top produits."""
+    return {
+        "noms": [p["nom"] for p in top],
+        "quantites": [p["quantite_vendue"] for p in top],
+        "revenus": [p["revenus"] for p in top]
+    }
+
+
+@app.route("/api/admin/stats", methods=["GET"])
+def get_admin_stats():
+    """Statistiques globales pour l'admin."""
+    return jsonify(_statistiques_admin(
+        charger_produits(), charger_agregats(), charger_utilisateurs()
+    ))
+
+
+PANNEAUX_DASHBOARD = [
+    "stats", "produits", "commandes", "utilisateurs",
+    "evolution_ventes", "top_produits", "revenus_par_produit",
+]
+GRAPHES_TOP = {"top_produits", "revenus_par_produit"}
+
+
+def _panneaux_dashboard(champs):
+    """Panneaux demandés par fields=stats,commandes,... : (panneaux, inconnus)."""
+    if not champs:
+        return PANNEAUX_DASHBOARD, []
+    panneaux = [c.strip() for c in champs.split(",") if c.strip()]
+    return panneaux, [p for p in panneaux if p not in PANNEAUX_DASHBOARD]
+
+
+def _sources_dashboard(besoin):
+    """
+    Chargement unique de chaque source, seulement si un panneau en a besoin.
+    Retourne (produits, agregats, utilisateurs), None pour une source inutile.
+    """
+    produits = charger_produits() if besoin & ({"stats", "produits"} | GRAPHES_TOP) else None
+    agregats = charger_agregats() if besoin & ({"stats", "evolution_ventes"} | GRAPHES_TOP) else None
+    utilisateurs = charger_utilisateurs() if besoin & {"stats", "utilisateurs"} else None
+    return produits, agregats, utilisateurs
+
+
+def _panneaux_top_produits(besoin, produits, agregats):
+    """Graphiques des meilleures ventes, à partir d'un seul calcul du top."""
+    if not besoin & GRAPHES_TOP:
+        return {}
+    top = top_produits(5, agregats, produits)
+    resultat = {}
+    if "top_produits" in besoin:
+        resultat["top_produits"] = _graphique_top_produits(top)
+    if "revenus_par_produit" in besoin:
+        resultat["revenus_par_produit"] = get_revenus_par_produit_json(top=top)
+    return resultat
+
+
+@app.route("/api/admin/dashboard", methods=["GET"])
+@admin_requis
+@cache_http("produits", "commandes", "lignes_commandes", "utilisateurs", "agregats",
+            cache_control="private, no-cache")
+def get_admin_dashboard():
+    """
+    Tous les panneaux du tableau de bord admin en une seule requête.
+    Chaque source de données est lue au plus une fois.
+    Paramètre optionnel : fields=stats,commandes,... (tous par défaut).
+    """
+    panneaux, inconnus = _panneaux_dashboard(request.args.get("fields"))
+    if inconnus:
+        return jsonify({
+            "erreur": f"Panneaux inconnus : {', '.join(inconnus)}",
+            "panneaux_disponibles": PANNEAUX_DASHBOARD
+        }), 400
+
+    besoin = set(panneaux)
+    produits, agregats, utilisateurs = _sources_dashboard(besoin)
+
+    resultat = {}
+    if "stats" in besoin:
+        resultat["stats"] = _statistiques_admin(produits, agregats, utilisateurs)
+    if "produits" in besoin:
+        resultat["produits"] = produits
+    if "commandes" in besoin:
+        resultat["commandes"] = ajouter_lignes_aux_commandes(charger_commandes())
+    if "utilisateurs" in besoin:
+        resultat["utilisateurs"] = _utilisateurs_sans_secrets(utilisateurs)
+    if "evolution_ventes" in besoin:
+        resultat["evolution_ventes"] = get_evolution_ventes_json(agregats)
+    resultat.update(_panneaux_top_produits(besoin, produits, agregats))
+
+    return jsonify(resultat)
+
+
+@app.route("/api/admin/cache", methods=["GET"])
+@admin_requis
+def get_cache_stats():
+    """Compteurs des caches (catalogue, jetons vérifiés)."""
+    return jsonify({
+        "produits": statistiques_cache_produits(),
+        "jetons": statistiques_cache_jetons(),
     })
 
 
 @app.route("/api/admin/users", methods=["GET"])
 def get_all_users():
     """Liste tous les utilisateurs."""
-    utilisateurs = charger_utilisateurs()
-
     # Ne pas exposer les mots de passe hashés
-    users_safe = []
-    for user in utilisateurs:
-        users_safe.append({
-            "id": user["id"],
-            "username": user["username"],
-            "role": user.get("role", "user"),
-            "created_at": user["created_at"]
-        })
+    users_safe = _utilisateurs_sans_secrets(charger_utilisateurs())
 
     return jsonify({"utilisateurs": users_safe, "total": len(users_safe)})
 
@@ -402,11 +682,10 @@ def get_all_users():
 def get_all_orders():
     """Liste toutes les commandes avec leurs lignes."""
     commandes = charger_commandes()
-    
-    # Enrichir chaque commande avec ses lignes de produits
-    for commande in commandes:
-        commande["lignes"] = charger_lignes_commandes(commande["id"])
-    
+
+    # Enrichir chaque commande avec ses lignes (une seule lecture du CSV)
+    ajouter_lignes_aux_commandes(commandes)
+
     return jsonify({"commandes": commandes, "total": len(commandes)})
 
 
@@ -430,6 +709,48 @@ def admin_cancel_order(id):
     return jsonify({"erreur": message}), 400
 
 
+# Actions acceptées par le traitement groupé -> action de modules.commandes
+ACTIONS_COMMANDES = {"validate": "valider", "cancel": "annuler"}
+LIMITE_MAX_OPERATIONS = 1000
+
+
+@app.route("/api/admin/orders/bulk", methods=["POST"])
+@admin_requis
+def admin_bulk_orders():
+    """
+    Valider et annuler plusieurs commandes en une fois.
+    Corps : {"operations": [{"id": 12, "action": "validate"}, {"id": 13, "action": "cancel"}]}
+    Les opérations sont appliquées dans l'ordre ; le résultat de chacune est renvoyé.
+    """
+    data = request.get_json(silent=True)
+    operations = data.get("operations") if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"erreur": "Champ requis: operations (liste non vide)"}), 400
+    if len(operations) > LIMITE_MAX_OPERATIONS:
+        return jsonify({"erreur": f"Au plus {LIMITE_MAX_OPERATIONS} opérations par requête"}), 400
+
+    demandes = []
+    for position, operation in enumerate(operations):
+        if (not isinstance(operation, dict)
+                or not isinstance(operation.get("id"), int) or isinstance(operation["id"], bool)
+                or operation.get("action") not in ACTIONS_COMMANDES):
+            return jsonify({
+                "erreur": f"Opération {position} invalide : id entier et action "
+                          f"({', '.join(ACTIONS_COMMANDES)}) requis"
+            }), 400
+        demandes.append((operation["id"], ACTIONS_COMMANDES[operation["action"]]))
+
+    resultats = traiter_commandes(demandes)
+    # Actions renvoyées telles qu'envoyées par le client
+    for resultat, operation in zip(resultats, operations):
+        resultat["action"] = operation["action"]
+    return jsonify({
+        "resultats": resultats,
+        "reussies": sum(resultat["succes"] for resultat in resultats),
+        "echouees": sum(not resultat["succes"] for resultat in resultats),
+    })
+
+
 @app.route("/api/admin/products", methods=["POST"])
 @admin_requis
 def admin_create_product():
@@ -511,119 +832,106 @@ def init_admin():
 
 # ==================== EXPORT/DOWNLOAD ENDPOINTS ====================
 
+def _reponse_csv(nom_fichier, colonnes, lignes):
+    """
+    Réponse CSV envoyée au fil de l'eau (chunked) depuis un itérateur de lignes,
+    compressée en gzip à la volée si le client l'accepte.
+    """
+    compresser = "gzip" in request.accept_encodings
+    reponse = app.response_class(flux_csv(colonnes, lignes, compresser),
+                                 mimetype="text/csv")
+    reponse.headers["Content-Disposition"] = f"attachment; filename={nom_fichier}"
+    reponse.headers["Content-Type"] = "text/csv; charset=utf-8"
+    reponse.vary.add("Accept-Encoding")
+    if compresser:
+        reponse.headers["Content-Encoding"] = "gzip"
+    return reponse
+
+
+def _parametre_depuis():
+    """Lit le paramètre since= (date ISO) ; lève ValueError s'il est invalide."""
+    return normaliser_depuis(request.args.get("since"))
+
+
 @app.route("/api/admin/export/products", methods=["GET"])
 @admin_requis
 def export_products():
     """Télécharger tous les produits en CSV."""
-    import io
-    from flask import make_response
-    
-    produits = charger_produits()
-    
-    # Créer le CSV en mémoire
-    output = io.StringIO()
-    if produits:
-        colonnes = produits[0].keys()
-        writer = csv.DictWriter(output, fieldnames=colonnes)
-        writer.writeheader()
-        writer.writerows(produits)
-    
-    # Créer la réponse avec le bon type MIME
-    response = make_response(output.getvalue())
-    response.headers["Content-Disposition"] = "attachment; filename=produits.csv"
-    response.headers["Content-Type"] = "text/csv; charset=utf-8"
-    
-    return response
+    return _reponse_csv("produits.csv", COLONNES_PRODUITS, parcourir_produits())
 
 
 @app.route("/api/admin/export/orders", methods=["GET"])
 @admin_requis
 def export_orders():
-    """Télécharger toutes les commandes en CSV."""
-    import io
-    from flask import make_response
-    
-    commandes = charger_commandes()
-    
-    # Créer le CSV en mémoire
-    output = io.StringIO()
-    if commandes:
-        colonnes = commandes[0].keys()
-        writer = csv.DictWriter(output, fieldnames=colonnes)
-        writer.writeheader()
-        writer.writerows(commandes)
-    
-    # Créer la réponse avec le bon type MIME
-    response = make_response(output.getvalue())
-    response.headers["Content-Disposition"] = "attachment; filename=commandes.csv"
-    response.headers["Content-Type"] = "text/csv; charset=utf-8"
-    
-    return response
+    """Télécharger les commandes en CSV (passées depuis ?since=YYYY-MM-DD si fourni)."""
+    try:
+        depuis = _parametre_depuis()
+    except ValueError:
+        return jsonify({"erreur": "Paramètre since invalide (format ISO attendu)"}), 400
+
+    return _reponse_csv("commandes.csv", COLONNES_COMMANDES, parcourir_commandes(depuis))
 
 
 @app.route("/api/admin/export/users", methods=["GET"])
 @admin_requis
 def export_users():
-    """Télécharger tous les utilisateurs en CSV (sans les mots de passe)."""
-    import io
-    from flask import make_response
-    
-    utilisateurs = charger_utilisateurs()
-    
-    # Retirer les informations sensibles
-    users_safe = []
-    for user in utilisateurs:
-        users_safe.append({
-            "id": user["id"],
-            "username": user["username"],
-            "role": user.get("role", "user"),
-            "created_at": user["created_at"]
-        })
-    
-    # Créer le CSV en mémoire
-    output = io.StringIO()
-    if users_safe:
-        colonnes = users_safe[0].keys()
-        writer = csv.DictWriter(output, fieldnames=colonnes)
-        writer.writeheader()
-        writer.writerows(users_safe)
-    
-    # Créer la réponse avec le bon type MIME
-    response = make_response(output.getvalue())
-    response.headers["Content-Disposition"] = "attachment; filename=utilisateurs.csv"
-    response.headers["Content-Type"] = "text/csv; charset=utf-8"
-    
-    return response
+    """Télécharger les utilisateurs en CSV (sans les mots de passe)."""
+    try:
+        depuis = _parametre_depuis()
+    except ValueError:
+        return jsonify({"erreur": "Paramètre since invalide (format ISO attendu)"}), 400
+
+    # Les colonnes sensibles (hash, salt) sont ignorées par l'écrivain CSV
+    colonnes = ["id", "username", "role", "created_at"]
+    return _reponse_csv("utilisateurs.csv", colonnes, parcourir_utilisateurs(depuis))
 
 
 # ==================== GRAPHIQUES ENDPOINTS ====================
 
 
+def _parametre_jour(nom):
+    """Lit un paramètre date (YYYY-MM-DD) optionnel ; lève ValueError s'il est invalide."""
+    valeur = request.args.get(nom)
+    return date.fromisoformat(valeur).isoformat() if valeur else None
+
+
 @app.route("/api/admin/graphs/evolution-ventes", methods=["GET"])
+@cache_http("agregats", cache_control="private, no-cache")
 def get_evolution_ventes():
-    """Retourne les données d'évolution des ventes."""
+    """
+    Retourne les données d'évolution des ventes.
+    Paramètres optionnels : from et to (YYYY-MM-DD, inclus), granularity=day|week|month.
+    """
+    try:
+        debut, fin = _parametre_jour("from"), _parametre_jour("to")
+    except ValueError:
+        return jsonify({"erreur": "Paramètres from/to invalides (format YYYY-MM-DD attendu)"}), 400
+    if debut and fin and debut > fin:
+        return jsonify({"erreur": "La date from doit précéder la date to"}), 400
+
+    granularite = request.args.get("granularity", "day")
+    if granularite not in GRANULARITES:
+        return jsonify({"erreur": f"Granularité invalide (valeurs : {', '.join(GRANULARITES)})"}), 400
+
     try:
-        data = get_evolution_ventes_json()
+        data = get_evolution_ventes_json(debut=debut, fin=fin, granularite=granularite)
         return jsonify(data)
     except Exception as e:
         return jsonify({"erreur": str(e)}), 500
 
 
 @app.route("/api/admin/graphs/top-produits", methods=["GET"])
+@cache_http("produits", "agregats", cache_control="private, no-cache")
 def get_top_produits_graph():
     """Retourne les top produits pour le graphique."""
     try:
-        data = top_produits(5)
-        return jsonify({
-            "noms": [p["nom"] for p in data],
-            "quantites": [p["quantite_vendue"] for p in data],
-            "revenus": [p["revenus"] for p in data]
-        })
+        return jsonify(_graphique_top_produits(top_produits(5)))
     except Exception as e:
         return jsonify({"erreur": str(e)}), 500
 
 
 @app.route("/api/admin/graphs/revenus-par-produit", methods=["GET"])
+@cache_http("produits", "agregats", cache_control="private, no-cache")
 def get_revenus_graph():
     """Retourne les revenus par produit pour un graphique en secteurs."""
     try:
@@ -633,6 +941,24 @@ def get_revenus_graph():
         return jsonify({"erreur": str(e)}), 500
 
 
+@app.route("/api/admin/graphs/<nom>.<any(png, svg):format_image>", methods=["GET"])
+@admin_requis
+def get_graphique_image(nom, format_image):
+    """Image d'un graphique (PNG ou SVG), rendue côté serveur et mise en cache."""
+    if nom not in GRAPHIQUES:
+        return jsonify({"erreur": "Graphique introuvable"}), 404
+
+    @cache_http(*GRAPHIQUES[nom][0], cache_control="private, no-cache")
+    def reponse_image():
+        try:
+            image = image_graphique(nom, format_image)
+        except ImportError:
+            return jsonify({"erreur": "Rendu indisponible : matplotlib n'est pas installé"}), 503
+        return app.response_class(image, mimetype=FORMATS_IMAGES[format_image])
+
+    return reponse_image()
+
+
 # ==================== LANCEMENT ====================
 
 if __name__ == "__main__":
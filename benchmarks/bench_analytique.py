@@ -0,0 +1,149 @@
+"""
+Benchmark du moteur d'agrégation en colonnes (NumPy) face aux boucles Python.
+
+Pour chaque taille (nombre de lignes de commandes), génère un historique
+synthétique directement en colonnes, puis mesure le recalcul complet des
+agrégats de ventes (modules.analytique.calculer_agregats). Jusqu'à
+--max-python lignes, mesure aussi le moteur Python (listes de dicts), la
+conversion en colonnes, et vérifie que les deux moteurs donnent les mêmes
+agrégats.
+
+Usage : python benchmarks/bench_analytique.py
+        [--tailles 10000,100000,1000000,10000000] [--max-python 1000000]
+        [--produits 5000] [--jours 730]
+"""
+import argparse
+import os
+import sys
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from modules import analytique  # noqa: E402
+from modules.agregats import _calculer_agregats_python, agregats_vides  # noqa: E402
+
+STATUTS = ["validee", "en_attente", "annulee"]
+
+
+def generer_colonnes(nombre_lignes, nombre_produits, nombre_jours, lignes_par_commande=3):
+    """Crée un historique aléatoire (graine fixe) au format de modules.analytique."""
+    np = analytique.np
+    aleatoire = np.random.default_rng(42)
+    nombre_commandes = max(1, nombre_lignes // lignes_par_commande)
+
+    quantites = aleatoire.integers(1, 6, nombre_lignes, dtype=np.int32)
+    lignes = {
+        "commande_id": aleatoire.integers(1, nombre_commandes + 1, nombre_lignes, dtype=np.int32),
+        "produit_id": aleatoire.integers(1, nombre_produits + 1, nombre_lignes, dtype=np.int32),
+        "quantite": quantites,
+        "total": aleatoire.integers(100, 20001, nombre_lignes, dtype=np.int64) * quantites,
+    }
+    commandes = {
+        "id": np.arange(1, nombre_commandes + 1, dtype=np.int32),
+        # 60 % validées, 25 % en attente, 15 % annulées
+        "statut": aleatoire.choice(3, nombre_commandes, p=[0.6, 0.25, 0.15]).astype(np.int8),
+        "statuts": list(STATUTS),
+        "jour": (np.datetime64("2024-01-01")
+                 + aleatoire.integers(0, nombre_jours, nombre_commandes)).astype("datetime64[D]"),
+        "total": np.bincount(lignes["commande_id"], weights=lignes["total"],
+                             minlength=nombre_commandes + 1)[1:].astype(np.int64),
+    }
+    return commandes, lignes
+
+
+def en_dicts(commandes, lignes):
+    """Convertit les colonnes en listes de dicts, comme charger_commandes()."""
+    statuts = commandes["statuts"]
+    liste_commandes = [
+        {"id": id_commande, "statut": statuts[statut], "date": f"{jour} 12:00:00",
+         "total": total / 100}
+        for id_commande, statut, jour, total in zip(
+            commandes["id"].tolist(), commandes["statut"].tolist(),
+            analytique.np.datetime_as_string(commandes["jour"]).tolist(),
+            commandes["total"].tolist())
+    ]
+    liste_lignes = [
+        {"commande_id": commande_id, "produit_id": produit_id, "quantite": quantite,
+         "total": total / 100}
+        for commande_id, produit_id, quantite, total in zip(
+            lignes["commande_id"].tolist(), lignes["produit_id"].tolist(),
+            lignes["quantite"].tolist(), lignes["total"].tolist())
+    ]
+    return liste_commandes, liste_lignes
+
+
+def identiques(a, b):
+    """Compare deux agrégats au centime près."""
+    if a["commandes_par_statut"] != b["commandes_par_statut"]:
+        return False
+    if a["produits_vendus"] != b["produits_vendus"]:
+        return False
+    if abs(a["chiffre_affaires"] - b["chiffre_affaires"]) > 0.005:
+        return False
+    if a["revenus_par_jour"].keys() != b["revenus_par_jour"].keys():
+        return False
+    if any(abs(a["revenus_par_jour"][jour] - b["revenus_par_jour"][jour]) > 0.005
+           for jour in a["revenus_par_jour"]):
+        return False
+    if a["ventes_par_produit"].keys() != b["ventes_par_produit"].keys():
+        return False
+    return all(
+        vente["quantite"] == b["ventes_par_produit"][produit]["quantite"]
+        and abs(vente["revenus"] - b["ventes_par_produit"][produit]["revenus"]) <= 0.005
+        for produit, vente in a["ventes_par_produit"].items()
+    )
+
+
+def chronometrer(fonction, *args):
+    debut = time.perf_counter()
+    resultat = fonction(*args)
+    return resultat, time.perf_counter() - debut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tailles", default="10000,100000,1000000,10000000")
+    parser.add_argument("--max-python", type=int, default=1_000_000)
+    parser.add_argument("--produits", type=int, default=5000)
+    parser.add_argument("--jours", type=int, default=730)
+    options = parser.parse_args()
+
+    if not analytique.disponible():
+        print("NumPy n'est pas installé : le moteur colonnes n'est pas disponible.")
+        return 1
+
+    tailles = [int(taille) for taille in options.tailles.split(",")]
+    ok = True
+    print(f"{'lignes':>10} {'NumPy':>10} {'M lignes/s':>11} {'colonnes':>10} "
+          f"{'Python':>10} {'gain':>7}")
+    print("=" * 64)
+    for taille in tailles:
+        commandes, lignes = generer_colonnes(taille, options.produits, options.jours)
+        agregats, duree_numpy = chronometrer(
+            analytique.calculer_agregats, commandes, lignes, agregats_vides())
+        ligne = (f"{taille:>10} {duree_numpy * 1000:>8.1f}ms "
+                 f"{taille / duree_numpy / 1e6:>11.1f}")
+
+        if taille <= options.max_python:
+            liste_commandes, liste_lignes = en_dicts(commandes, lignes)
+            _colonnes, duree_conversion = chronometrer(
+                lambda: (analytique.colonnes_commandes(liste_commandes),
+                         analytique.colonnes_lignes(liste_lignes)))
+            attendu, duree_python = chronometrer(
+                _calculer_agregats_python, liste_commandes, liste_lignes)
+            ok = ok and identiques(agregats, attendu)
+            ligne += (f" {duree_conversion * 1000:>8.1f}ms {duree_python * 1000:>8.1f}ms "
+                      f"{duree_python / duree_numpy:>6.1f}x")
+        else:
+            ligne += f" {'-':>10} {'-':>10} {'-':>7}"
+        print(ligne)
+    print("=" * 64)
+    print("  colonnes : conversion des listes de dicts (charger_*) en colonnes")
+
+    print("OK - agrégats identiques" if ok else "ECHEC - résultats différents")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
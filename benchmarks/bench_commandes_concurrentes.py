@@ -0,0 +1,111 @@
+"""
+Benchmark : N processus passent des commandes en parallèle sur le même produit.
+
+Vérifie qu'il n'y a jamais de survente (stock final >= 0 et
+commandes acceptées == stock initial consommé) et affiche le débit obtenu.
+
+Usage : python benchmarks/bench_commandes_concurrentes.py [--processus 8]
+        [--commandes 50] [--stock 200] [--backend csv|sqlite]
+"""
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+
+def preparer_donnees(dossier, stock, backend):
+    """Crée un dossier data/ minimal avec un seul produit en stock."""
+    os.makedirs(os.path.join(dossier, "data"))
+    with open(os.path.join(dossier, "data", "produits.csv"), "w", encoding="utf-8", newline="") as f:
+        ecrivain = csv.writer(f)
+        ecrivain.writerow(["id", "nom", "description", "prix", "quantite"])
+        ecrivain.writerow([1, "Produit test", "Benchmark", 10.0, stock])
+
+    if backend == "sqlite":
+        from modules import config, stockage_sqlite
+        from modules.produits import charger_produits
+        produits = charger_produits()
+        config.BACKEND_STOCKAGE = "sqlite"
+        stockage_sqlite.importer_donnees(produits, [], [], [])
+
+
+def passer_commandes(args):
+    """Travail d'un processus : passe `nombre` commandes d'une unité."""
+    nombre, backend = args
+    from modules import config
+    from modules.commandes import creer_commande
+    config.BACKEND_STOCKAGE = backend
+
+    acceptees = 0
+    for _ in range(nombre):
+        commande, _message = creer_commande([{"produit_id": 1, "quantite": 1}], "bench")
+        if commande:
+            acceptees += 1
+    return acceptees
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--processus", type=int, default=8)
+    parser.add_argument("--commandes", type=int, default=50, help="commandes par processus")
+    parser.add_argument("--stock", type=int, default=200)
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    options = parser.parse_args()
+
+    dossier = tempfile.mkdtemp(prefix="bench_commandes_")
+    dossier_initial = os.getcwd()
+    try:
+        os.chdir(dossier)
+        preparer_donnees(dossier, options.stock, options.backend)
+
+        debut = time.perf_counter()
+        with Pool(options.processus) as pool:
+            resultats = pool.map(
+                passer_commandes,
+                [(options.commandes, options.backend)] * options.processus,
+            )
+        duree = time.perf_counter() - debut
+
+        from modules import config
+        from modules.commandes import charger_commandes
+        from modules.produits import charger_produits, trouver_produit
+        config.BACKEND_STOCKAGE = options.backend
+        stock_final = trouver_produit(charger_produits(), 1)["quantite"]
+        commandes_enregistrees = len(charger_commandes())
+    finally:
+        os.chdir(dossier_initial)
+        shutil.rmtree(dossier, ignore_errors=True)
+
+    tentatives = options.processus * options.commandes
+    acceptees = sum(resultats)
+
+    print("=" * 50)
+    print(f"  Backend              : {options.backend}")
+    print(f"  Processus            : {options.processus}")
+    print(f"  Tentatives           : {tentatives}")
+    print(f"  Commandes acceptées  : {acceptees}")
+    print(f"  Commandes en base    : {commandes_enregistrees}")
+    print(f"  Stock initial/final  : {options.stock} / {stock_final}")
+    print(f"  Durée                : {duree:.2f} s")
+    print(f"  Débit                : {tentatives / duree:.0f} tentatives/s")
+    print("=" * 50)
+
+    ok = (
+        stock_final >= 0
+        and acceptees == options.stock - stock_final
+        and acceptees == commandes_enregistrees
+        and acceptees == min(options.stock, tentatives)
+    )
+    print("OK - aucune survente" if ok else "ECHEC - survente ou écriture perdue")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
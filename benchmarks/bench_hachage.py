@@ -0,0 +1,89 @@
+"""
+Calibrage du coût du hachage des mots de passe pour une latence de connexion cible.
+
+Pour chaque algorithme, double le facteur de coût (itérations PBKDF2, n de
+scrypt) jusqu'à dépasser la latence visée, puis affiche la valeur à mettre
+dans ALGORITHME_HACHAGE et le débit de connexions attendu par cœur, ainsi
+que le coût juste inférieur. Chaque coût est mesuré après un hachage
+d'échauffement, par la médiane de plusieurs répétitions (au moins 3).
+
+Usage : python benchmarks/bench_hachage.py [--cible-ms 100]
+        [--algorithme scrypt|pbkdf2_sha256|tous] [--repetitions 7]
+"""
+import argparse
+import os
+import sys
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from modules.hachage import decrire, hacher  # noqa: E402
+
+# Répétitions minimales par coût : une seule mesure suffit à fausser le choix
+REPETITIONS_MIN = 3
+
+# Facteur de coût à doubler et point de départ de chaque algorithme
+COUTS = {
+    "pbkdf2_sha256": ("iterations", {"iterations": 10000}),
+    "scrypt": ("n", {"n": 1024, "r": 8, "p": 1}),
+}
+
+
+def mesurer(description, repetitions):
+    """Durée médiane d'un hachage, en millisecondes, après un hachage d'échauffement."""
+    # Le premier hachage paie les allocations (mémoire de scrypt) et les caches froids
+    hacher("Motdepasse123", "0123456789abcdef0123456789abcdef", description)
+    durees = []
+    for _ in range(max(repetitions, REPETITIONS_MIN)):
+        debut = time.perf_counter()
+        hacher("Motdepasse123", "0123456789abcdef0123456789abcdef", description)
+        durees.append((time.perf_counter() - debut) * 1000)
+    return sorted(durees)[len(durees) // 2]
+
+
+def calibrer(algorithme, cible_ms, repetitions):
+    """
+    Retourne ((description, durée en ms) du premier coût atteignant la cible,
+    (description, durée) du coût juste inférieur ou None).
+    """
+    facteur, parametres = COUTS[algorithme]
+    parametres = dict(parametres)
+    precedent = None
+    while True:
+        description = decrire(algorithme, parametres)
+        duree = mesurer(description, repetitions)
+        print(f"  {description:<32} {duree:8.1f} ms")
+        if duree >= cible_ms:
+            return (description, duree), precedent
+        precedent = (description, duree)
+        parametres[facteur] *= 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cible-ms", type=float, default=100)
+    parser.add_argument("--algorithme", choices=[*COUTS, "tous"], default="tous")
+    parser.add_argument("--repetitions", type=int, default=7)
+    options = parser.parse_args()
+
+    algorithmes = list(COUTS) if options.algorithme == "tous" else [options.algorithme]
+    resultats = []
+    for algorithme in algorithmes:
+        print(f"{algorithme} (cible {options.cible_ms:.0f} ms) :")
+        resultats.append(calibrer(algorithme, options.cible_ms, options.repetitions))
+
+    print("=" * 60)
+    for (description, duree), precedent in resultats:
+        print(f"  ALGORITHME_HACHAGE=\"{description}\"")
+        print(f"    {duree:.1f} ms par connexion, ~{1000 / duree:.1f} connexions/s par cœur")
+        if precedent is not None:
+            description, duree = precedent
+            print(f"    coût inférieur : \"{description}\" ({duree:.1f} ms, "
+                  f"~{1000 / duree:.1f} connexions/s par cœur)")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Benchmark de démarrage à froid de l'API : temps d'import mesuré par `python -X importtime`.
+
+Lance `import api` dans un interpréteur neuf, affiche le temps cumulé et
+les modules les plus lents, et échoue si un module de graphiques
+(matplotlib, seaborn) est chargé ou si le budget de temps est dépassé.
+
+Usage : python benchmarks/bench_import_api.py [--budget-ms 1500] [--top 10]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules qui ne doivent jamais être chargés au démarrage de l'API
+MODULES_INTERDITS = ("matplotlib", "seaborn")
+
+# Ligne de -X importtime : "import time: self [us] | cumulative | imported package"
+LIGNE_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def mesurer_import(module):
+    """Retourne [(module, cumulé en µs, profondeur)] pour l'import de `module`."""
+    resultat = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=RACINE, capture_output=True, text=True, check=False,
+    )
+    if resultat.returncode != 0:
+        print(resultat.stderr[-2000:])
+        raise SystemExit(f"Échec de l'import de {module}")
+
+    imports = []
+    for ligne in resultat.stderr.splitlines():
+        correspondance = LIGNE_IMPORTTIME.match(ligne)
+        if correspondance:
+            _propre, cumule, indentation, nom = correspondance.groups()
+            imports.append((nom, int(cumule), (len(indentation) - 1) // 2))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="api")
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=10)
+    options = parser.parse_args()
+
+    imports = mesurer_import(options.module)
+    total_ms = next(cumule for nom, cumule, profondeur in imports
+                    if nom == options.module and profondeur == 0) / 1000
+    interdits = sorted({
+        nom for nom, _cumule, _profondeur in imports
+        if nom.split(".")[0] in MODULES_INTERDITS
+    })
+
+    print("=" * 60)
+    print(f"  import {options.module} : {total_ms:.0f} ms ({len(imports)} modules)")
+    print("  Imports directs les plus lents :")
+    directs = sorted((i for i in imports if i[2] == 1), key=lambda i: i[1], reverse=True)
+    for nom, cumule, _profondeur in directs[:options.top]:
+        print(f"    {cumule / 1000:8.1f} ms  {nom}")
+    print("=" * 60)
+
+    ok = True
+    if interdits:
+        print(f"ECHEC - modules de graphiques chargés au démarrage : {', '.join(interdits)}")
+        ok = False
+    if total_ms > options.budget_ms:
+        print(f"ECHEC - {total_ms:.0f} ms > budget de {options.budget_ms:.0f} ms")
+        ok = False
+    if ok:
+        print("OK - démarrage dans le budget, sans matplotlib ni seaborn")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Benchmark des instantanés binaires face au parse des CSV.
+
+Écrit dans un dossier temporaire un CSV de lignes de commandes synthétiques
+(500k lignes par défaut) puis mesure :
+- le parse complet du CSV (csv.DictReader + conversions int/float) ;
+- le chargement depuis l'instantané binaire à jour ;
+- le chargement après des ajouts en fin de CSV (instantané + parse de la queue).
+
+Usage : python benchmarks/bench_instantanes.py [--lignes 500000] [--ajouts 1000]
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from modules import instantanes  # noqa: E402
+from modules.commandes import (COLONNES_LIGNES_COMMANDES,  # noqa: E402
+                               TYPES_LIGNES_COMMANDES, _normaliser_ligne_commande)
+
+
+def generer_lignes(debut, nombre, aleatoire):
+    lignes = []
+    for i in range(debut, debut + nombre):
+        quantite = aleatoire.randint(1, 5)
+        prix = aleatoire.randint(100, 20000) / 100
+        lignes.append({
+            "id": i,
+            "commande_id": i // 3 + 1,
+            "produit_id": aleatoire.randint(1, 5000),
+            "quantite": quantite,
+            "prix_unitaire": prix,
+            "total": prix * quantite,
+        })
+    return lignes
+
+
+def ecrire_csv(chemin, lignes, mode="w"):
+    with open(chemin, mode=mode, encoding="utf-8", newline="") as fichier:
+        ecrivain = csv.DictWriter(fichier, fieldnames=COLONNES_LIGNES_COMMANDES)
+        if mode == "w":
+            ecrivain.writeheader()
+        ecrivain.writerows(lignes)
+
+
+def parser_csv(chemin):
+    with open(chemin, mode="r", encoding="utf-8") as fichier:
+        return [_normaliser_ligne_commande(ligne) for ligne in csv.DictReader(fichier)]
+
+
+def charger(chemin):
+    return instantanes.charger_csv(chemin, COLONNES_LIGNES_COMMANDES, TYPES_LIGNES_COMMANDES,
+                                   _normaliser_ligne_commande)
+
+
+def chronometrer(fonction, *args, repetitions=3):
+    """Retourne (résultat, meilleure durée en secondes)."""
+    meilleure = None
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction(*args)
+        duree = time.perf_counter() - debut
+        meilleure = duree if meilleure is None else min(meilleure, duree)
+    return resultat, meilleure
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lignes", type=int, default=500_000)
+    parser.add_argument("--ajouts", type=int, default=1000)
+    options = parser.parse_args()
+
+    aleatoire = random.Random(42)
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, "lignes_commandes.csv")
+        lignes = generer_lignes(1, options.lignes, aleatoire)
+        ecrire_csv(chemin, lignes)
+        instantanes.ecrire_instantane(chemin, COLONNES_LIGNES_COMMANDES, TYPES_LIGNES_COMMANDES,
+                                      [_normaliser_ligne_commande(ligne) for ligne in lignes])
+        taille_csv = os.path.getsize(chemin)
+        taille_instantane = os.path.getsize(instantanes.chemin_instantane(chemin))
+
+        attendu, duree_csv = chronometrer(parser_csv, chemin)
+        charge, duree_instantane = chronometrer(charger, chemin)
+        ok = charge == attendu
+
+        ajouts = generer_lignes(options.lignes + 1, options.ajouts, aleatoire)
+        ecrire_csv(chemin, ajouts, mode="a")
+        # Une seule répétition : au-delà de TAILLE_MAX_QUEUE l'instantané est réécrit
+        charge, duree_queue = chronometrer(charger, chemin, repetitions=1)
+        ok = ok and charge == parser_csv(chemin)
+
+    print("=" * 60)
+    print(f"  Lignes                      : {options.lignes} (+{options.ajouts} ajoutées)")
+    print(f"  Taille CSV / instantané     : {taille_csv / 1e6:.1f} Mo / {taille_instantane / 1e6:.1f} Mo")
+    print(f"  Parse CSV                   : {duree_csv * 1000:8.0f} ms")
+    print(f"  Instantané à jour           : {duree_instantane * 1000:8.0f} ms "
+          f"({duree_csv / duree_instantane:.1f}x)")
+    print(f"  Instantané + queue du CSV   : {duree_queue * 1000:8.0f} ms")
+    print("=" * 60)
+    print("OK - lignes identiques" if ok else "ECHEC - résultats différents")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Benchmark : coût de la vérification des jetons JWT sur une route authentifiée.
+
+Compare, pour le même jeton présenté à chaque requête :
+- jwt.decode seul face à verifier_jeton servi par le cache LRU ;
+- GET /api/orders (client de test Flask) avec et sans le cache.
+
+Usage : python benchmarks/bench_jetons.py [--requetes 5000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+
+def chronometrer(fonction, repetitions):
+    """Durée moyenne d'un appel, en microsecondes."""
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        fonction()
+    return (time.perf_counter() - debut) / repetitions * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requetes", type=int, default=5000)
+    options = parser.parse_args()
+
+    dossier = tempfile.mkdtemp(prefix="bench_jetons_")
+    dossier_initial = os.getcwd()
+    try:
+        os.makedirs(os.path.join(dossier, "data"))
+        os.chdir(dossier)
+        mesurer(options.requetes)
+    finally:
+        os.chdir(dossier_initial)
+        shutil.rmtree(dossier, ignore_errors=True)
+    return 0
+
+
+def mesurer(requetes):
+    """Lance les mesures dans le dossier courant (data/ vide)."""
+    import jwt
+
+    import api
+    from modules import jetons
+
+    jeton = jetons.creer_jeton("bench", "user", api.SECRET_KEY)
+    entetes = {"Authorization": f"Bearer {jeton}"}
+    client = api.app.test_client()
+
+    decode = chronometrer(
+        lambda: jwt.decode(jeton, api.SECRET_KEY, algorithms=["HS256"]), requetes
+    )
+    verification = chronometrer(
+        lambda: jetons.verifier_jeton(jeton, api.SECRET_KEY), requetes
+    )
+
+    def requete():
+        assert client.get("/api/orders", headers=entetes).status_code == 200
+
+    taille_cache = jetons.TAILLE_MAX_CACHE_JETONS
+    jetons.TAILLE_MAX_CACHE_JETONS = 0  # chaque requête refait jwt.decode
+    jetons.vider_cache_jetons()
+    sans_cache = chronometrer(requete, requetes)
+
+    jetons.TAILLE_MAX_CACHE_JETONS = taille_cache
+    avec_cache = chronometrer(requete, requetes)
+
+    print("=" * 50)
+    print(f"  jwt.decode                  : {decode:8.1f} µs")
+    print(f"  verifier_jeton (cache)      : {verification:8.1f} µs")
+    print(f"  GET /api/orders sans cache  : {sans_cache:8.1f} µs")
+    print(f"  GET /api/orders avec cache  : {avec_cache:8.1f} µs")
+    print(f"  Gain par requête            : {sans_cache - avec_cache:8.1f} µs")
+    print(f"  Cache : {jetons.statistiques_cache_jetons()}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
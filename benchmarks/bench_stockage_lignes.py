@@ -0,0 +1,113 @@
+"""
+Benchmark du stockage binaire des lignes de commandes face au CSV.
+
+Crée dans un dossier temporaire un historique de lignes (1M par défaut) dans
+les deux stockages, puis mesure :
+- la lecture des lignes d'une commande (parcours du CSV / index + mmap) ;
+- l'ajout des lignes d'une nouvelle commande ;
+- le chargement de toutes les lignes.
+
+Usage : python benchmarks/bench_stockage_lignes.py [--lignes 1000000] [--lectures 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from modules import commandes, config, fichiers, stockage_lignes  # noqa: E402
+
+
+def generer_lignes(nombre_lignes, lignes_par_commande=3):
+    aleatoire = random.Random(42)
+    lignes = []
+    for i in range(1, nombre_lignes + 1):
+        quantite = aleatoire.randint(1, 5)
+        prix = aleatoire.randint(100, 20000) / 100
+        lignes.append({
+            "id": i,
+            "commande_id": (i - 1) // lignes_par_commande + 1,
+            "produit_id": aleatoire.randint(1, 5000),
+            "quantite": quantite,
+            "prix_unitaire": prix,
+            "total": prix * quantite,
+        })
+    return lignes
+
+
+def mesurer(stockage, commande_ids, nouvelle_commande):
+    """Retourne (lecture d'une commande, ajout, chargement complet) en secondes."""
+    config.STOCKAGE_LIGNES = stockage
+
+    debut = time.perf_counter()
+    for commande_id in commande_ids:
+        commandes.charger_lignes_commandes(commande_id)
+    lecture = (time.perf_counter() - debut) / len(commande_ids)
+
+    debut = time.perf_counter()
+    if stockage == "binaire":
+        stockage_lignes.ajouter_lignes(nouvelle_commande)
+    else:
+        commandes._ajouter_au_csv(commandes.FICHIER_LIGNES_COMMANDES,
+                                  commandes.COLONNES_LIGNES_COMMANDES, nouvelle_commande)
+    ajout = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    commandes.charger_lignes_commandes()
+    chargement = time.perf_counter() - debut
+    return lecture, ajout, chargement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lignes", type=int, default=1_000_000)
+    parser.add_argument("--lectures", type=int, default=200)
+    options = parser.parse_args()
+
+    lignes = generer_lignes(options.lignes)
+    derniere_commande = lignes[-1]["commande_id"]
+    aleatoire = random.Random(7)
+    commande_ids = [aleatoire.randint(1, derniere_commande) for _ in range(options.lectures)]
+    nouvelle_commande = [dict(ligne, id=options.lignes + i + 1, commande_id=derniere_commande + 1)
+                         for i, ligne in enumerate(lignes[:3])]
+
+    with tempfile.TemporaryDirectory() as dossier:
+        commandes.FICHIER_LIGNES_COMMANDES = os.path.join(dossier, "lignes_commandes.csv")
+        config.FICHIER_LIGNES_BINAIRES = os.path.join(dossier, "lignes_commandes.dat")
+        fichiers.FICHIER_VERROU = os.path.join(dossier, ".donnees.lock")
+        # Lecture du CSV seul, sans instantané binaire
+        config.INSTANTANES_BINAIRES = False
+
+        fichiers.ecrire_csv_atomique(commandes.FICHIER_LIGNES_COMMANDES,
+                                     commandes.COLONNES_LIGNES_COMMANDES, lignes)
+        stockage_lignes.sauvegarder_lignes(lignes)
+
+        # Le CSV est parcouru en entier à chaque lecture : moins de répétitions
+        csv_lecture, csv_ajout, csv_chargement = mesurer(
+            "csv", commande_ids[:5], nouvelle_commande)
+        bin_lecture, bin_ajout, bin_chargement = mesurer(
+            "binaire", commande_ids, nouvelle_commande)
+        ok = (commandes.charger_lignes_commandes(derniere_commande + 1)
+              == [{cle: ligne[cle] for cle in stockage_lignes.COLONNES} for ligne in nouvelle_commande])
+        config.STOCKAGE_LIGNES = "csv"
+
+    print("=" * 60)
+    print(f"  Lignes                 : {options.lignes}")
+    print(f"  {'':<22}   {'CSV':>10}   {'binaire':>10}")
+    for libelle, valeur_csv, valeur_binaire in [
+        ("Lignes d'une commande", f"{csv_lecture * 1000:8.2f}ms", f"{bin_lecture * 1e6:8.1f}µs"),
+        ("Ajout d'une commande", f"{csv_ajout * 1e6:8.1f}µs", f"{bin_ajout * 1e6:8.1f}µs"),
+        ("Chargement complet", f"{csv_chargement * 1000:8.0f}ms", f"{bin_chargement * 1000:8.0f}ms"),
+    ]:
+        print(f"  {libelle:<22} : {valeur_csv:>10}   {valeur_binaire:>10}")
+    print("=" * 60)
+    print("OK - lignes ajoutées relues" if ok else "ECHEC - lignes ajoutées introuvables")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Benchmark du moteur d'agrégation des ventes (jointure par hachage + top-k).
+
+Génère en mémoire un historique synthétique (1M lignes par défaut), puis mesure :
+- la jointure commandes validées x lignes et le cumul par produit ;
+- la sélection du top-k par tas (heapq.nlargest) face à un tri complet.
+
+Usage : python benchmarks/bench_top_produits.py [--lignes 1000000]
+        [--produits 5000] [--top 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from modules.agregats import calculer_ventes_par_produit, meilleures_ventes  # noqa: E402
+
+STATUTS = ["validee", "validee", "validee", "en_attente", "annulee"]
+
+
+def generer_historique(nombre_lignes, nombre_produits, lignes_par_commande=3):
+    """Crée des commandes et des lignes de commandes aléatoires (graine fixe)."""
+    aleatoire = random.Random(42)
+    nombre_commandes = max(1, nombre_lignes // lignes_par_commande)
+
+    commandes = [
+        {"id": i, "statut": aleatoire.choice(STATUTS), "total": 0.0}
+        for i in range(1, nombre_commandes + 1)
+    ]
+    lignes = []
+    for i in range(1, nombre_lignes + 1):
+        quantite = aleatoire.randint(1, 5)
+        prix = aleatoire.randint(100, 20000) / 100
+        lignes.append({
+            "id": i,
+            "commande_id": aleatoire.randint(1, nombre_commandes),
+            "produit_id": aleatoire.randint(1, nombre_produits),
+            "quantite": quantite,
+            "prix_unitaire": prix,
+            "total": prix * quantite,
+        })
+    return commandes, lignes
+
+
+def chronometrer(fonction, *args):
+    debut = time.perf_counter()
+    resultat = fonction(*args)
+    return resultat, time.perf_counter() - debut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lignes", type=int, default=1_000_000)
+    parser.add_argument("--produits", type=int, default=5000)
+    parser.add_argument("--top", type=int, default=5)
+    options = parser.parse_args()
+
+    print(f"Génération de {options.lignes} lignes...")
+    commandes, lignes = generer_historique(options.lignes, options.produits)
+
+    ventes, duree_jointure = chronometrer(calculer_ventes_par_produit, commandes, lignes)
+    top_tas, duree_tas = chronometrer(meilleures_ventes, ventes, options.top)
+    top_tri, duree_tri = chronometrer(
+        lambda v, k: sorted(v.items(), key=lambda item: item[1]["quantite"], reverse=True)[:k],
+        ventes, options.top,
+    )
+
+    print("=" * 50)
+    print(f"  Commandes / lignes      : {len(commandes)} / {len(lignes)}")
+    print(f"  Produits vendus         : {len(ventes)}")
+    print(f"  Jointure + cumul        : {duree_jointure * 1000:.0f} ms "
+          f"({len(lignes) / duree_jointure / 1e6:.2f} M lignes/s)")
+    print(f"  {f'Top {options.top} par tas':<24}: {duree_tas * 1000:.2f} ms")
+    print(f"  {f'Top {options.top} par tri complet':<24}: {duree_tri * 1000:.2f} ms")
+    print("=" * 50)
+
+    ok = [p for p, _ in top_tas] == [p for p, _ in top_tri]
+    print("OK - top identique" if ok else "ECHEC - résultats différents")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
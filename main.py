@@ -1,6 +1,6 @@
 from modules.produits import (ajouter_produit, charger_produits,
-                              modifier_produit, supprimer_produit,
-                              trouver_produit)
+                              modifier_produit, rechercher_produits,
+                              supprimer_produit, trouver_produit)
 
 
 def afficher_menu():
@@ -29,10 +29,14 @@ def afficher_produits(produits):
 
 
 def rechercher_produit(produits):
-    """Recherche un produit par ID."""
-    try:
-        id_produit = int(input("ID du produit : "))
-        produit = trouver_produit(produits, id_produit)
+    """Recherche un produit par ID, ou par mots du nom et de la description."""
+    saisie = input("ID ou mots recherchés : ").strip()
+    if not saisie:
+        print("Recherche vide.")
+        return
+
+    if saisie.isdigit():
+        produit = trouver_produit(produits, int(saisie))
         if produit:
             print(f"\nNom : {produit['nom']}")
             print(f"Description : {produit['description']}")
@@ -40,8 +44,13 @@ def rechercher_produit(produits):
             print(f"Stock : {produit['quantite']}")
         else:
             print("Produit introuvable.")
-    except ValueError:
-        print("ID invalide.")
+        return
+
+    resultats = rechercher_produits(saisie)
+    if not resultats:
+        print("Aucun produit ne correspond.")
+        return
+    afficher_produits(resultats)
 
 
 def saisir_nouveau_produit(produits):
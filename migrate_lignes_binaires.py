@@ -0,0 +1,35 @@
+import os
+
+from modules import config, stockage_lignes
+from modules.commandes import charger_lignes_commandes
+
+
+def migrer_vers_lignes_binaires():
+    """Copie les lignes de commandes du CSV dans le stockage binaire."""
+    if config.utilise_sqlite():
+        print("❌ BACKEND_STOCKAGE=sqlite : les lignes sont déjà dans la base SQLite.")
+        return
+    if config.utilise_lignes_binaires():
+        print("❌ STOCKAGE_LIGNES=binaire : lancez la migration avec le stockage CSV.")
+        return
+
+    # Lecture du CSV (stockage par défaut)
+    lignes = charger_lignes_commandes()
+    print(f"📋 {len(lignes)} lignes de commandes trouvées")
+
+    if os.path.exists(config.FICHIER_LIGNES_BINAIRES):
+        print(f"⚠️  Le fichier {config.FICHIER_LIGNES_BINAIRES} existe déjà, son contenu sera remplacé.")
+
+    stockage_lignes.sauvegarder_lignes(lignes)
+
+    print(f"✅ Lignes copiées dans : {config.FICHIER_LIGNES_BINAIRES} "
+          f"(index : {stockage_lignes.chemin_index()})")
+    print("💡 Activez le stockage avec la variable d'environnement STOCKAGE_LIGNES=binaire")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🔄 MIGRATION LIGNES DE COMMANDES CSV -> BINAIRE")
+    print("=" * 60)
+    migrer_vers_lignes_binaires()
+    print("=" * 60)
@@ -0,0 +1,40 @@
+import os
+
+from modules import config, stockage_sqlite
+from modules.agregats import invalider_agregats
+from modules.auth import charger_utilisateurs
+from modules.commandes import charger_commandes, charger_lignes_commandes
+from modules.produits import charger_produits
+
+
+def migrer_vers_sqlite():
+    """Copie les données des fichiers CSV dans la base SQLite."""
+    if config.utilise_sqlite():
+        print("❌ BACKEND_STOCKAGE=sqlite : lancez la migration avec le backend CSV.")
+        return
+
+    # Lecture des CSV (backend par défaut)
+    produits = charger_produits()
+    commandes = charger_commandes()
+    lignes = charger_lignes_commandes()
+    utilisateurs = charger_utilisateurs()
+
+    print(f"📋 {len(produits)} produits, {len(commandes)} commandes, "
+          f"{len(lignes)} lignes, {len(utilisateurs)} utilisateurs trouvés")
+
+    if os.path.exists(config.FICHIER_BASE_SQLITE):
+        print(f"⚠️  La base {config.FICHIER_BASE_SQLITE} existe déjà, son contenu sera remplacé.")
+
+    stockage_sqlite.importer_donnees(produits, commandes, lignes, utilisateurs)
+    invalider_agregats()
+
+    print(f"✅ Données importées dans : {config.FICHIER_BASE_SQLITE}")
+    print("💡 Activez le backend avec la variable d'environnement BACKEND_STOCKAGE=sqlite")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🔄 MIGRATION CSV -> SQLITE")
+    print("=" * 60)
+    migrer_vers_sqlite()
+    print("=" * 60)
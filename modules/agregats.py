@@ -0,0 +1,414 @@
+import bisect
+import heapq
+import json
+import os
+import threading
+import uuid
+
+from modules import analytique
+from modules.fichiers import (ecrire_json_atomique, signature_fichier,
+                              verrou_donnees)
+
+FICHIER_AGREGATS = "data/agregats.json"
+# Événements (créations, validations, annulations) pas encore repliés dans
+# agregats.json, un objet JSON par ligne. La première ligne identifie le journal.
+FICHIER_JOURNAL_AGREGATS = "data/agregats_journal.jsonl"
+
+# Au-delà de cette taille, le journal est replié dans agregats.json
+TAILLE_MAX_JOURNAL_AGREGATS = 64 * 1024
+
+# Agrégats en mémoire (fichier + journal replié), mis à jour seulement si un
+# des deux fichiers a changé ; seule la fin du journal est relue s'il a grandi
+_cache_agregats = {"signatures": None, "base": None, "agregats": None,
+                   "journal": None, "position": 0}
+_verrou_cache = threading.Lock()
+
+# Jours de ventes triés des agrégats en cache (index des cumuls quotidiens)
+_index_jours = {"agregats": None, "jours": None}
+
+
+def agregats_vides():
+    """Structure des agrégats de ventes, sans aucune donnée."""
+    return {
+        # Chiffre d'affaires des commandes validées par jour (YYYY-MM-DD)
+        "revenus_par_jour": {},
+        # {produit_id (str): {"quantite": int, "revenus": float}} sur les commandes validées
+        "ventes_par_produit": {},
+        # {statut: nombre de commandes}
+        "commandes_par_statut": {},
+        "chiffre_affaires": 0.0,
+        "produits_vendus": 0,
+        # Identifiant du journal et position jusqu'à laquelle il est déjà compté
+        "journal": None,
+        "position": 0,
+    }
+
+
+def _copier(agregats):
+    """
+    Copie des agrégats à un niveau : les événements remplacent les valeurs
+    (ventes comprises) sans jamais modifier un dictionnaire partagé.
+    """
+    return {cle: dict(valeur) if isinstance(valeur, dict) else valeur
+            for cle, valeur in agregats.items()}
+
+
+def _ajouter(dictionnaire, cle, valeur):
+    """Incrémente dictionnaire[cle] en arrondissant au centime, et purge les zéros."""
+    total = round(dictionnaire.get(cle, 0) + valeur, 2)
+    if total:
+        dictionnaire[cle] = total
+    else:
+        dictionnaire.pop(cle, None)
+
+
+def _compter_statut(agregats, statut, increment):
+    _ajouter(agregats["commandes_par_statut"], statut, increment)
+
+
+def joindre_lignes_validees(commandes, lignes):
+    """
+    Jointure par hachage des lignes de commandes avec les commandes validées.
+
+    Construit une table {commande_id: commande} des commandes validées, puis
+    parcourt les lignes une seule fois : O(commandes + lignes).
+    Produit des couples (commande, ligne).
+    """
+    validees = {c["id"]: c for c in commandes if c["statut"] == "validee"}
+    for ligne in lignes:
+        commande = validees.get(ligne["commande_id"])
+        if commande is not None:
+            yield commande, ligne
+
+
+def calculer_ventes_par_produit(commandes, lignes):
+    """Quantités et revenus par produit sur les commandes validées : {produit_id: vente}."""
+    ventes = {}
+    for _commande, ligne in joindre_lignes_validees(commandes, lignes):
+        vente = ventes.get(ligne["produit_id"])
+        if vente is None:
+            vente = ventes[ligne["produit_id"]] = {"quantite": 0, "revenus": 0.0}
+        vente["quantite"] += ligne["quantite"]
+        vente["revenus"] += ligne["total"]
+    return ventes
+
+
+def meilleures_ventes(ventes, limite):
+    """
+    Les `limite` produits les plus vendus (en quantité) parmi {produit_id: vente},
+    par tas (heapq.nlargest) : O(n log limite) au lieu d'un tri complet.
+    """
+    return heapq.nlargest(limite, ventes.items(), key=lambda item: item[1]["quantite"])
+
+
+def _compter_vente(agregats, commande, lignes, signe):
+    """Ajoute (signe=1) ou retire (signe=-1) une commande validée des ventes."""
+    jour = commande["date"][:10]
+    _ajouter(agregats["revenus_par_jour"], jour, signe * commande["total"])
+    agregats["chiffre_affaires"] = round(agregats["chiffre_affaires"] + signe * commande["total"], 2)
+
+    ventes = agregats["ventes_par_produit"]
+    for ligne in lignes:
+        cle = str(ligne["produit_id"])
+        vente = ventes.get(cle, {"quantite": 0, "revenus": 0.0})
+        vente = {
+            "quantite": vente["quantite"] + signe * ligne["quantite"],
+            "revenus": round(vente["revenus"] + signe * ligne["total"], 2),
+        }
+        agregats["produits_vendus"] += signe * ligne["quantite"]
+        if vente["quantite"] == 0 and vente["revenus"] == 0:
+            ventes.pop(cle, None)
+        else:
+            ventes[cle] = vente
+
+
+def jours_de_ventes(agregats, debut=None, fin=None):
+    """
+    Jours (YYYY-MM-DD) ayant un chiffre d'affaires, triés, compris entre
+    `debut` et `fin` inclus (bornes optionnelles). La liste triée est gardée
+    tant que les agrégats ne changent pas : une requête ne coûte qu'une
+    recherche dichotomique plus la taille de l'intervalle.
+    """
+    with _verrou_cache:
+        if _index_jours["agregats"] is not agregats:
+            _index_jours["jours"] = sorted(agregats["revenus_par_jour"])
+            _index_jours["agregats"] = agregats
+        jours = _index_jours["jours"]
+
+    premier = bisect.bisect_left(jours, debut) if debut else 0
+    dernier = bisect.bisect_right(jours, fin) if fin else len(jours)
+    return jours[premier:dernier]
+
+
+# ==================== LECTURE / ÉCRITURE ====================
+
+
+def charger_agregats():
+    """
+    Retourne les agrégats courants (à ne pas modifier) : agregats.json plus
+    les événements du journal. Ils sont reconstruits depuis l'historique si
+    le fichier n'existe pas.
+    """
+    signatures = (signature_fichier(FICHIER_AGREGATS), signature_fichier(FICHIER_JOURNAL_AGREGATS))
+    if signatures[0] is None:
+        return reconstruire_agregats()
+
+    with _verrou_cache:
+        if signatures != _cache_agregats["signatures"]:
+            _actualiser_cache(signatures)
+        return _cache_agregats["agregats"]
+
+
+def _actualiser_cache(signatures):
+    """Relit agregats.json s'il a changé, puis replie la partie du journal pas encore lue."""
+    if _cache_agregats["signatures"] is None or signatures[0] != _cache_agregats["signatures"][0]:
+        with open(FICHIER_AGREGATS, mode="r", encoding="utf-8") as fichier:
+            _cache_agregats["base"] = json.load(fichier)
+        _cache_agregats["agregats"] = _cache_agregats["base"]
+        _cache_agregats["journal"] = None
+
+    identifiant, position, evenements = _lire_journal(
+        _cache_agregats["journal"], _cache_agregats["position"]
+    )
+    if identifiant != _cache_agregats["journal"]:
+        # Nouveau journal : on repart du fichier, en sautant ce qu'il compte déjà
+        base = _cache_agregats["base"]
+        _cache_agregats["agregats"] = base
+        if identifiant is not None and identifiant == base.get("journal"):
+            identifiant, position, evenements = _lire_journal(identifiant, base["position"])
+
+    if evenements:
+        agregats = _copier(_cache_agregats["agregats"])
+        for evenement in evenements:
+            _appliquer(agregats, evenement)
+        _cache_agregats["agregats"] = agregats
+    _cache_agregats["journal"] = identifiant
+    _cache_agregats["position"] = position
+    _cache_agregats["signatures"] = signatures
+
+
+def _lire_en_tete(fichier):
+    """Identifiant lu sur la première ligne du journal, ou None si elle est incomplète ou illisible."""
+    fichier.seek(0)
+    en_tete = fichier.readline()
+    try:
+        return json.loads(en_tete)["journal"] if en_tete.endswith(b"\n") else None
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _lire_journal(identifiant=None, position=0):
+    """
+    Lit le journal à partir de `position` (en octets), si son identifiant
+    vaut `identifiant` ; sinon depuis le début.
+    Retourne (identifiant, position après la dernière ligne complète, événements).
+    """
+    try:
+        with open(FICHIER_JOURNAL_AGREGATS, mode="rb") as fichier:
+            lu = _lire_en_tete(fichier)
+            if lu is None:
+                return None, 0, []
+            if lu != identifiant:
+                position = fichier.tell()
+            fichier.seek(position)
+            donnees = fichier.read()
+    except FileNotFoundError:
+        return None, 0, []
+
+    # Une ligne incomplète (ajout en cours) sera lue la prochaine fois
+    donnees = donnees[:donnees.rfind(b"\n") + 1]
+    evenements = []
+    for ligne in donnees.splitlines():
+        try:
+            evenements.append(json.loads(ligne))
+        except ValueError:
+            # Ligne tronquée par un arrêt brutal pendant un ajout
+            continue
+    return lu, position + len(donnees), evenements
+
+
+def _sauvegarder_agregats(agregats):
+    """Écrit agregats.json et vide le journal, dont il compte les événements (sous verrou)."""
+    identifiant, position, _evenements = _lire_journal()
+    agregats = dict(agregats, journal=identifiant, position=position)
+    ecrire_json_atomique(FICHIER_AGREGATS, agregats)
+    # En cas d'arrêt avant cette suppression, "journal" et "position" évitent
+    # de compter deux fois les événements restés dans le journal
+    if os.path.exists(FICHIER_JOURNAL_AGREGATS):
+        os.remove(FICHIER_JOURNAL_AGREGATS)
+    with _verrou_cache:
+        _cache_agregats["base"] = _cache_agregats["agregats"] = agregats
+        _cache_agregats["journal"] = None
+        _cache_agregats["position"] = 0
+        _cache_agregats["signatures"] = (signature_fichier(FICHIER_AGREGATS), None)
+    return agregats
+
+
+def _ajouter_au_journal(evenements):
+    """Ajoute des événements au journal en une seule écriture. Retourne False s'il est illisible."""
+    lignes = [json.dumps(evenement, ensure_ascii=False) for evenement in evenements]
+    with open(FICHIER_JOURNAL_AGREGATS, mode="a+b") as fichier:
+        taille = fichier.tell()
+        if taille == 0:
+            lignes.insert(0, json.dumps({"journal": uuid.uuid4().hex}))
+        elif _lire_en_tete(fichier) is None:
+            return False
+        else:
+            fichier.seek(taille - 1)
+            if fichier.read(1) != b"\n":
+                # Ligne tronquée par un arrêt brutal : elle reste seule et ignorée
+                lignes.insert(0, "")
+        fichier.write(("\n".join(lignes) + "\n").encode("utf-8"))
+    return True
+
+
+def _journaliser(evenements):
+    """
+    Ajoute des événements au journal, sans réécrire agregats.json, puis
+    replie le journal s'il est devenu gros.
+    À appeler sous le même verrou que l'écriture de la commande, pour qu'une
+    reconstruction concurrente ne compte pas l'événement deux fois.
+    """
+    with verrou_donnees():
+        if signature_fichier(FICHIER_AGREGATS) is None or not _ajouter_au_journal(evenements):
+            # Pas d'agrégats, ou journal illisible (arrêt brutal pendant sa création) :
+            # la reconstruction lit l'historique, qui contient déjà l'événement
+            reconstruire_agregats()
+            return
+
+        if os.path.getsize(FICHIER_JOURNAL_AGREGATS) > TAILLE_MAX_JOURNAL_AGREGATS:
+            compacter_journal_agregats()
+
+
+def compacter_journal_agregats():
+    """Replie le journal dans agregats.json puis le vide."""
+    with verrou_donnees():
+        if signature_fichier(FICHIER_AGREGATS) is None:
+            reconstruire_agregats()
+        else:
+            _sauvegarder_agregats(charger_agregats())
+
+
+def invalider_agregats():
+    """Supprime les agrégats : ils seront reconstruits à la prochaine lecture."""
+    with verrou_donnees():
+        for chemin in (FICHIER_AGREGATS, FICHIER_JOURNAL_AGREGATS):
+            if os.path.exists(chemin):
+                os.remove(chemin)
+        with _verrou_cache:
+            _cache_agregats["signatures"] = None
+            _cache_agregats["base"] = _cache_agregats["agregats"] = None
+
+
+def reconstruire_agregats():
+    """Recalcule tous les agrégats depuis l'historique complet des commandes."""
+    # Import local : modules.commandes appelle ce module à chaque événement
+    from modules.commandes import charger_commandes, charger_lignes_commandes
+
+    with verrou_donnees():
+        commandes = charger_commandes()
+        lignes = charger_lignes_commandes()
+
+        agregats = _calculer_agregats_colonnes(commandes, lignes)
+        if agregats is None:
+            agregats = _calculer_agregats_python(commandes, lignes)
+        return _sauvegarder_agregats(agregats)
+
+
+def _calculer_agregats_colonnes(commandes, lignes):
+    """Agrégats par le moteur colonnes (NumPy), ou None s'il n'est pas utilisable."""
+    if not analytique.disponible():
+        return None
+    try:
+        colonnes = analytique.colonnes_commandes(commandes)
+    except ValueError:
+        # Date non ISO : le moteur Python, qui ne fait que couper la chaîne, s'en charge
+        return None
+    return analytique.calculer_agregats(colonnes, analytique.colonnes_lignes(lignes),
+                                        agregats_vides())
+
+
+def _calculer_agregats_python(commandes, lignes):
+    """Agrégats par boucles Python et jointure par hachage."""
+    agregats = agregats_vides()
+    for commande in commandes:
+        _compter_statut(agregats, commande["statut"], 1)
+        if commande["statut"] == "validee":
+            # Les ventes par produit viennent de la jointure ci-dessous
+            _compter_vente(agregats, commande, [], 1)
+
+    for produit_id, vente in calculer_ventes_par_produit(commandes, lignes).items():
+        agregats["ventes_par_produit"][str(produit_id)] = {
+            "quantite": vente["quantite"],
+            "revenus": round(vente["revenus"], 2),
+        }
+        agregats["produits_vendus"] += vente["quantite"]
+    return agregats
+
+
+# ==================== ÉVÉNEMENTS ====================
+
+
+def _evenement(action, commande, lignes=(), ancien_statut=None):
+    """Événement du journal : seuls les champs utiles aux agrégats sont gardés."""
+    if action == "creation":
+        return {"action": action, "statut": commande["statut"]}
+    return {
+        "action": action,
+        "date": commande["date"],
+        "total": commande["total"],
+        "lignes": [{"produit_id": ligne["produit_id"], "quantite": ligne["quantite"],
+                    "total": ligne["total"]} for ligne in lignes],
+        "ancien_statut": ancien_statut,
+    }
+
+
+def _appliquer(agregats, evenement):
+    if evenement["action"] == "creation":
+        _compter_statut(agregats, evenement["statut"], 1)
+    elif evenement["action"] == "validation":
+        _appliquer_validation(agregats, evenement, evenement["lignes"])
+    else:
+        _appliquer_annulation(agregats, evenement, evenement["lignes"], evenement["ancien_statut"])
+
+
+def _appliquer_validation(agregats, commande, lignes):
+    _compter_statut(agregats, "en_attente", -1)
+    _compter_statut(agregats, "validee", 1)
+    _compter_vente(agregats, commande, lignes, 1)
+
+
+def _appliquer_annulation(agregats, commande, lignes, ancien_statut):
+    _compter_statut(agregats, ancien_statut, -1)
+    _compter_statut(agregats, "annulee", 1)
+    if ancien_statut == "validee":
+        _compter_vente(agregats, commande, lignes, -1)
+
+
+def enregistrer_creation(commande):
+    """Une commande vient d'être créée (statut en_attente)."""
+    _journaliser([_evenement("creation", commande)])
+
+
+def enregistrer_validation(commande, lignes):
+    """Une commande en attente vient d'être validée."""
+    _journaliser([_evenement("validation", commande, lignes)])
+
+
+def enregistrer_annulation(commande, lignes, ancien_statut):
+    """Une commande vient d'être annulée (depuis ancien_statut)."""
+    _journaliser([_evenement("annulation", commande, lignes, ancien_statut)])
+
+
+def enregistrer_traitements(traitements):
+    """
+    Plusieurs validations et annulations, dans l'ordre, en un seul ajout au journal.
+    `traitements` : liste de (action, commande, lignes, ancien_statut),
+    action valant "valider" ou "annuler".
+    """
+    if traitements:
+        _journaliser([
+            _evenement("validation" if action == "valider" else "annulation",
+                       commande, lignes, ancien_statut)
+            for action, commande, lignes, ancien_statut in traitements
+        ])
@@ -0,0 +1,112 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy est optionnel : moteur Python pur dans modules.agregats
+    np = None
+
+
+def disponible():
+    """Indique si le moteur colonnes (NumPy) est utilisable."""
+    return np is not None
+
+
+def _centimes(montant):
+    return round(montant * 100)
+
+
+def colonnes_commandes(commandes):
+    """
+    Représentation en colonnes des commandes : id (int32), statut (int8,
+    code dans la liste "statuts"), jour (datetime64[D]) et total en centimes (int64).
+    Lève ValueError si une date n'est pas au format ISO.
+    """
+    codes = {}
+    ids, statuts, totaux, jours = array("i"), array("b"), array("q"), []
+    for commande in commandes:
+        ids.append(commande["id"])
+        statuts.append(codes.setdefault(commande["statut"], len(codes)))
+        totaux.append(_centimes(commande["total"]))
+        jours.append(commande["date"][:10])
+
+    return {
+        "id": np.frombuffer(ids, dtype=np.int32),
+        "statut": np.frombuffer(statuts, dtype=np.int8),
+        "statuts": list(codes),
+        "jour": np.array(jours, dtype="datetime64[D]"),
+        "total": np.frombuffer(totaux, dtype=np.int64),
+    }
+
+
+def colonnes_lignes(lignes):
+    """
+    Représentation en colonnes des lignes de commandes :
+    commande_id, produit_id, quantite (int32) et total en centimes (int64).
+    """
+    commande_ids, produit_ids, quantites, totaux = array("i"), array("i"), array("i"), array("q")
+    for ligne in lignes:
+        commande_ids.append(ligne["commande_id"])
+        produit_ids.append(ligne["produit_id"])
+        quantites.append(ligne["quantite"])
+        totaux.append(_centimes(ligne["total"]))
+
+    return {
+        "commande_id": np.frombuffer(commande_ids, dtype=np.int32),
+        "produit_id": np.frombuffer(produit_ids, dtype=np.int32),
+        "quantite": np.frombuffer(quantites, dtype=np.int32),
+        "total": np.frombuffer(totaux, dtype=np.int64),
+    }
+
+
+def _somme_par_cle(cles, valeurs, taille):
+    """Somme exacte (int64) des valeurs entières par clé entière dans [0, taille)."""
+    # bincount somme en float64 : exact tant que les sommes restent sous 2**53
+    return np.rint(np.bincount(cles, weights=valeurs, minlength=taille)).astype(np.int64)
+
+
+def calculer_agregats(commandes, lignes, agregats):
+    """
+    Remplit `agregats` (vides, structure de modules.agregats.agregats_vides)
+    par des group-by vectorisés sur les colonnes (np.unique / np.bincount)
+    au lieu de boucles Python sur des dicts.
+
+    `commandes` et `lignes` : colonnes de colonnes_commandes / colonnes_lignes.
+    """
+    statuts = commandes["statuts"]
+    validee = statuts.index("validee") if "validee" in statuts else -1
+
+    # Commandes par statut
+    codes, nombres = np.unique(commandes["statut"], return_counts=True)
+    for code, nombre in zip(codes.tolist(), nombres.tolist()):
+        agregats["commandes_par_statut"][statuts[code]] = nombre
+
+    # Revenus des commandes validées par jour
+    masque = commandes["statut"] == validee
+    jours, position_jour = np.unique(commandes["jour"][masque], return_inverse=True)
+    revenus_jour = _somme_par_cle(position_jour, commandes["total"][masque], len(jours))
+    for jour, revenus in zip(np.datetime_as_string(jours).tolist(), revenus_jour.tolist()):
+        if revenus:
+            agregats["revenus_par_jour"][jour] = revenus / 100
+    agregats["chiffre_affaires"] = int(commandes["total"][masque].sum()) / 100
+
+    # Jointure lignes x commandes validées : table de correspondance indexée par id
+    if len(lignes["commande_id"]):
+        taille = int(max(commandes["id"].max(initial=0), lignes["commande_id"].max())) + 1
+        est_validee = np.zeros(taille, dtype=bool)
+        est_validee[commandes["id"][masque]] = True
+        masque_lignes = est_validee[lignes["commande_id"]]
+
+        produits = lignes["produit_id"][masque_lignes]
+        nombre_produits = int(produits.max(initial=-1)) + 1
+        quantites = _somme_par_cle(produits, lignes["quantite"][masque_lignes], nombre_produits)
+        revenus = _somme_par_cle(produits, lignes["total"][masque_lignes], nombre_produits)
+        vendus = np.unique(produits)
+        for produit_id, quantite, revenu in zip(vendus.tolist(), quantites[vendus].tolist(),
+                                                revenus[vendus].tolist()):
+            agregats["ventes_par_produit"][str(produit_id)] = {
+                "quantite": quantite,
+                "revenus": revenu / 100,
+            }
+        agregats["produits_vendus"] = int(quantites.sum())
+
+    return agregats
@@ -1,13 +1,22 @@
 import csv
-import hashlib
-import os
 import secrets
 from datetime import datetime
 
+from modules import config, hachage, instantanes, stockage_sqlite
+from modules.fichiers import ecrire_csv_atomique, verrou_donnees
+from modules.index import ListeIndexee
+from modules.logs import EcrivainLogs
 from modules.password_check import verifier_mot_de_passe_compromis
 
 FICHIER_UTILISATEURS = "data/utilisateurs.csv"
+COLONNES_UTILISATEURS = ["id", "username", "password_hash", "salt", "created_at", "role",
+                         "hachage"]
+TYPES_UTILISATEURS = {"id": int, "username": str, "password_hash": str, "salt": str,
+                      "created_at": str, "role": str, "hachage": str}
 FICHIER_LOGS = "data/logs.csv"
+COLONNES_LOGS = ["timestamp", "username", "action", "succes"]
+
+_ecrivain_logs = EcrivainLogs(FICHIER_LOGS, COLONNES_LOGS)
 
 
 def generer_salt():
@@ -15,55 +24,101 @@ def generer_salt():
     return secrets.token_hex(16)
 
 
-def hacher_mot_de_passe(mot_de_passe, salt):
-    """Hache un mot de passe avec son salt en SHA-256."""
-    combinaison = mot_de_passe + salt
-    return hashlib.sha256(combinaison.encode()).hexdigest()
+def hacher_mot_de_passe(mot_de_passe, salt, description=None):
+    """
+    Hache un mot de passe avec son salt.
+    `description` (colonne "hachage" des utilisateurs) donne l'algorithme et
+    son coût ; par défaut, ceux de la configuration (config.ALGORITHME_HACHAGE).
+    """
+    return hachage.hacher(mot_de_passe, salt, description)
 
 
 def charger_utilisateurs():
-    """Charge tous les utilisateurs depuis le CSV."""
-    utilisateurs = []
+    """Charge tous les utilisateurs depuis le CSV (indexés par username)."""
+    if config.utilise_sqlite():
+        return stockage_sqlite.charger_utilisateurs()
+
+    try:
+        utilisateurs = instantanes.charger_csv(FICHIER_UTILISATEURS, COLONNES_UTILISATEURS,
+                                               TYPES_UTILISATEURS, _normaliser_utilisateur)
+    except FileNotFoundError:
+        utilisateurs = []
+    return ListeIndexee(utilisateurs, cle="username")
+
+
+def _normaliser_utilisateur(ligne):
+    """Convertit une ligne (CSV ou dict) en utilisateur typé."""
+    return {
+        "id": int(ligne["id"]),
+        "username": ligne["username"],
+        "password_hash": ligne["password_hash"],
+        "salt": ligne["salt"],
+        "created_at": ligne["created_at"],
+        "role": ligne.get("role") or "user",
+        # Comptes créés avant les hachages configurables : SHA-256 simple
+        "hachage": ligne.get("hachage") or hachage.ALGORITHME_HISTORIQUE
+    }
+
+
+def _lire_utilisateurs_csv():
+    """Parcourt le CSV des utilisateurs et produit des utilisateurs typés."""
     try:
         with open(FICHIER_UTILISATEURS, mode="r", encoding="utf-8") as fichier:
             lecteur = csv.DictReader(fichier)
             for ligne in lecteur:
-                utilisateurs.append({
-                    "id": int(ligne["id"]),
-                    "username": ligne["username"],
-                    "password_hash": ligne["password_hash"],
-                    "salt": ligne["salt"],
-                    "created_at": ligne["created_at"],
-                    "role": ligne.get("role", "user") if ligne.get("role") else "user"
-                })
+                yield _normaliser_utilisateur(ligne)
     except FileNotFoundError:
-        pass
-    return utilisateurs
+        return
+
+
+def parcourir_utilisateurs(depuis=None):
+    """
+    Parcourt les utilisateurs un par un sans construire de liste (exports).
+    Si `depuis` (date ISO) est fourni, seuls les comptes créés à partir de cette date sont produits.
+    """
+    if config.utilise_sqlite():
+        yield from stockage_sqlite.parcourir_utilisateurs(depuis)
+        return
+
+    for utilisateur in _lire_utilisateurs_csv():
+        if depuis is None or utilisateur["created_at"] >= depuis:
+            yield utilisateur
 
 
 def sauvegarder_utilisateurs(utilisateurs):
     """Sauvegarde les utilisateurs dans le CSV."""
-    with open(FICHIER_UTILISATEURS, mode="w", encoding="utf-8", newline="") as fichier:
-        colonnes = ["id", "username", "password_hash", "salt", "created_at", "role"]
-        ecrivain = csv.DictWriter(fichier, fieldnames=colonnes)
-        ecrivain.writeheader()
-        ecrivain.writerows(utilisateurs)
+    if config.utilise_sqlite():
+        stockage_sqlite.sauvegarder_utilisateurs(utilisateurs)
+        return
+
+    utilisateurs = [_normaliser_utilisateur(u) for u in utilisateurs]
+    with verrou_donnees():
+        ecrire_csv_atomique(FICHIER_UTILISATEURS, COLONNES_UTILISATEURS, utilisateurs)
+        instantanes.ecrire_instantane(FICHIER_UTILISATEURS, COLONNES_UTILISATEURS,
+                                      TYPES_UTILISATEURS, utilisateurs)
 
 
 def trouver_utilisateur(utilisateurs, username):
     """Trouve un utilisateur par son nom."""
+    if isinstance(utilisateurs, ListeIndexee) and utilisateurs.cle == "username":
+        return utilisateurs.obtenir(username)
     for user in utilisateurs:
         if user["username"] == username:
             return user
     return None
 
 
+def charger_utilisateur(username):
+    """Charge un seul utilisateur par son nom, ou None."""
+    if config.utilise_sqlite():
+        return stockage_sqlite.charger_utilisateur(username)
+    return trouver_utilisateur(charger_utilisateurs(), username)
+
+
 def creer_compte(username, mot_de_passe):
     """Crée un nouveau compte utilisateur."""
-    utilisateurs = charger_utilisateurs()
-
     # Vérifier si l'utilisateur existe déjà
-    if trouver_utilisateur(utilisateurs, username):
+    if charger_utilisateur(username):
         enregistrer_log(username, "creation_compte", False)
         return None, "Ce nom d'utilisateur existe déjà."
 
@@ -85,42 +140,66 @@ def creer_compte(username, mot_de_passe):
         # Erreur API - on prévient mais on continue
         print("Attention : impossible de vérifier si le mot de passe est compromis.")
 
+    # Créer le nouvel utilisateur avec rôle "user" par défaut
+    nouvel_utilisateur = _nouvel_utilisateur(username, mot_de_passe, "user")
+
+    if not _ajouter_utilisateur(nouvel_utilisateur):
+        enregistrer_log(username, "creation_compte", False)
+        return None, "Ce nom d'utilisateur existe déjà."
+    enregistrer_log(username, "creation_compte", True)
+
+    return nouvel_utilisateur, "Compte créé avec succès."
+
+
+def _nouvel_utilisateur(username, mot_de_passe, role):
+    """Utilisateur prêt à enregistrer, mot de passe haché avec l'algorithme configuré."""
     # Générer salt et hacher le mot de passe
     salt = generer_salt()
-    password_hash = hacher_mot_de_passe(mot_de_passe, salt)
-
-    # Créer le nouvel utilisateur avec rôle "user" par défaut
-    nouvel_id = max([u["id"] for u in utilisateurs], default=0) + 1
-    nouvel_utilisateur = {
-        "id": nouvel_id,
+    description = hachage.description_courante()
+    return {
+        "id": None,
         "username": username,
-        "password_hash": password_hash,
+        "password_hash": hacher_mot_de_passe(mot_de_passe, salt, description),
         "salt": salt,
         "created_at": datetime.now().isoformat(),
-        "role": "user"
+        "role": role,
+        "hachage": description,
     }
 
-    utilisateurs.append(nouvel_utilisateur)
-    sauvegarder_utilisateurs(utilisateurs)
-    enregistrer_log(username, "creation_compte", True)
 
-    return nouvel_utilisateur, "Compte créé avec succès."
+def _ajouter_utilisateur(utilisateur):
+    """Enregistre un nouvel utilisateur ; False si le nom est déjà pris."""
+    with verrou_donnees():
+        # Revérifier sous verrou : une inscription concurrente a pu passer
+        if charger_utilisateur(utilisateur["username"]):
+            return False
+
+        if config.utilise_sqlite():
+            stockage_sqlite.ajouter_utilisateur(utilisateur)
+        else:
+            utilisateurs = charger_utilisateurs()
+            utilisateur["id"] = max([u["id"] for u in utilisateurs], default=0) + 1
+            utilisateurs.append(utilisateur)
+            sauvegarder_utilisateurs(utilisateurs)
+    return True
 
 
 def verifier_connexion(username, mot_de_passe):
     """Vérifie les identifiants de connexion."""
-    utilisateurs = charger_utilisateurs()
-    utilisateur = trouver_utilisateur(utilisateurs, username)
+    utilisateur = charger_utilisateur(username)
 
     if not utilisateur:
         enregistrer_log(username, "connexion", False)
         return None, "Utilisateur introuvable."
 
-    # Hacher le mot de passe saisi avec le salt stocké
-    hash_saisi = hacher_mot_de_passe(mot_de_passe, utilisateur["salt"])
-
-    # Comparaison sécurisée (temps constant)
-    if secrets.compare_digest(hash_saisi, utilisateur["password_hash"]):
+    # Hacher le mot de passe saisi avec le salt et l'algorithme stockés,
+    # puis comparer en temps constant
+    if hachage.verifier(mot_de_passe, utilisateur["salt"], utilisateur["password_hash"],
+                        utilisateur["hachage"]):
+        if hachage.doit_rehacher(utilisateur["hachage"]):
+            # Ancien hash (SHA-256 ou coût périmé) : le mot de passe en clair
+            # n'est disponible qu'ici, on en profite pour le rehacher
+            _rehacher(utilisateur, mot_de_passe)
         enregistrer_log(username, "connexion", True)
         return utilisateur, "Connexion réussie."
 
@@ -128,6 +207,31 @@ def verifier_connexion(username, mot_de_passe):
     return None, "Mot de passe incorrect."
 
 
+def _rehacher(utilisateur, mot_de_passe):
+    """Remplace le hash d'un utilisateur par un hash avec l'algorithme configuré."""
+    salt = generer_salt()
+    description = hachage.description_courante()
+    utilisateur.update({
+        "password_hash": hacher_mot_de_passe(mot_de_passe, salt, description),
+        "salt": salt,
+        "hachage": description,
+    })
+
+    if config.utilise_sqlite():
+        stockage_sqlite.changer_hash_utilisateur(
+            utilisateur["username"], utilisateur["password_hash"], salt, description
+        )
+        return
+
+    with verrou_donnees():
+        utilisateurs = charger_utilisateurs()
+        actuel = trouver_utilisateur(utilisateurs, utilisateur["username"])
+        if actuel:
+            actuel.update(password_hash=utilisateur["password_hash"], salt=salt,
+                          hachage=description)
+            sauvegarder_utilisateurs(utilisateurs)
+
+
 def valider_mot_de_passe(mot_de_passe):
     """Vérifie que le mot de passe respecte les règles de sécurité."""
     erreurs = []
@@ -148,22 +252,18 @@ def valider_mot_de_passe(mot_de_passe):
 
 
 def enregistrer_log(username, action, succes):
-    """Enregistre une action dans les logs."""
-    fichier_existe = os.path.exists(FICHIER_LOGS)
-
-    with open(FICHIER_LOGS, mode="a", encoding="utf-8", newline="") as fichier:
-        colonnes = ["timestamp", "username", "action", "succes"]
-        ecrivain = csv.DictWriter(fichier, fieldnames=colonnes)
-
-        if not fichier_existe:
-            ecrivain.writeheader()
-
-        ecrivain.writerow({
-            "timestamp": datetime.now().isoformat(),
-            "username": username,
-            "action": action,
-            "succes": succes
-        })
+    """
+    Enregistre une action dans les logs.
+    L'écriture est faite en arrière-plan, par lots (voir modules.logs).
+    """
+    _ecrivain_logs.ecrire({
+        "timestamp": datetime.now().isoformat(),
+        "username": username,
+        "action": action,
+        "succes": succes
+    })
+
+
 def creer_admin_initial():
     """Crée un compte administrateur par défaut si aucun admin n'existe."""
     utilisateurs = charger_utilisateurs()
@@ -174,14 +274,8 @@ def creer_admin_initial():
             return None, "Un compte administrateur existe déjà."
 
     # Créer un compte admin par défaut
-    admin = {
-        "id": max((u["id"] for u in utilisateurs), default=0) + 1,
-        "username": "admin",
-        "password": hacher_mot_de_passe("Admin123"),
-        "role": "admin",
-        "created_at": datetime.now().isoformat(timespec="seconds"),
-    }
-    utilisateurs.append(admin)
-    sauvegarder_utilisateurs(utilisateurs)
+    admin = _nouvel_utilisateur("admin", "Admin123", "admin")
+    if not _ajouter_utilisateur(admin):
+        return None, "Le nom d'utilisateur admin est déjà pris."
 
     return admin, "Compte administrateur initial créé avec succès."
@@ -1,94 +1,330 @@
 import csv
+import io
 import os
+from collections import defaultdict
 from datetime import datetime
 
+from modules import (agregats, config, instantanes, stockage_lignes,
+                     stockage_sqlite)
+from modules.fichiers import ecrire_csv_atomique, verrou_donnees
+from modules.index import ListeIndexee
 from modules.produits import (charger_produits, sauvegarder_produits,
                               trouver_produit)
 
 FICHIER_COMMANDES = "data/commandes.csv"
 FICHIER_LIGNES_COMMANDES = "data/lignes_commandes.csv"
+FICHIER_STATUTS_COMMANDES = "data/statuts_commandes.csv"
+
+COLONNES_COMMANDES = ["id", "username", "date", "statut", "total"]
+COLONNES_LIGNES_COMMANDES = ["id", "commande_id", "produit_id", "quantite", "prix_unitaire", "total"]
+COLONNES_STATUTS = ["commande_id", "statut", "date"]
+TYPES_COMMANDES = {"id": int, "username": str, "date": str, "statut": str, "total": float}
+TYPES_LIGNES_COMMANDES = {"id": int, "commande_id": int, "produit_id": int, "quantite": int,
+                          "prix_unitaire": float, "total": float}
+
+# Au-delà de cette taille, le journal des statuts est replié dans commandes.csv
+TAILLE_MAX_JOURNAL_STATUTS = 64 * 1024
 
 
 def charger_commandes(username=None):
     """Charge toutes les commandes depuis le CSV. Filtre par username si fourni."""
-    commandes = []
+    if config.utilise_sqlite():
+        return stockage_sqlite.charger_commandes(username)
+
+    try:
+        lues = instantanes.charger_csv(FICHIER_COMMANDES, COLONNES_COMMANDES, TYPES_COMMANDES,
+                                       _normaliser_commande)
+    except FileNotFoundError:
+        lues = []
+
+    commandes = ListeIndexee(cle="id")
+    for commande in lues:
+        # Filtrer par username si fourni
+        if username is None or commande["username"] == username:
+            commandes.append(commande)
+
+    # Appliquer les changements de statut du journal (le plus récent gagne)
+    for id_commande, statut in _lire_journal_statuts().items():
+        commande = commandes.obtenir(id_commande)
+        if commande:
+            commande["statut"] = statut
+    return commandes
+
+
+def _normaliser_commande(ligne):
+    """Convertit une ligne (CSV ou dict) en commande typée."""
+    return {
+        "id": int(ligne["id"]),
+        "username": ligne.get("username") or "",
+        "date": ligne["date"],
+        "statut": ligne["statut"],
+        "total": float(ligne["total"])
+    }
+
+
+def _lire_commandes_csv():
+    """Parcourt le CSV des commandes et produit des commandes typées (sans le journal)."""
     try:
         with open(FICHIER_COMMANDES, mode="r", encoding="utf-8") as fichier:
             lecteur = csv.DictReader(fichier)
             for ligne in lecteur:
-                commande = {
-                    "id": int(ligne["id"]),
-                    "username": ligne.get("username", ""),
-                    "date": ligne["date"],
-                    "statut": ligne["statut"],
-                    "total": float(ligne["total"])
-                }
-                
-                # Filtrer par username si fourni
-                if username is None or commande["username"] == username:
-                    commandes.append(commande)
+                yield _normaliser_commande(ligne)
+    except FileNotFoundError:
+        return
+
+
+def parcourir_commandes(depuis=None):
+    """
+    Parcourt les commandes une par une sans construire de liste (exports).
+    Si `depuis` (date ISO) est fourni, seules les commandes passées à partir
+    de cette date sont produites. Seul le journal des statuts, borné par la
+    compaction, est gardé en mémoire.
+    """
+    if config.utilise_sqlite():
+        yield from stockage_sqlite.parcourir_commandes(depuis)
+        return
+
+    statuts = _lire_journal_statuts()
+    for commande in _lire_commandes_csv():
+        if depuis is None or commande["date"] >= depuis:
+            commande["statut"] = statuts.get(commande["id"], commande["statut"])
+            yield commande
+
+
+def _lire_journal_statuts():
+    """Lit le journal des statuts : {commande_id: dernier statut}."""
+    statuts = {}
+    try:
+        with open(FICHIER_STATUTS_COMMANDES, mode="r", encoding="utf-8") as fichier:
+            for ligne in csv.DictReader(fichier):
+                statuts[int(ligne["commande_id"])] = ligne["statut"]
     except FileNotFoundError:
         pass
-    return commandes
+    return statuts
 
 
-def charger_lignes_commandes(commande_id=None):
-    """Charge les lignes de commandes (produits). Filtre par commande_id si fourni."""
-    lignes = []
+def _derniere_ligne(chemin):
+    """Retourne la dernière ligne non vide d'un fichier sans le lire en entier."""
     try:
-        with open(FICHIER_LIGNES_COMMANDES, mode="r", encoding="utf-8") as fichier:
-            lecteur = csv.DictReader(fichier)
-            for ligne in lecteur:
-                ligne_commande = {
-                    "id": int(ligne["id"]),
-                    "commande_id": int(ligne["commande_id"]),
-                    "produit_id": int(ligne["produit_id"]),
-                    "quantite": int(ligne["quantite"]),
-                    "prix_unitaire": float(ligne["prix_unitaire"]),
-                    "total": float(ligne["total"])
-                }
-                
-                # Filtrer par commande_id si fourni
-                if commande_id is None or ligne_commande["commande_id"] == commande_id:
-                    lignes.append(ligne_commande)
+        with open(chemin, mode="rb") as fichier:
+            fichier.seek(0, os.SEEK_END)
+            position = fichier.tell()
+            donnees = b""
+            while position > 0:
+                taille_bloc = min(4096, position)
+                position -= taille_bloc
+                fichier.seek(position)
+                donnees = fichier.read(taille_bloc) + donnees
+                lignes = donnees.rstrip(b"\r\n").split(b"\n")
+                if len(lignes) > 1 or position == 0:
+                    return lignes[-1].decode("utf-8").strip()
     except FileNotFoundError:
         pass
-    return lignes
+    return ""
+
+
+def _dernier_id(chemin):
+    """
+    Retourne l'ID de la dernière ligne d'un CSV (0 s'il est vide).
+    Les fichiers étant écrits par ajout avec des IDs croissants,
+    la dernière ligne porte le plus grand ID.
+    """
+    try:
+        return int(_derniere_ligne(chemin).split(",", 1)[0])
+    except ValueError:
+        return 0
+
+
+def _ajouter_au_csv(chemin, colonnes, lignes):
+    """
+    Ajoute des lignes à la fin d'un CSV (en-tête écrit si fichier vide).
+    Tout est écrit en un seul os.write terminé par une fin de ligne : un
+    lecteur d'un autre processus ne voit pas de ligne à moitié écrite.
+    """
+    tampon = io.StringIO(newline="")
+    ecrivain = csv.DictWriter(tampon, fieldnames=colonnes)
+    descripteur = os.open(chemin, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+    try:
+        if os.fstat(descripteur).st_size == 0:
+            ecrivain.writeheader()
+        ecrivain.writerows(lignes)
+        donnees = tampon.getvalue().encode("utf-8")
+        while donnees:
+            # os.write peut écrire partiellement (disque presque plein) : on écrit la suite
+            donnees = donnees[os.write(descripteur, donnees):]
+    finally:
+        os.close(descripteur)
+
+
+def trouver_commande(commandes, id_commande):
+    """Trouve une commande par son ID."""
+    if isinstance(commandes, ListeIndexee) and commandes.cle == "id":
+        return commandes.obtenir(id_commande)
+    for commande in commandes:
+        if commande["id"] == id_commande:
+            return commande
+    return None
+
+
+def _normaliser_ligne_commande(ligne):
+    """Convertit une ligne (CSV ou dict) en ligne de commande typée."""
+    return {
+        "id": int(ligne["id"]),
+        "commande_id": int(ligne["commande_id"]),
+        "produit_id": int(ligne["produit_id"]),
+        "quantite": int(ligne["quantite"]),
+        "prix_unitaire": float(ligne["prix_unitaire"]),
+        "total": float(ligne["total"])
+    }
+
+
+def _lire_lignes_commandes():
+    """Lit les lignes de commandes : instantané binaire s'il est à jour, sinon parse du CSV."""
+    if config.utilise_lignes_binaires():
+        return stockage_lignes.charger_lignes()
+    try:
+        return instantanes.charger_csv(FICHIER_LIGNES_COMMANDES, COLONNES_LIGNES_COMMANDES,
+                                       TYPES_LIGNES_COMMANDES, _normaliser_ligne_commande)
+    except FileNotFoundError:
+        return []
+
+
+def charger_lignes_commandes(commande_id=None):
+    """Charge les lignes de commandes (produits). Filtre par commande_id si fourni."""
+    if config.utilise_sqlite():
+        return stockage_sqlite.charger_lignes_commandes(commande_id)
+    if config.utilise_lignes_binaires() and commande_id is not None:
+        return stockage_lignes.charger_lignes_commande(commande_id)
+
+    return [
+        ligne for ligne in _lire_lignes_commandes()
+        if commande_id is None or ligne["commande_id"] == commande_id
+    ]
+
+
+def charger_lignes_par_commande(commande_ids=None):
+    """
+    Charge les lignes de commandes en une seule lecture du CSV,
+    regroupées par commande_id.
+
+    Args:
+        commande_ids: Ensemble d'IDs à conserver (toutes si None)
+
+    Returns:
+        dict: {commande_id: [lignes]}
+    """
+    if config.utilise_sqlite():
+        return stockage_sqlite.charger_lignes_par_commande(commande_ids)
+    if config.utilise_lignes_binaires():
+        return stockage_lignes.charger_lignes_par_commande(commande_ids)
+
+    if commande_ids is not None:
+        commande_ids = set(commande_ids)
+
+    lignes_par_commande = defaultdict(list)
+    for ligne in _lire_lignes_commandes():
+        if commande_ids is None or ligne["commande_id"] in commande_ids:
+            lignes_par_commande[ligne["commande_id"]].append(ligne)
+    return dict(lignes_par_commande)
+
+
+def ajouter_lignes_aux_commandes(commandes):
+    """Ajoute à chaque commande la clé "lignes" (une seule lecture du CSV)."""
+    lignes_par_commande = charger_lignes_par_commande(c["id"] for c in commandes)
+    for commande in commandes:
+        commande["lignes"] = lignes_par_commande.get(commande["id"], [])
+    return commandes
 
 
 def charger_commande_complete(commande_id):
     """Charge une commande avec toutes ses lignes de produits."""
-    commandes = charger_commandes()
-    commande = None
-    for c in commandes:
-        if c["id"] == commande_id:
-            commande = c.copy()
-            break
-    
+    if config.utilise_sqlite():
+        commande = stockage_sqlite.charger_commande(commande_id)
+    else:
+        commande = trouver_commande(charger_commandes(), commande_id)
+
     if not commande:
         return None
-    
+
     # Ajouter les lignes de produits
-    commande["lignes"] = charger_lignes_commandes(commande_id)
-    return commande
+    return ajouter_lignes_aux_commandes([commande.copy()])[0]
 
 
 def sauvegarder_commandes(commandes):
-    """Sauvegarde les commandes dans le CSV."""
-    with open(FICHIER_COMMANDES, mode="w", encoding="utf-8", newline="") as fichier:
-        colonnes = ["id", "username", "date", "statut", "total"]
-        ecrivain = csv.DictWriter(fichier, fieldnames=colonnes)
-        ecrivain.writeheader()
-        ecrivain.writerows(commandes)
+    """
+    Sauvegarde les commandes dans le CSV (réécriture complète).
+    Les statuts étant inclus, le journal des statuts est vidé.
+    Les agrégats de ventes seront reconstruits à la prochaine lecture.
+    """
+    with verrou_donnees():
+        if config.utilise_sqlite():
+            stockage_sqlite.sauvegarder_commandes(commandes)
+        else:
+            _ecrire_commandes(commandes)
+        agregats.invalider_agregats()
+
+
+def _ecrire_commandes(commandes):
+    """Réécrit commandes.csv et vide le journal des statuts (sous verrou)."""
+    commandes = [_normaliser_commande(c) for c in commandes]
+    ecrire_csv_atomique(FICHIER_COMMANDES, COLONNES_COMMANDES, commandes)
+    instantanes.ecrire_instantane(FICHIER_COMMANDES, COLONNES_COMMANDES, TYPES_COMMANDES, commandes)
+
+    if os.path.exists(FICHIER_STATUTS_COMMANDES):
+        os.remove(FICHIER_STATUTS_COMMANDES)
 
 
 def sauvegarder_lignes_commandes(lignes):
     """Sauvegarde les lignes de commandes dans le CSV."""
-    with open(FICHIER_LIGNES_COMMANDES, mode="w", encoding="utf-8", newline="") as fichier:
-        colonnes = ["id", "commande_id", "produit_id", "quantite", "prix_unitaire", "total"]
-        ecrivain = csv.DictWriter(fichier, fieldnames=colonnes)
-        ecrivain.writeheader()
-        ecrivain.writerows(lignes)
+    with verrou_donnees():
+        if config.utilise_sqlite():
+            stockage_sqlite.sauvegarder_lignes_commandes(lignes)
+        elif config.utilise_lignes_binaires():
+            stockage_lignes.sauvegarder_lignes(lignes)
+        else:
+            lignes = [_normaliser_ligne_commande(ligne) for ligne in lignes]
+            ecrire_csv_atomique(FICHIER_LIGNES_COMMANDES, COLONNES_LIGNES_COMMANDES, lignes)
+            instantanes.ecrire_instantane(FICHIER_LIGNES_COMMANDES, COLONNES_LIGNES_COMMANDES,
+                                          TYPES_LIGNES_COMMANDES, lignes)
+        agregats.invalider_agregats()
+
+
+def changer_statut_commande(id_commande, statut):
+    """
+    Enregistre un changement de statut dans le journal (ajout d'une ligne),
+    sans réécrire commandes.csv. Le journal est compacté quand il devient gros.
+    """
+    if config.utilise_sqlite():
+        stockage_sqlite.changer_statut_commande(id_commande, statut)
+        return
+
+    with verrou_donnees():
+        _journaliser_statuts([(id_commande, statut)])
+
+
+def _journaliser_statuts(changements):
+    """
+    Ajoute des changements de statut [(id_commande, statut)] au journal en une
+    seule écriture, puis le compacte s'il est devenu gros (sous verrou_donnees).
+    """
+    date = datetime.now().isoformat()
+    _ajouter_au_csv(FICHIER_STATUTS_COMMANDES, COLONNES_STATUTS, [
+        {"commande_id": id_commande, "statut": statut, "date": date}
+        for id_commande, statut in changements
+    ])
+
+    if os.path.getsize(FICHIER_STATUTS_COMMANDES) > TAILLE_MAX_JOURNAL_STATUTS:
+        compacter_journal_statuts()
+
+
+def compacter_journal_statuts():
+    """Replie le journal des statuts dans commandes.csv puis le vide."""
+    if config.utilise_sqlite():
+        return
+
+    # Les données ne changent pas : les agrégats restent valides
+    with verrou_donnees():
+        _ecrire_commandes(charger_commandes())
 
 
 def generer_id_commande(commandes):
@@ -118,22 +354,39 @@ def creer_commande(items_panier, username):
     """
     if not items_panier:
         return None, "Le panier est vide."
-    
+
+    # Vérification du stock et écriture sous le même verrou : pas de survente
+    with verrou_donnees():
+        if config.utilise_sqlite():
+            commande, message = stockage_sqlite.creer_commande(items_panier, username)
+        else:
+            commande, message = _creer_commande_csv(items_panier, username)
+
+        if commande:
+            agregats.enregistrer_creation(commande)
+    return commande, message
+
+
+def _creer_commande_csv(items_panier, username):
+    """Crée la commande dans les CSV (appelée sous verrou_donnees)."""
     produits = charger_produits()
-    
-    # Vérifier le stock pour tous les produits
+
+    # Vérifier le stock pour tous les produits (quantités cumulées par produit)
+    demandes = defaultdict(int)
     for item in items_panier:
         produit = trouver_produit(produits, item["produit_id"])
         if not produit:
             return None, f"Produit #{item['produit_id']} introuvable."
-        if produit["quantite"] < item["quantite"]:
+        demandes[produit["id"]] += item["quantite"]
+        if produit["quantite"] < demandes[produit["id"]]:
             return None, f"Stock insuffisant pour {produit['nom']}. Disponible : {produit['quantite']}"
-    
-    # Créer la commande principale
-    commandes = charger_commandes()
-    lignes_existantes = charger_lignes_commandes()
-    
-    commande_id = generer_id_commande(commandes)
+
+    # Nouveaux IDs lus à la fin des fichiers (pas de chargement complet)
+    commande_id = _dernier_id(FICHIER_COMMANDES) + 1
+    if config.utilise_lignes_binaires():
+        prochain_id_ligne = stockage_lignes.dernier_id() + 1
+    else:
+        prochain_id_ligne = _dernier_id(FICHIER_LIGNES_COMMANDES) + 1
     total_commande = 0
     nouvelles_lignes = []
     
@@ -145,7 +398,7 @@ def creer_commande(items_panier, username):
         
         # Créer la ligne
         nouvelle_ligne = {
-            "id": generer_id_ligne(lignes_existantes),
+            "id": prochain_id_ligne,
             "commande_id": commande_id,
             "produit_id": item["produit_id"],
             "quantite": item["quantite"],
@@ -153,7 +406,7 @@ def creer_commande(items_panier, username):
             "total": total_ligne
         }
         nouvelles_lignes.append(nouvelle_ligne)
-        lignes_existantes.append(nouvelle_ligne)
+        prochain_id_ligne += 1
         
         # Mettre à jour le stock
         produit["quantite"] -= item["quantite"]
@@ -167,10 +420,12 @@ def creer_commande(items_panier, username):
         "total": total_commande
     }
     
-    # Sauvegarder tout
-    commandes.append(nouvelle_commande)
-    sauvegarder_commandes(commandes)
-    sauvegarder_lignes_commandes(lignes_existantes)
+    # Sauvegarder tout : commande et lignes ajoutées en fin de fichier
+    _ajouter_au_csv(FICHIER_COMMANDES, COLONNES_COMMANDES, [nouvelle_commande])
+    if config.utilise_lignes_binaires():
+        stockage_lignes.ajouter_lignes(nouvelles_lignes)
+    else:
+        _ajouter_au_csv(FICHIER_LIGNES_COMMANDES, COLONNES_LIGNES_COMMANDES, nouvelles_lignes)
     sauvegarder_produits(produits)
     
     # Retourner la commande complète avec ses lignes
@@ -180,14 +435,24 @@ def creer_commande(items_panier, username):
 
 def annuler_commande(id_commande):
     """Annule une commande et restaure le stock de tous les produits."""
+    with verrou_donnees():
+        commande = charger_commande_complete(id_commande)
+
+        if config.utilise_sqlite():
+            succes, message = stockage_sqlite.annuler_commande(id_commande)
+        else:
+            succes, message = _annuler_commande_csv(id_commande)
+
+        if succes:
+            agregats.enregistrer_annulation(commande, commande["lignes"], commande["statut"])
+    return succes, message
+
+
+def _annuler_commande_csv(id_commande):
+    """Annule la commande dans les CSV (appelée sous verrou_donnees)."""
     commandes = charger_commandes()
-    
-    commande = None
-    for c in commandes:
-        if c["id"] == id_commande:
-            commande = c
-            break
-    
+    commande = trouver_commande(commandes, id_commande)
+
     if not commande:
         return False, "Commande introuvable."
     
@@ -206,22 +471,131 @@ def annuler_commande(id_commande):
     sauvegarder_produits(produits)
     
     # Mettre à jour le statut
-    commande["statut"] = "annulee"
-    sauvegarder_commandes(commandes)
+    changer_statut_commande(id_commande, "annulee")
     
     return True, "Commande annulée."
 
 
 def valider_commande(id_commande):
     """Valide une commande."""
+    with verrou_donnees():
+        if config.utilise_sqlite():
+            succes, message = stockage_sqlite.valider_commande(id_commande)
+        else:
+            succes, message = _valider_commande_csv(id_commande)
+
+        if succes:
+            commande = charger_commande_complete(id_commande)
+            agregats.enregistrer_validation(commande, commande["lignes"])
+    return succes, message
+
+
+def _valider_commande_csv(id_commande):
+    """Valide la commande dans les CSV (appelée sous verrou_donnees)."""
+    commande = trouver_commande(charger_commandes(), id_commande)
+
+    if not commande:
+        return False, "Commande introuvable."
+
+    if commande["statut"] != "en_attente":
+        return False, "Cette commande ne peut pas être validée."
+
+    changer_statut_commande(id_commande, "validee")
+    return True, "Commande validée."
+
+
+def traiter_commandes(operations):
+    """
+    Valide ou annule plusieurs commandes en un seul passage.
+
+    Args:
+        operations: Liste de (id_commande, action), action valant "valider"
+            ou "annuler", appliquées dans l'ordre
+
+    Returns:
+        list: Un dict {id, action, succes, message} par opération
+
+    Chaque fichier (journal des statuts, produits, agrégats) n'est écrit
+    qu'une fois pour tout le lot, au lieu d'une fois par commande.
+    """
+    with verrou_donnees():
+        lignes_par_commande = charger_lignes_par_commande({id_commande for id_commande, _ in operations})
+        if config.utilise_sqlite():
+            resultats, traitees = stockage_sqlite.traiter_commandes(operations)
+        else:
+            resultats, traitees = _traiter_commandes_csv(operations, lignes_par_commande)
+
+        agregats.enregistrer_traitements([
+            (action, commande, lignes_par_commande.get(commande["id"], []), ancien_statut)
+            for action, commande, ancien_statut in traitees
+        ])
+
+    return [
+        {"id": id_commande, "action": action, "succes": succes, "message": message}
+        for (id_commande, action), (succes, message) in zip(operations, resultats)
+    ]
+
+
+def _verifier_operation(commande, action):
+    """Indique si l'action ("valider" ou "annuler") s'applique à la commande : (possible, message)."""
+    if not commande:
+        return False, "Commande introuvable."
+    if action == "valider":
+        if commande["statut"] != "en_attente":
+            return False, "Cette commande ne peut pas être validée."
+    elif commande["statut"] == "annulee":
+        return False, "Commande déjà annulée."
+    return True, None
+
+
+def _appliquer_operation(commande, action, lignes, produits):
+    """
+    Change le statut de la commande en mémoire ; une annulation restaure le
+    stock des `lignes` dans `produits`. Retourne le message de succès.
+    """
+    if action == "valider":
+        commande["statut"] = "validee"
+        return "Commande validée."
+
+    # Restaurer le stock pour toutes les lignes
+    for ligne in lignes:
+        produit = trouver_produit(produits, ligne["produit_id"])
+        if produit:
+            produit["quantite"] += ligne["quantite"]
+    commande["statut"] = "annulee"
+    return "Commande annulée."
+
+
+def _traiter_commandes_csv(operations, lignes_par_commande):
+    """
+    Applique les opérations aux commandes en mémoire puis écrit le journal des
+    statuts et les produits une seule fois (appelée sous verrou_donnees).
+    Retourne (résultats, traitées) : un (succès, message) par opération et les
+    (action, commande, ancien_statut) réussies.
+    """
     commandes = charger_commandes()
-    
-    for c in commandes:
-        if c["id"] == id_commande:
-            if c["statut"] != "en_attente":
-                return False, "Cette commande ne peut pas être validée."
-            c["statut"] = "validee"
-            sauvegarder_commandes(commandes)
-            return True, "Commande validée."
-    
-    return False, "Commande introuvable."
+    produits = None
+    resultats, traitees, changements = [], [], []
+
+    for id_commande, action in operations:
+        commande = trouver_commande(commandes, id_commande)
+        possible, message = _verifier_operation(commande, action)
+        if not possible:
+            resultats.append((False, message))
+            continue
+
+        # Les produits ne sont chargés qu'à la première annulation
+        if action != "valider" and produits is None:
+            produits = charger_produits()
+        ancien_statut = commande["statut"]
+        message = _appliquer_operation(commande, action, lignes_par_commande.get(id_commande, []),
+                                       produits)
+        resultats.append((True, message))
+        changements.append((id_commande, commande["statut"]))
+        traitees.append((action, dict(commande), ancien_statut))
+
+    if changements:
+        _journaliser_statuts(changements)
+    if produits is not None:
+        sauvegarder_produits(produits)
+    return resultats, traitees
@@ -0,0 +1,39 @@
+import os
+
+# Backend de stockage : "csv" (fichiers du dossier data/, par défaut) ou "sqlite"
+BACKEND_STOCKAGE = os.environ.get("BACKEND_STOCKAGE", "csv")
+
+# Base SQLite utilisée quand BACKEND_STOCKAGE vaut "sqlite"
+FICHIER_BASE_SQLITE = os.environ.get("FICHIER_BASE_SQLITE", "data/boutique.db")
+
+
+# Stockage des lignes de commandes avec le backend CSV : "csv" (par défaut) ou
+# "binaire" (enregistrements de taille fixe lus par mmap, voir modules.stockage_lignes).
+# migrate_lignes_binaires.py copie les lignes du CSV avant d'activer "binaire".
+STOCKAGE_LIGNES = os.environ.get("STOCKAGE_LIGNES", "csv")
+FICHIER_LIGNES_BINAIRES = os.environ.get("FICHIER_LIGNES_BINAIRES", "data/lignes_commandes.dat")
+
+
+def utilise_sqlite():
+    """Indique si le backend SQLite est actif."""
+    return BACKEND_STOCKAGE == "sqlite"
+
+
+def utilise_lignes_binaires():
+    """Indique si les lignes de commandes sont dans le stockage binaire."""
+    return not utilise_sqlite() and STOCKAGE_LIGNES == "binaire"
+
+
+# Hachage des nouveaux mots de passe : algorithme et coût (voir modules.hachage),
+# par ex. "scrypt:n=16384,r=8,p=1" ou "pbkdf2_sha256:iterations=600000".
+# benchmarks/bench_hachage.py aide à choisir le coût pour une latence cible.
+ALGORITHME_HACHAGE = os.environ.get("ALGORITHME_HACHAGE", "scrypt:n=16384,r=8,p=1")
+
+# Nombre de processus dédiés au hachage des mots de passe (0 : dans le thread appelant)
+PROCESSUS_HACHAGE = int(os.environ.get("PROCESSUS_HACHAGE", "0"))
+
+# Attente maximale (s) d'une place dans le pool de hachage avant de refuser la requête
+DELAI_ATTENTE_HACHAGE = float(os.environ.get("DELAI_ATTENTE_HACHAGE", "5"))
+
+# Instantanés binaires des CSV (data/*.bin) pour des chargements rapides ; "0" pour les désactiver
+INSTANTANES_BINAIRES = os.environ.get("INSTANTANES_BINAIRES", "1") != "0"
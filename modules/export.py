@@ -0,0 +1,51 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+
+# Taille des morceaux envoyés au client
+TAILLE_MORCEAU = 64 * 1024
+
+
+def normaliser_depuis(depuis):
+    """
+    Valide le paramètre since= (date ou date-heure ISO) et le met au format
+    des dates stockées, pour pouvoir les comparer comme des chaînes.
+    Retourne None si absent, lève ValueError s'il est invalide.
+    """
+    if not depuis:
+        return None
+    return datetime.fromisoformat(depuis).isoformat()
+
+
+def flux_csv(colonnes, lignes, compresser=False):
+    """
+    Sérialise les lignes (dicts) en CSV au fil de l'eau et produit des
+    morceaux d'octets d'environ TAILLE_MORCEAU : la mémoire utilisée ne
+    dépend pas du nombre de lignes. Avec compresser=True, les morceaux
+    forment un flux gzip.
+    """
+    tampon = io.StringIO()
+    ecrivain = csv.DictWriter(tampon, fieldnames=colonnes, extrasaction="ignore")
+    # wbits=31 : en-tête et somme de contrôle gzip
+    compresseur = zlib.compressobj(6, zlib.DEFLATED, 31) if compresser else None
+
+    def vider():
+        donnees = tampon.getvalue().encode("utf-8")
+        tampon.seek(0)
+        tampon.truncate()
+        return compresseur.compress(donnees) if compresseur else donnees
+
+    ecrivain.writeheader()
+    for ligne in lignes:
+        ecrivain.writerow(ligne)
+        if tampon.tell() >= TAILLE_MORCEAU:
+            morceau = vider()
+            if morceau:
+                yield morceau
+
+    morceau = vider()
+    if compresseur:
+        morceau += compresseur.flush()
+    if morceau:
+        yield morceau
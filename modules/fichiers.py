@@ -0,0 +1,136 @@
+import csv
+import json
+import os
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Fichier verrou partagé par tous les processus qui modifient data/
+FICHIER_VERROU = "data/.donnees.lock"
+
+# L'umask ne se lit qu'en le remplaçant : lu une fois au chargement, avant que
+# d'autres threads ne créent des fichiers
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+_verrou_threads = threading.RLock()
+_etat_verrou = {"profondeur": 0, "fichier": None}
+
+
+def signature_fichier(chemin):
+    """Retourne (inode, mtime en ns, taille) du fichier, ou None s'il n'existe pas."""
+    try:
+        etat = os.stat(chemin)
+    except FileNotFoundError:
+        return None
+    # L'inode change à chaque écriture atomique (renommage d'un fichier temporaire)
+    return (etat.st_ino, etat.st_mtime_ns, etat.st_size)
+
+
+def _mode_fichier(chemin):
+    """Droits du fichier existant, ou ceux d'un fichier créé par open() (0666 moins l'umask)."""
+    try:
+        return stat.S_IMODE(os.stat(chemin).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def _remplacer_atomiquement(chemin, ecrire, binaire=False):
+    """
+    Écrit le contenu via ecrire(fichier) dans un fichier temporaire du même
+    dossier, puis le renomme sur la cible : un lecteur voit soit l'ancien
+    fichier, soit le nouveau, jamais un fichier à moitié écrit.
+    """
+    dossier = os.path.dirname(chemin) or "."
+    mode = _mode_fichier(chemin)
+    descripteur, temporaire = tempfile.mkstemp(dir=dossier, prefix=".", suffix=".tmp")
+    if binaire:
+        fichier = os.fdopen(descripteur, mode="wb")
+    else:
+        fichier = os.fdopen(descripteur, mode="w", encoding="utf-8", newline="")
+    try:
+        with fichier:
+            ecrire(fichier)
+            fichier.flush()
+            os.fsync(fichier.fileno())
+        # mkstemp crée le fichier en 0600 : on garde les droits de la cible
+        os.chmod(temporaire, mode)
+        os.replace(temporaire, chemin)
+    except BaseException:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+        raise
+
+
+def ecrire_csv_atomique(chemin, colonnes, lignes, extrasaction="raise"):
+    """Écrit un CSV complet (en-tête + lignes) de façon atomique."""
+    def ecrire(fichier):
+        ecrivain = csv.DictWriter(fichier, fieldnames=colonnes, extrasaction=extrasaction)
+        ecrivain.writeheader()
+        ecrivain.writerows(lignes)
+
+    _remplacer_atomiquement(chemin, ecrire)
+
+
+def ecrire_binaire_atomique(chemin, donnees):
+    """Écrit un contenu binaire (bytes) de façon atomique."""
+    _remplacer_atomiquement(chemin, lambda fichier: fichier.write(donnees), binaire=True)
+
+
+def ecrire_json_atomique(chemin, donnees):
+    """Écrit un document JSON de façon atomique."""
+    _remplacer_atomiquement(
+        chemin, lambda fichier: json.dump(donnees, fichier, ensure_ascii=False)
+    )
+
+
+def _verrouiller(fichier):
+    if fcntl:
+        fcntl.flock(fichier.fileno(), fcntl.LOCK_EX)
+    else:
+        fichier.seek(0)
+        msvcrt.locking(fichier.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _deverrouiller(fichier):
+    if fcntl:
+        fcntl.flock(fichier.fileno(), fcntl.LOCK_UN)
+    else:
+        fichier.seek(0)
+        msvcrt.locking(fichier.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def verrou_donnees():
+    """
+    Verrou exclusif autour d'un cycle lecture-modification-écriture des données.
+    Protège à la fois contre les autres threads et les autres processus
+    (workers Flask). Réentrant dans un même thread.
+    """
+    with _verrou_threads:
+        if _etat_verrou["profondeur"] == 0:
+            fichier = open(FICHIER_VERROU, mode="a+", encoding="utf-8")
+            try:
+                _verrouiller(fichier)
+            except BaseException:
+                fichier.close()
+                raise
+            _etat_verrou["fichier"] = fichier
+        _etat_verrou["profondeur"] += 1
+
+        try:
+            yield
+        finally:
+            _etat_verrou["profondeur"] -= 1
+            if _etat_verrou["profondeur"] == 0:
+                fichier = _etat_verrou["fichier"]
+                _etat_verrou["fichier"] = None
+                _deverrouiller(fichier)
+                fichier.close()
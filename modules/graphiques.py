@@ -0,0 +1,117 @@
+# Graphiques des statistiques de ventes. matplotlib et seaborn sont lents à
+# charger et gourmands en mémoire : ce module n'est importé qu'à l'appel des
+# fonctions graphique_* de modules.stats, jamais au démarrage de l'API.
+import io
+
+import matplotlib.pyplot as plt
+import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from modules.stats import get_evolution_ventes_json, top_produits
+
+TAILLE_FIGURE = (10, 6)
+
+
+def _dessiner_top_produits(axes, top):
+    noms = [p["nom"] for p in top]
+    quantites = [p["quantite_vendue"] for p in top]
+
+    sns.barplot(x=quantites, y=noms, palette="viridis", ax=axes)
+    axes.set_xlabel("Quantité vendue")
+    axes.set_ylabel("Produit")
+    axes.set_title("Top 5 des produits les plus vendus")
+
+
+def _dessiner_revenus(axes, top):
+    noms = [p["nom"] for p in top]
+    revenus = [p["revenus"] for p in top]
+
+    colors = sns.color_palette("Blues_r", len(noms))
+    axes.pie(
+        revenus,
+        labels=noms,
+        autopct="%1.1f%%",
+        colors=colors,
+        startangle=90)
+    axes.set_title("Répartition du chiffre d'affaires par produit")
+
+
+def _dessiner_evolution_ventes(axes, evolution):
+    axes.plot(evolution["dates"], evolution["totaux"], marker="o", linewidth=2, markersize=8)
+    axes.set_xlabel("Date")
+    axes.set_ylabel("Chiffre d'affaires (€)")
+    axes.set_title("Évolution des ventes")
+    axes.tick_params(axis="x", labelrotation=45)
+    axes.grid(True, alpha=0.3)
+
+
+# Graphiques disponibles : nom -> fonction de dessin (axes, données)
+DESSINS = {
+    "top-produits": _dessiner_top_produits,
+    "revenus-par-produit": _dessiner_revenus,
+    "evolution-ventes": _dessiner_evolution_ventes,
+}
+
+
+def rendre_graphique(nom, format_image, donnees):
+    """
+    Dessine le graphique `nom` avec les données fournies et retourne l'image
+    (format_image : "png" ou "svg") en octets. Utilise une Figure autonome
+    rendue par Agg, sans l'état global de pyplot ni affichage : fonctionne
+    sur un serveur sans écran.
+    """
+    figure = Figure(figsize=TAILLE_FIGURE)
+    FigureCanvasAgg(figure)
+    axes = figure.subplots()
+    if not donnees or (isinstance(donnees, dict) and not donnees["dates"]):
+        axes.axis("off")
+        axes.text(0.5, 0.5, "Aucune donnée à afficher.", ha="center", va="center")
+    else:
+        DESSINS[nom](axes, donnees)
+    figure.tight_layout()
+
+    tampon = io.BytesIO()
+    figure.savefig(tampon, format=format_image)
+    return tampon.getvalue()
+
+
+def _afficher(nom, donnees):
+    """Dessine le graphique avec pyplot et l'affiche (usage en ligne de commande)."""
+    _figure, axes = plt.subplots(figsize=TAILLE_FIGURE)
+    DESSINS[nom](axes, donnees)
+    plt.tight_layout()
+    plt.show()
+
+
+def graphique_top_produits():
+    """Génère un graphique des produits les plus vendus."""
+    top = top_produits(5)
+
+    if not top:
+        print("Aucune donnée à afficher.")
+        return
+
+    _afficher("top-produits", top)
+
+
+def graphique_revenus():
+    """Génère un graphique des revenus par produit."""
+    top = top_produits(5)
+
+    if not top:
+        print("Aucune donnée à afficher.")
+        return
+
+    _afficher("revenus-par-produit", top)
+
+
+def graphique_evolution_ventes():
+    """Génère un graphique de l'évolution des ventes."""
+    evolution = get_evolution_ventes_json()
+
+    if not evolution["dates"]:
+        print("Aucune donnée à afficher.")
+        return
+
+    _afficher("evolution-ventes", evolution)
@@ -0,0 +1,138 @@
+import atexit
+import hashlib
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from modules import config
+
+# Algorithme historique : un seul SHA-256 de mot_de_passe + salt.
+# Il n'est plus utilisé que pour vérifier les anciens comptes, rehachés à la connexion.
+ALGORITHME_HISTORIQUE = "sha256"
+
+
+def _sha256(mot_de_passe, salt, _parametres):
+    return hashlib.sha256((mot_de_passe + salt).encode()).hexdigest()
+
+
+def _pbkdf2_sha256(mot_de_passe, salt, parametres):
+    return hashlib.pbkdf2_hmac(
+        "sha256", mot_de_passe.encode(), salt.encode(), parametres["iterations"]
+    ).hex()
+
+
+def _scrypt(mot_de_passe, salt, parametres):
+    n, r, p = parametres["n"], parametres["r"], parametres["p"]
+    return hashlib.scrypt(
+        mot_de_passe.encode(), salt=salt.encode(), n=n, r=r, p=p,
+        # Mémoire nécessaire (128 * n * r octets) plus une marge
+        maxmem=256 * n * r + 1024 * 1024, dklen=32,
+    ).hex()
+
+
+class HachageSurcharge(RuntimeError):
+    """Trop de hachages en attente dans le pool de processus."""
+
+
+# Fonctions de hachage disponibles : nom -> (fonction, paramètres par défaut)
+HACHEURS = {
+    ALGORITHME_HISTORIQUE: (_sha256, {}),
+    "pbkdf2_sha256": (_pbkdf2_sha256, {"iterations": 600000}),
+    "scrypt": (_scrypt, {"n": 16384, "r": 8, "p": 1}),
+}
+
+
+def decrire(algorithme, parametres):
+    """Description stockée avec le hash : "scrypt:n=16384,r=8,p=1"."""
+    if not parametres:
+        return algorithme
+    valeurs = ",".join(f"{cle}={valeur}" for cle, valeur in parametres.items())
+    return f"{algorithme}:{valeurs}"
+
+
+def lire_description(description):
+    """Retourne (algorithme, paramètres) ; une description vide désigne l'algorithme historique."""
+    algorithme, _, valeurs = (description or ALGORITHME_HISTORIQUE).partition(":")
+    if algorithme not in HACHEURS:
+        raise ValueError(f"Algorithme de hachage inconnu : {algorithme}")
+
+    parametres = dict(HACHEURS[algorithme][1])
+    for couple in filter(None, valeurs.split(",")):
+        cle, _, valeur = couple.partition("=")
+        parametres[cle.strip()] = int(valeur)
+    return algorithme, parametres
+
+
+def description_courante():
+    """Description de l'algorithme et du coût configurés pour les nouveaux hash."""
+    algorithme, parametres = lire_description(config.ALGORITHME_HACHAGE)
+    return decrire(algorithme, parametres)
+
+
+def _hacher_local(mot_de_passe, salt, description):
+    """Calcule le hash dans le processus courant (aussi exécuté par les processus du pool)."""
+    algorithme, parametres = lire_description(description)
+    fonction, _defauts = HACHEURS[algorithme]
+    return fonction(mot_de_passe, salt, parametres)
+
+
+# Pool de processus pour les hachages coûteux (config.PROCESSUS_HACHAGE > 0).
+# Le sémaphore borne le nombre de hachages en cours ou en attente.
+_pool = {"executeur": None, "places": None, "pid": None}
+_verrou_pool = threading.Lock()
+
+
+def _pool_hachage():
+    """Retourne (exécuteur, sémaphore), créés à la demande dans chaque processus."""
+    with _verrou_pool:
+        if _pool["executeur"] is None or _pool["pid"] != os.getpid():
+            processus = config.PROCESSUS_HACHAGE
+            _pool["executeur"] = ProcessPoolExecutor(max_workers=processus)
+            _pool["places"] = threading.BoundedSemaphore(processus * 4)
+            _pool["pid"] = os.getpid()
+        return _pool["executeur"], _pool["places"]
+
+
+def arreter_pool_hachage():
+    """Arrête les processus du pool (appelé à la sortie du programme)."""
+    with _verrou_pool:
+        executeur = _pool["executeur"]
+        if executeur is not None and _pool["pid"] == os.getpid():
+            executeur.shutdown(wait=True, cancel_futures=True)
+        _pool["executeur"] = None
+
+
+atexit.register(arreter_pool_hachage)
+
+
+def hacher(mot_de_passe, salt, description=None):
+    """
+    Hache un mot de passe avec son salt selon `description` (par défaut : la configuration).
+
+    Si config.PROCESSUS_HACHAGE > 0, le calcul est fait dans un pool de
+    processus : un hachage coûteux n'occupe alors qu'un des processus du
+    pool, pas les cœurs qui servent le reste de l'API. Lève HachageSurcharge
+    si trop de hachages attendent déjà depuis DELAI_ATTENTE_HACHAGE secondes.
+    """
+    description = description or description_courante()
+    if config.PROCESSUS_HACHAGE <= 0 or description == ALGORITHME_HISTORIQUE:
+        return _hacher_local(mot_de_passe, salt, description)
+
+    executeur, places = _pool_hachage()
+    if not places.acquire(timeout=config.DELAI_ATTENTE_HACHAGE):
+        raise HachageSurcharge("Trop de hachages en attente")
+    try:
+        return executeur.submit(_hacher_local, mot_de_passe, salt, description).result()
+    finally:
+        places.release()
+
+
+def verifier(mot_de_passe, salt, hash_attendu, description):
+    """Compare le hash du mot de passe saisi au hash stocké (temps constant)."""
+    return secrets.compare_digest(hacher(mot_de_passe, salt, description), hash_attendu)
+
+
+def doit_rehacher(description):
+    """Indique si un hash stocké n'utilise pas l'algorithme ou le coût configurés."""
+    return decrire(*lire_description(description)) != description_courante()
@@ -0,0 +1,191 @@
+import bisect
+import heapq
+import math
+import re
+import unicodedata
+
+
+class ListeIndexee(list):
+    """
+    Liste d'enregistrements (dicts) avec un index clé -> enregistrement.
+
+    Se comporte comme une liste classique (itération, len, slicing, JSON)
+    mais permet une recherche en temps constant via obtenir().
+    L'index est tenu à jour par les méthodes de mutation de la liste.
+    La valeur de la clé d'un enregistrement ne doit pas être modifiée
+    sur place (sinon appeler reindexer()).
+    """
+
+    def __init__(self, elements=(), cle="id"):
+        super().__init__(elements)
+        self.cle = cle
+        self.reindexer()
+
+    def reindexer(self):
+        """Reconstruit l'index complet (premier enregistrement gagnant)."""
+        self._index = {}
+        for element in self:
+            self._index.setdefault(element[self.cle], element)
+
+    def obtenir(self, valeur):
+        """Retourne l'enregistrement dont la clé vaut `valeur`, ou None."""
+        return self._index.get(valeur)
+
+    def contient_cle(self, valeur):
+        """Indique si un enregistrement possède cette clé."""
+        return valeur in self._index
+
+    def _indexer(self, element):
+        self._index.setdefault(element[self.cle], element)
+
+    def _desindexer(self, element):
+        valeur = element[self.cle]
+        if self._index.get(valeur) is element:
+            del self._index[valeur]
+            # Un doublon éventuel de la même clé reprend la place
+            for autre in self:
+                if autre[self.cle] == valeur:
+                    self._index[valeur] = autre
+                    break
+
+    # ---------- Mutations maintenant l'index ----------
+
+    def append(self, element):
+        super().append(element)
+        self._indexer(element)
+
+    def extend(self, elements):
+        elements = list(elements)
+        super().extend(elements)
+        for element in elements:
+            self._indexer(element)
+
+    def __iadd__(self, elements):
+        self.extend(elements)
+        return self
+
+    def insert(self, position, element):
+        super().insert(position, element)
+        self._indexer(element)
+
+    def remove(self, element):
+        super().remove(element)
+        self._desindexer(element)
+
+    def pop(self, position=-1):
+        element = super().pop(position)
+        self._desindexer(element)
+        return element
+
+    def clear(self):
+        super().clear()
+        self._index = {}
+
+    def __setitem__(self, position, valeur):
+        super().__setitem__(position, valeur)
+        self.reindexer()
+
+    def __delitem__(self, position):
+        super().__delitem__(position)
+        self.reindexer()
+
+
+def normaliser_texte(texte):
+    """Minuscules sans accents ("Écran" -> "ecran"), pour comparer et indexer."""
+    decompose = unicodedata.normalize("NFKD", texte)
+    return "".join(c for c in decompose if not unicodedata.combining(c)).casefold()
+
+
+def decouper_mots(texte):
+    """Mots normalisés d'un texte (lettres et chiffres)."""
+    return re.findall(r"\w+", normaliser_texte(texte))
+
+
+class IndexTexte:
+    """
+    Index inversé plein texte : mot normalisé -> {document: poids}.
+
+    Chaque document est un ensemble de champs pondérés (ex. nom plus important
+    que description). Les mots sont aussi gardés dans une liste triée, ce qui
+    permet de trouver par bisection tous les mots commençant par un préfixe.
+    ajouter() et supprimer() mettent l'index à jour sans le reconstruire.
+    """
+
+    def __init__(self, poids_champs):
+        self.poids_champs = poids_champs
+        self._postings = {}
+        self._mots_tries = []
+        self._mots_document = {}
+
+    def __len__(self):
+        return len(self._mots_document)
+
+    def ajouter(self, id_document, document):
+        """Indexe (ou réindexe) un document : {champ: texte}."""
+        self.supprimer(id_document)
+
+        poids_mots = {}
+        for champ, poids in self.poids_champs.items():
+            for mot in decouper_mots(str(document.get(champ) or "")):
+                poids_mots[mot] = poids_mots.get(mot, 0) + poids
+
+        for mot, poids in poids_mots.items():
+            documents = self._postings.get(mot)
+            if documents is None:
+                documents = self._postings[mot] = {}
+                bisect.insort(self._mots_tries, mot)
+            documents[id_document] = poids
+        self._mots_document[id_document] = list(poids_mots)
+
+    def supprimer(self, id_document):
+        """Retire un document de l'index (sans effet s'il n'y est pas)."""
+        for mot in self._mots_document.pop(id_document, ()):
+            documents = self._postings[mot]
+            del documents[id_document]
+            if not documents:
+                del self._postings[mot]
+                del self._mots_tries[bisect.bisect_left(self._mots_tries, mot)]
+
+    def _mots_prefixes(self, prefixe):
+        debut = bisect.bisect_left(self._mots_tries, prefixe)
+        fin = bisect.bisect_left(self._mots_tries, prefixe + "\U0010ffff")
+        return self._mots_tries[debut:fin]
+
+    def rechercher(self, requete, limite=20):
+        """
+        Documents contenant tous les mots de la requête (chaque mot pouvant
+        être le début d'un mot indexé), classés par pertinence décroissante.
+
+        Score d'un mot de la requête : poids du champ x rareté du mot (idf),
+        un mot complet comptant double par rapport à un simple préfixe.
+        Retourne une liste de (id_document, score).
+        """
+        mots = decouper_mots(requete)
+        if not mots:
+            return []
+
+        total = len(self._mots_document)
+        scores = None
+        for mot_requete in mots:
+            scores_mot = {}
+            for mot in self._mots_prefixes(mot_requete):
+                documents = self._postings[mot]
+                idf = math.log(1 + total / len(documents))
+                bonus = 2.0 if mot == mot_requete else 1.0
+                for id_document, poids in documents.items():
+                    score = poids * idf * bonus
+                    if score > scores_mot.get(id_document, 0):
+                        scores_mot[id_document] = score
+
+            if scores is None:
+                scores = scores_mot
+            else:
+                # Tous les mots de la requête doivent être présents
+                scores = {
+                    id_document: score + scores_mot[id_document]
+                    for id_document, score in scores.items() if id_document in scores_mot
+                }
+            if not scores:
+                return []
+
+        return heapq.nlargest(limite, scores.items(), key=lambda item: item[1])
@@ -0,0 +1,194 @@
+import csv
+import gc
+import hashlib
+import io
+import os
+import struct
+import sys
+from array import array
+
+from modules import config
+from modules.fichiers import ecrire_binaire_atomique
+
+# Format d'un instantané (data/<nom>.bin), petit-boutiste :
+#   en-tête : magique, inode, mtime (ns) et taille du CSV couvert, empreinte
+#             BLAKE2b de ces octets du CSV, nombre de lignes, taille du schéma
+#   schéma  : "id:q,nom:s,prix:d,..." (UTF-8)
+#   colonnes: pour chacune, sa taille en octets puis ses données :
+#             entiers "q" (int64) et réels "d" (float64) en tableaux,
+#             textes "s" joints par un caractère NUL en UTF-8.
+MAGIQUE = b"INSTANT1"
+EN_TETE = struct.Struct("<8sQqQ32sQI")
+TAILLE_COLONNE = struct.Struct("<Q")
+SEPARATEUR = "\x00"
+
+# Types Python des colonnes -> code de stockage
+CODES_TYPES = {int: "q", float: "d", str: "s"}
+
+# Au-delà de ce nombre d'octets ajoutés au CSV depuis l'instantané, il est réécrit
+TAILLE_MAX_QUEUE = 256 * 1024
+
+
+def chemin_instantane(chemin_csv):
+    """data/produits.csv -> data/produits.bin"""
+    return os.path.splitext(chemin_csv)[0] + ".bin"
+
+
+def _schema(colonnes, types):
+    return ",".join(f"{colonne}:{CODES_TYPES[types[colonne]]}" for colonne in colonnes).encode()
+
+
+def _empreinte(donnees=b""):
+    return hashlib.blake2b(donnees, digest_size=32)
+
+
+def _encoder_colonne(code, valeurs):
+    if code == "s":
+        texte = SEPARATEUR.join(valeurs)
+        if texte.count(SEPARATEUR) != max(len(valeurs) - 1, 0):
+            raise ValueError("Valeur contenant un caractère NUL")
+        return texte.encode("utf-8")
+
+    tableau = array(code, valeurs)
+    if sys.byteorder != "little":
+        tableau.byteswap()
+    return tableau.tobytes()
+
+
+def _decoder_colonne(code, donnees, nombre_lignes):
+    if code == "s":
+        return str(donnees, "utf-8").split(SEPARATEUR) if nombre_lignes else []
+
+    tableau = array(code)
+    tableau.frombytes(donnees)
+    if sys.byteorder != "little":
+        tableau.byteswap()
+    return tableau
+
+
+def _ecrire_fichier(chemin_csv, colonnes, types, lignes, signature, empreinte):
+    """Écrit l'instantané des lignes typées couvrant `signature` du CSV (atomique)."""
+    schema = _schema(colonnes, types)
+    morceaux = [EN_TETE.pack(MAGIQUE, *signature, empreinte, len(lignes), len(schema)), schema]
+    for colonne in colonnes:
+        donnees = _encoder_colonne(CODES_TYPES[types[colonne]],
+                                   [ligne[colonne] for ligne in lignes])
+        morceaux += [TAILLE_COLONNE.pack(len(donnees)), donnees]
+
+    ecrire_binaire_atomique(chemin_instantane(chemin_csv), b"".join(morceaux))
+
+
+def _lire_fichier(chemin_csv, colonnes, types):
+    """
+    Lit l'instantané en une seule lecture.
+    Retourne (signature, empreinte, lignes), ou None s'il est absent ou illisible.
+    """
+    try:
+        with open(chemin_instantane(chemin_csv), mode="rb") as fichier:
+            donnees = memoryview(fichier.read())
+    except OSError:
+        return None
+
+    schema = _schema(colonnes, types)
+    try:
+        magique, inode, mtime, taille, empreinte, nombre_lignes, taille_schema = \
+            EN_TETE.unpack_from(donnees)
+        position = EN_TETE.size
+        if magique != MAGIQUE or donnees[position:position + taille_schema] != schema:
+            return None
+        position += taille_schema
+
+        valeurs = []
+        for colonne in colonnes:
+            (taille_donnees,) = TAILLE_COLONNE.unpack_from(donnees, position)
+            position += TAILLE_COLONNE.size
+            valeurs.append(_decoder_colonne(CODES_TYPES[types[colonne]],
+                                            donnees[position:position + taille_donnees],
+                                            nombre_lignes))
+            position += taille_donnees
+    except (struct.error, ValueError):
+        return None
+
+    if any(len(colonne) != nombre_lignes for colonne in valeurs):
+        return None
+    return (inode, mtime, taille), empreinte, _construire_lignes(colonnes, valeurs)
+
+
+def _construire_lignes(colonnes, valeurs):
+    """Assemble les dicts des lignes à partir des colonnes décodées."""
+    # Ces objets vivent aussi longtemps que les données chargées : inutile que le
+    # ramasse-miettes parcoure la liste à chaque seuil d'allocations franchi
+    actif = gc.isenabled()
+    gc.disable()
+    try:
+        valeurs = [colonne if isinstance(colonne, list) else colonne.tolist() for colonne in valeurs]
+        return [dict(zip(colonnes, ligne)) for ligne in zip(*valeurs)]
+    finally:
+        if actif:
+            gc.enable()
+
+
+def ecrire_instantane(chemin_csv, colonnes, types, lignes):
+    """
+    Écrit l'instantané binaire d'un CSV qui vient d'être sauvegardé, à partir
+    des lignes typées correspondantes. À appeler sous verrou_donnees(), juste
+    après l'écriture du CSV.
+    """
+    if not config.INSTANTANES_BINAIRES:
+        return
+    try:
+        with open(chemin_csv, mode="rb") as fichier:
+            etat = os.fstat(fichier.fileno())
+            empreinte = _empreinte(fichier.read(etat.st_size)).digest()
+        _ecrire_fichier(chemin_csv, colonnes, types, lignes,
+                        (etat.st_ino, etat.st_mtime_ns, etat.st_size), empreinte)
+    except (OSError, ValueError):
+        # L'instantané n'est qu'une accélération : le CSV fait foi
+        pass
+
+
+def charger_csv(chemin_csv, colonnes, types, convertir):
+    """
+    Charge toutes les lignes typées d'un CSV, depuis son instantané binaire
+    quand il est à jour.
+
+    L'instantané est valide si le CSV a la même signature (inode, mtime,
+    taille) qu'à son écriture. Sinon, si le CSV n'a fait que grandir et que
+    l'empreinte de ses premiers octets est inchangée (ajouts en fin de
+    fichier, copie), seules les lignes ajoutées sont parsées. Dans les autres
+    cas, le CSV est parsé en entier (`convertir` type chaque ligne lue) et
+    l'instantané réécrit. Lève FileNotFoundError si le CSV n'existe pas.
+    """
+    instantane = _lire_fichier(chemin_csv, colonnes, types) if config.INSTANTANES_BINAIRES else None
+
+    with open(chemin_csv, mode="rb") as fichier:
+        etat = os.fstat(fichier.fileno())
+        signature = (etat.st_ino, etat.st_mtime_ns, etat.st_size)
+        if instantane is not None and instantane[0] == signature:
+            return instantane[2]
+
+        lignes, debut, empreinte, en_tete = [], 0, _empreinte(), None
+        if instantane is not None and instantane[0][2] <= etat.st_size:
+            prefixe = fichier.read(instantane[0][2])
+            empreinte.update(prefixe)
+            if empreinte.digest() == instantane[1]:
+                lignes, debut = instantane[2], len(prefixe)
+                en_tete = next(csv.reader([prefixe.split(b"\n", 1)[0].decode("utf-8")]), None)
+            else:
+                empreinte = _empreinte()
+                fichier.seek(0)
+        reste = fichier.read(etat.st_size - debut)
+
+    lecteur = csv.DictReader(io.StringIO(reste.decode("utf-8"), newline=""), fieldnames=en_tete)
+    lignes = lignes + [convertir(ligne) for ligne in lecteur]
+
+    # Réécrit l'instantané s'il manquait ou si trop de lignes ont été ajoutées depuis,
+    # sauf si une ligne est en cours d'ajout (dernière ligne incomplète)
+    if (config.INSTANTANES_BINAIRES and (debut == 0 or len(reste) > TAILLE_MAX_QUEUE)
+            and (not reste or reste.endswith(b"\n"))):
+        empreinte.update(reste)
+        try:
+            _ecrire_fichier(chemin_csv, colonnes, types, lignes, signature, empreinte.digest())
+        except (OSError, ValueError):
+            pass
+    return lignes
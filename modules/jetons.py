@@ -0,0 +1,141 @@
+import csv
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import jwt
+
+from modules.fichiers import (ecrire_csv_atomique, signature_fichier,
+                              verrou_donnees)
+
+FICHIER_JETONS_REVOQUES = "data/jetons_revoques.csv"
+COLONNES_JETONS_REVOQUES = ["empreinte", "exp"]
+
+ALGORITHME = "HS256"
+DUREE_JETON = timedelta(hours=24)
+
+# Jetons déjà vérifiés : {empreinte: (données, exp)}, du plus ancien au plus récent
+TAILLE_MAX_CACHE_JETONS = 4096
+_cache_jetons = OrderedDict()
+_compteurs_cache = {"hits": 0, "misses": 0}
+_verrou_cache = threading.Lock()
+
+# Révocations partagées entre processus, relues quand le fichier change
+_revocations = {"signature": None, "jetons": {}}
+
+
+def empreinte_jeton(jeton):
+    """Empreinte SHA-256 d'un jeton : clé du cache et des révocations."""
+    return hashlib.sha256(jeton.encode()).hexdigest()
+
+
+def creer_jeton(username, role, secret):
+    """Crée un jeton JWT signé (HS256) valable DUREE_JETON."""
+    return jwt.encode({
+        "username": username,
+        "role": role,
+        "exp": datetime.now(timezone.utc) + DUREE_JETON,
+    }, secret, algorithm=ALGORITHME)
+
+
+def _jetons_revoques():
+    """{empreinte: exp} des jetons révoqués (relu seulement si le fichier a changé)."""
+    signature = signature_fichier(FICHIER_JETONS_REVOQUES)
+    if signature != _revocations["signature"]:
+        jetons = {}
+        try:
+            with open(FICHIER_JETONS_REVOQUES, mode="r", encoding="utf-8") as fichier:
+                for ligne in csv.DictReader(fichier):
+                    jetons[ligne["empreinte"]] = float(ligne["exp"])
+        except FileNotFoundError:
+            pass
+        _revocations["jetons"] = jetons
+        _revocations["signature"] = signature
+    return _revocations["jetons"]
+
+
+def verifier_jeton(jeton, secret):
+    """
+    Vérifie un jeton et retourne ses données (username, role, exp).
+
+    Un jeton déjà vérifié est servi depuis un cache LRU borné, sans refaire
+    le décodage ni la vérification HMAC ; l'entrée expire avec le jeton (exp).
+    Lève jwt.ExpiredSignatureError ou jwt.InvalidTokenError, comme jwt.decode,
+    y compris pour un jeton révoqué.
+    """
+    empreinte = empreinte_jeton(jeton)
+    maintenant = time.time()
+
+    with _verrou_cache:
+        if empreinte in _jetons_revoques():
+            _cache_jetons.pop(empreinte, None)
+            raise jwt.InvalidTokenError("Jeton révoqué")
+
+        entree = _cache_jetons.get(empreinte)
+        if entree is not None:
+            donnees, exp = entree
+            if maintenant < exp:
+                _cache_jetons.move_to_end(empreinte)
+                _compteurs_cache["hits"] += 1
+                return donnees
+            del _cache_jetons[empreinte]
+            raise jwt.ExpiredSignatureError("Signature has expired")
+        _compteurs_cache["misses"] += 1
+
+    donnees = jwt.decode(jeton, secret, algorithms=[ALGORITHME],
+                         options={"require": ["exp"]})
+
+    with _verrou_cache:
+        _cache_jetons[empreinte] = (donnees, donnees["exp"])
+        _cache_jetons.move_to_end(empreinte)
+        while len(_cache_jetons) > TAILLE_MAX_CACHE_JETONS:
+            _cache_jetons.popitem(last=False)
+    return donnees
+
+
+def revoquer_jeton(jeton, secret):
+    """
+    Révoque un jeton valide jusqu'à son expiration (déconnexion).
+    La révocation est enregistrée dans un fichier pour valoir dans tous les
+    processus ; les révocations de jetons déjà expirés en sont purgées.
+    """
+    donnees = verifier_jeton(jeton, secret)
+    empreinte = empreinte_jeton(jeton)
+    maintenant = time.time()
+
+    with verrou_donnees():
+        with _verrou_cache:
+            jetons = {
+                cle: exp for cle, exp in _jetons_revoques().items() if exp > maintenant
+            }
+        jetons[empreinte] = donnees["exp"]
+        ecrire_csv_atomique(
+            FICHIER_JETONS_REVOQUES, COLONNES_JETONS_REVOQUES,
+            [{"empreinte": cle, "exp": exp} for cle, exp in jetons.items()],
+        )
+
+    with _verrou_cache:
+        _cache_jetons.pop(empreinte, None)
+
+
+def statistiques_cache_jetons():
+    """Compteurs du cache de vérification des jetons."""
+    with _verrou_cache:
+        hits, misses = _compteurs_cache["hits"], _compteurs_cache["misses"]
+        taille = len(_cache_jetons)
+
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "ratio": round(hits / total, 4) if total else 0.0,
+        "jetons_en_cache": taille,
+    }
+
+
+def vider_cache_jetons():
+    """Vide le cache des jetons vérifiés (les révocations sont conservées)."""
+    with _verrou_cache:
+        _cache_jetons.clear()
@@ -0,0 +1,49 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LimiteurDebit:
+    """
+    Limiteur de débit par clé (adresse IP, nom d'utilisateur...), en seau à jetons.
+
+    Chaque clé dispose de `capacite` jetons, regagnés au rythme de `debit`
+    jetons par seconde : une rafale de `capacite` requêtes passe, puis le
+    débit soutenu est limité à `debit` requêtes/s. Seules les `taille_max`
+    clés les plus récemment vues sont suivies, pour que la mémoire reste
+    bornée même face à beaucoup d'adresses différentes.
+    """
+
+    def __init__(self, capacite, debit, taille_max=100000):
+        self.capacite = capacite
+        self.debit = debit
+        self.taille_max = taille_max
+        self._seaux = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def autoriser(self, cle):
+        """
+        Consomme un jeton pour `cle`.
+        Retourne (autorise, attente) : attente est le nombre de secondes
+        avant qu'un jeton soit de nouveau disponible (0 si autorisé).
+        """
+        maintenant = time.monotonic()
+        with self._verrou:
+            jetons, dernier = self._seaux.pop(cle, (self.capacite, maintenant))
+            jetons = min(self.capacite, jetons + (maintenant - dernier) * self.debit)
+
+            autorise = jetons >= 1
+            if autorise:
+                jetons -= 1
+            self._seaux[cle] = (jetons, maintenant)
+            if len(self._seaux) > self.taille_max:
+                self._seaux.popitem(last=False)
+
+        if autorise:
+            return True, 0.0
+        return False, (1 - jetons) / self.debit
+
+    def reinitialiser(self):
+        """Oublie toutes les clés."""
+        with self._verrou:
+            self._seaux.clear()
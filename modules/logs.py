@@ -0,0 +1,145 @@
+import atexit
+import csv
+import gzip
+import io
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from modules.fichiers import verrou_donnees
+
+# Marqueur de fin déposé dans la file par arreter()
+_FIN = object()
+
+
+class EcrivainLogs:
+    """
+    Écrivain CSV asynchrone pour les journaux d'audit.
+
+    Les lignes sont déposées dans une file bornée et écrites par un thread
+    de fond, par lots : dès que `taille_lot` lignes attendent, ou au plus
+    tard `delai_max` secondes après la première. Si la file est pleine,
+    ecrire() bloque jusqu'à ce que le thread ait rattrapé son retard
+    (contre-pression) : aucune ligne n'est perdue. Les lignes en attente
+    sont écrites à l'arrêt du programme.
+
+    Quand le fichier dépasse `taille_max_fichier` octets, il est renommé
+    avec un horodatage sous le verrou des données, puis compressé en gzip
+    une fois le verrou relâché ; un nouveau fichier est commencé au lot
+    suivant.
+    """
+
+    def __init__(self, chemin, colonnes, taille_lot=200, delai_max=1.0,
+                 taille_file=10000, taille_max_fichier=5 * 1024 * 1024):
+        self.chemin = chemin
+        self.colonnes = colonnes
+        self.taille_lot = taille_lot
+        self.delai_max = delai_max
+        self.taille_file = taille_file
+        self.taille_max_fichier = taille_max_fichier
+        self._verrou = threading.Lock()
+        self._file = None
+        self._thread = None
+        self._pid = None
+        atexit.register(self.arreter)
+
+    def _demarrer(self):
+        """Démarre le thread (aussi dans un processus fils, qui n'hérite pas du thread)."""
+        with self._verrou:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._file = queue.Queue(maxsize=self.taille_file)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._boucle, name="ecrivain-logs", daemon=True
+                )
+                self._thread.start()
+            return self._file
+
+    def ecrire(self, ligne):
+        """Dépose une ligne (dict) à écrire ; bloque si la file est pleine."""
+        self._demarrer().put(ligne)
+
+    def vider(self):
+        """Attend que toutes les lignes déposées soient écrites."""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            self._file.join()
+
+    def arreter(self):
+        """Écrit les lignes en attente puis arrête le thread."""
+        with self._verrou:
+            thread, file_attente = self._thread, self._file
+            if thread is None or self._pid != os.getpid() or not thread.is_alive():
+                return
+            self._thread = None
+        file_attente.put(_FIN)
+        thread.join()
+
+    # ---------- Thread d'écriture ----------
+
+    def _boucle(self):
+        file_attente = self._file
+        termine = False
+        while not termine:
+            lot = [file_attente.get()]
+            echeance = time.monotonic() + self.delai_max
+            while lot[-1] is not _FIN and len(lot) < self.taille_lot:
+                reste = echeance - time.monotonic()
+                if reste <= 0:
+                    break
+                try:
+                    lot.append(file_attente.get(timeout=reste))
+                except queue.Empty:
+                    break
+
+            if lot[-1] is _FIN:
+                termine = True
+            lignes = [ligne for ligne in lot if ligne is not _FIN]
+            try:
+                if lignes:
+                    self._ecrire_lot(lignes)
+            except OSError as erreur:
+                print(f"Erreur d'écriture des logs ({self.chemin}) : {erreur}")
+            finally:
+                for _ligne in lot:
+                    file_attente.task_done()
+
+    def _ecrire_lot(self, lignes):
+        """Ajoute un lot au fichier en une seule écriture, puis le fait tourner si besoin."""
+        tampon = io.StringIO()
+        ecrivain = csv.DictWriter(tampon, fieldnames=self.colonnes)
+        ecrivain.writerows(lignes)
+
+        # Verrou partagé : un autre processus peut écrire ou faire tourner le même fichier
+        archive = None
+        with verrou_donnees():
+            with open(self.chemin, mode="a", encoding="utf-8", newline="") as fichier:
+                if fichier.tell() == 0:
+                    ecrivain = csv.DictWriter(fichier, fieldnames=self.colonnes)
+                    ecrivain.writeheader()
+                fichier.write(tampon.getvalue())
+                taille = fichier.tell()
+
+            if taille >= self.taille_max_fichier:
+                archive = self._faire_tourner()
+
+        # Compression hors verrou : le fichier renommé n'est plus touché par personne
+        if archive is not None:
+            self._compresser(archive)
+
+    def _faire_tourner(self):
+        """Renomme le fichier courant avec un horodatage ; renvoie le chemin de l'archive."""
+        base, extension = os.path.splitext(self.chemin)
+        horodatage = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        archive = f"{base}.{horodatage}{extension}"
+        os.replace(self.chemin, archive)
+        return archive
+
+    @staticmethod
+    def _compresser(archive):
+        """Compresse une archive renommée en gzip puis supprime l'original."""
+        with open(archive, mode="rb") as source, gzip.open(archive + ".gz", mode="wb") as cible:
+            shutil.copyfileobj(source, cible)
+        os.remove(archive)
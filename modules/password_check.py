@@ -1,37 +1,142 @@
 import hashlib
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
 
 import requests
 
+# API "range" de Have I Been Pwned (k-anonymat : seul le préfixe du hash est envoyé)
+URL_API_PWNED = os.environ.get("PWNED_API_URL", "https://api.pwnedpasswords.com/range/")
+DELAI_API = 5
+
+# Mode hors ligne : fichier local "HASH_SHA1:COMPTE" trié par hash (export HIBP).
+# S'il est configuré, aucune requête réseau n'est faite.
+FICHIER_HASHES_LOCAL = os.environ.get("PWNED_FICHIER_LOCAL")
+
+# Plages déjà téléchargées : {préfixe: (expiration, {suffixe: compte})}
+DUREE_CACHE_PLAGES = 24 * 3600
+TAILLE_MAX_CACHE_PLAGES = 1024
+_cache_plages = OrderedDict()
+_verrou_cache = threading.Lock()
+
+
+def _hash_sha1(mot_de_passe):
+    return hashlib.sha1(mot_de_passe.encode(), usedforsecurity=False).hexdigest().upper()
+
+
+def _lire_plage(texte):
+    """Parse une réponse de l'API range : {suffixe: compte} (lignes de remplissage ignorées)."""
+    plage = {}
+    for ligne in texte.splitlines():
+        hash_suffixe, _, count = ligne.strip().partition(":")
+        if hash_suffixe and count and int(count) > 0:
+            plage[hash_suffixe.upper()] = int(count)
+    return plage
+
+
+def _plage_en_cache(prefixe):
+    """Plage du cache si elle n'a pas expiré, sinon None."""
+    with _verrou_cache:
+        entree = _cache_plages.get(prefixe)
+        if entree is None:
+            return None
+        expiration, plage = entree
+        if time.monotonic() >= expiration:
+            del _cache_plages[prefixe]
+            return None
+        _cache_plages.move_to_end(prefixe)
+        return plage
+
+
+def _mettre_plage_en_cache(prefixe, plage):
+    with _verrou_cache:
+        _cache_plages[prefixe] = (time.monotonic() + DUREE_CACHE_PLAGES, plage)
+        _cache_plages.move_to_end(prefixe)
+        while len(_cache_plages) > TAILLE_MAX_CACHE_PLAGES:
+            _cache_plages.popitem(last=False)
+
+
+def vider_cache_plages():
+    """Vide le cache des plages téléchargées."""
+    with _verrou_cache:
+        _cache_plages.clear()
+
+
+def chercher_hash_local(chemin, sha1_hash):
+    """
+    Cherche un hash SHA-1 (hexadécimal) dans un fichier local trié de lignes
+    "HASH:COMPTE", par recherche dichotomique sur le fichier projeté en
+    mémoire (mmap) : O(log n) lectures, sans charger le fichier.
+    Retourne le compte, ou 0 si le hash est absent.
+    """
+    cible = sha1_hash.upper().encode()
+    with open(chemin, mode="rb") as fichier:
+        if os.fstat(fichier.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ) as donnees:
+            # [bas, haut) contient toujours des lignes entières
+            bas, haut = 0, len(donnees)
+            while bas < haut:
+                milieu = (bas + haut) // 2
+                debut = donnees.rfind(b"\n", bas, milieu) + 1 or bas
+                fin = donnees.find(b"\n", debut, haut)
+                if fin == -1:
+                    fin = haut
+
+                hash_ligne, _, count = donnees[debut:fin].strip().partition(b":")
+                if hash_ligne.upper() == cible:
+                    return int(count or 0)
+                if hash_ligne.upper() < cible:
+                    bas = fin + 1
+                else:
+                    haut = debut
+    return 0
+
 
 def verifier_mot_de_passe_compromis(mot_de_passe):
     """
     Vérifie si un mot de passe est dans la base de données
     des mots de passe compromis (Have I Been Pwned).
 
+    Utilise le fichier local trié si FICHIER_HASHES_LOCAL est configuré,
+    sinon l'API range, dont les réponses sont gardées en cache par préfixe
+    (durée DUREE_CACHE_PLAGES, au plus TAILLE_MAX_CACHE_PLAGES préfixes).
+
     Retourne : (est_compromis, nombre_de_fois)
     """
     # Étape 1 : Hacher en SHA-1 (requis par l'API)
-    sha1_hash = hashlib.sha1(mot_de_passe.encode()).hexdigest().upper() # nosec
+    sha1_hash = _hash_sha1(mot_de_passe)
+
+    if FICHIER_HASHES_LOCAL:
+        try:
+            count = chercher_hash_local(FICHIER_HASHES_LOCAL, sha1_hash)
+        except OSError:
+            return None, "Fichier local des mots de passe compromis illisible."
+        return (True, count) if count else (False, 0)
 
     # Étape 2 : Séparer le hash (5 premiers + reste)
     prefixe = sha1_hash[:5]
     suffixe = sha1_hash[5:]
 
-    # Étape 3 : Appeler l'API avec le préfixe seulement
-    try:
-        url = f"https://api.pwnedpasswords.com/range/%7Bprefixe%7D"
-        response = requests.get(url, timeout=5)
+    # Étape 3 : Appeler l'API avec le préfixe seulement (sauf si la plage est en cache)
+    plage = _plage_en_cache(prefixe)
+    if plage is None:
+        try:
+            response = requests.get(f"{URL_API_PWNED}{prefixe}", timeout=DELAI_API)
 
-        if response.status_code != 200:
-            return None, "Erreur lors de la vérification."
+            if response.status_code != 200:
+                return None, "Erreur lors de la vérification."
 
-        # Étape 4 : Chercher le suffixe dans les résultats
-        for ligne in response.text.splitlines():
-            hash_suffixe, count = ligne.split(":")
-            if hash_suffixe == suffixe:
-                return True, int(count)
+        except requests.RequestException:
+            return None, "Impossible de contacter l'API."
 
-        return False, 0
+        plage = _lire_plage(response.text)
+        _mettre_plage_en_cache(prefixe, plage)
 
-    except requests.RequestException:
-        return None, "Impossible de contacter l'API."
+    # Étape 4 : Chercher le suffixe dans les résultats
+    count = plage.get(suffixe)
+    if count:
+        return True, count
+    return False, 0
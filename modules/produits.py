@@ -1,35 +1,129 @@
+import bisect
 import csv
+import itertools
+import math
+import threading
+from collections import OrderedDict
+
+from modules import config, instantanes, stockage_sqlite
+from modules.fichiers import (ecrire_csv_atomique, signature_fichier,
+                              verrou_donnees)
+from modules.index import IndexTexte, ListeIndexee, normaliser_texte
 
 FICHIER_PRODUITS = "data/produits.csv"
+COLONNES_PRODUITS = ["id", "nom", "description", "prix", "quantite"]
+TYPES_PRODUITS = {"id": int, "nom": str, "description": str, "prix": float, "quantite": int}
 
+# Cache du catalogue partagé par tout le processus.
+# Le fichier n'est relu que si sa signature (inode, mtime, taille) change.
+_cache_catalogue = {"signature": None, "produits": None}
+_compteurs_cache = {"hits": 0, "misses": 0}
+_verrou_cache = threading.Lock()
 
-def charger_produits():
-    """Charge tous les produits depuis le fichier CSV."""
-    produits = []
+
+def _normaliser_produit(ligne):
+    """Convertit une ligne (CSV ou dict) en produit typé."""
+    return {
+        "id": int(ligne["id"]),
+        "nom": ligne["nom"],
+        "description": ligne["description"],
+        "prix": float(ligne["prix"]),
+        "quantite": int(ligne["quantite"]),
+    }
+
+
+def _parcourir_produits_csv():
+    """Parcourt le fichier CSV des produits et produit des produits typés."""
     try:
         with open(FICHIER_PRODUITS, mode="r", encoding="utf-8") as fichier:
             lecteur = csv.DictReader(fichier)
             for ligne in lecteur:
-                produit = {
-                    "id": int(ligne["id"]),
-                    "nom": ligne["nom"],
-                    "description": ligne["description"],
-                    "prix": float(ligne["prix"]),
-                    "quantite": int(ligne["quantite"]),
-                }
-                produits.append(produit)
+                yield _normaliser_produit(ligne)
     except FileNotFoundError:
         print("Fichier produits.csv introuvable.")
-    return produits
+
+
+def _lire_produits_csv():
+    """Lit les produits : instantané binaire s'il est à jour, sinon parse du CSV."""
+    try:
+        return instantanes.charger_csv(FICHIER_PRODUITS, COLONNES_PRODUITS, TYPES_PRODUITS,
+                                       _normaliser_produit)
+    except FileNotFoundError:
+        print("Fichier produits.csv introuvable.")
+        return []
+
+
+def charger_produits():
+    """Charge tous les produits (depuis le cache si le CSV n'a pas changé)."""
+    if config.utilise_sqlite():
+        return stockage_sqlite.charger_produits()
+
+    signature = signature_fichier(FICHIER_PRODUITS)
+
+    with _verrou_cache:
+        if signature is not None and signature == _cache_catalogue["signature"]:
+            _compteurs_cache["hits"] += 1
+        else:
+            _compteurs_cache["misses"] += 1
+            _cache_catalogue["produits"] = _lire_produits_csv()
+            _cache_catalogue["signature"] = signature
+        produits = _cache_catalogue["produits"]
+
+    # Copies : les appelants modifient les produits avant de sauvegarder
+    return ListeIndexee((dict(p) for p in produits), cle="id")
+
+
+def parcourir_produits():
+    """
+    Parcourt les produits un par un sans construire de liste (exports).
+    Les produits sont lus directement depuis le stockage, sans passer par le cache.
+    """
+    if config.utilise_sqlite():
+        return stockage_sqlite.parcourir_produits()
+    return _parcourir_produits_csv()
 
 
 def sauvegarder_produits(produits):
     """Sauvegarde la liste des produits dans le fichier CSV."""
-    with open(FICHIER_PRODUITS, mode="w", encoding="utf-8", newline="") as fichier:
-        colonnes = ["id", "nom", "description", "prix", "quantite"]
-        ecrivain = csv.DictWriter(fichier, fieldnames=colonnes)
-        ecrivain.writeheader()
-        ecrivain.writerows(produits)
+    if config.utilise_sqlite():
+        stockage_sqlite.sauvegarder_produits(produits)
+        return
+
+    produits = [_normaliser_produit(p) for p in produits]
+    with verrou_donnees():
+        ecrire_csv_atomique(FICHIER_PRODUITS, COLONNES_PRODUITS, produits)
+        # Signature prise sous le verrou : c'est bien celle du fichier écrit,
+        # pas celle d'une réécriture faite entre-temps par un autre processus
+        signature = signature_fichier(FICHIER_PRODUITS)
+        instantanes.ecrire_instantane(FICHIER_PRODUITS, COLONNES_PRODUITS, TYPES_PRODUITS, produits)
+
+    # Écriture traversante : le cache reflète directement ce qui a été écrit
+    with _verrou_cache:
+        _cache_catalogue["produits"] = produits
+        _cache_catalogue["signature"] = signature
+
+
+def statistiques_cache_produits():
+    """Retourne les compteurs du cache du catalogue (hits, misses, taille)."""
+    with _verrou_cache:
+        hits = _compteurs_cache["hits"]
+        misses = _compteurs_cache["misses"]
+        taille = len(_cache_catalogue["produits"] or [])
+
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "ratio": round(hits / total, 4) if total else 0.0,
+        "produits_en_cache": taille,
+    }
+
+
+def vider_cache_produits():
+    """Invalide le cache du catalogue (le prochain chargement relit le CSV)."""
+    with _verrou_cache:
+        _cache_catalogue["signature"] = None
+        _cache_catalogue["produits"] = None
 
 
 def generer_id(produits):
@@ -42,19 +136,33 @@ def generer_id(produits):
 def ajouter_produit(produits, nom, description, prix, quantite):
     """Ajoute un nouveau produit à la liste."""
     nouveau = {
-        "id": generer_id(produits),
+        "id": None,
         "nom": nom,
         "description": description,
         "prix": float(prix),
         "quantite": int(quantite),
     }
+
+    with verrou_donnees():
+        avant = _signature_stockage()
+        if config.utilise_sqlite():
+            stockage_sqlite.inserer_produit(nouveau)
+        else:
+            # Catalogue relu sous verrou : la liste de l'appelant peut être périmée
+            actuels = charger_produits()
+            nouveau["id"] = max(generer_id(produits), generer_id(actuels))
+            actuels.append(dict(nouveau))
+            sauvegarder_produits(actuels)
+        _mettre_a_jour_recherche(avant, lambda index: index.ajouter(nouveau["id"], nouveau))
+
     produits.append(nouveau)
-    sauvegarder_produits(produits)
     return nouveau
 
 
 def trouver_produit(produits, id_produit):
     """Trouve un produit par son ID."""
+    if isinstance(produits, ListeIndexee) and produits.cle == "id":
+        return produits.obtenir(id_produit)
     for produit in produits:
         if produit["id"] == id_produit:
             return produit
@@ -64,20 +172,256 @@ def trouver_produit(produits, id_produit):
 def modifier_produit(produits, id_produit, **modifications):
     """Modifie un produit existant."""
     produit = trouver_produit(produits, id_produit)
-    if produit:
-        for cle, valeur in modifications.items():
-            if cle in produit and cle != "id":
-                produit[cle] = valeur
-        sauvegarder_produits(produits)
-        return produit
-    return None
+    if not produit:
+        return None
+
+    modifications = {
+        cle: valeur for cle, valeur in modifications.items()
+        if cle in produit and cle != "id"
+    }
+    produit.update(modifications)
+
+    with verrou_donnees():
+        avant = _signature_stockage()
+        if config.utilise_sqlite():
+            stockage_sqlite.enregistrer_produit(produit)
+        else:
+            # Appliquer la modification sur le catalogue relu sous verrou
+            actuels = charger_produits()
+            actuel = trouver_produit(actuels, id_produit)
+            if actuel:
+                actuel.update(modifications)
+                sauvegarder_produits(actuels)
+        _mettre_a_jour_recherche(avant, lambda index: index.ajouter(id_produit, produit))
+    return produit
 
 
 def supprimer_produit(produits, id_produit):
     """Supprime un produit par son ID."""
     produit = trouver_produit(produits, id_produit)
-    if produit:
-        produits.remove(produit)
-        sauvegarder_produits(produits)
-        return True
-    return False
+    if not produit:
+        return False
+
+    produits.remove(produit)
+
+    with verrou_donnees():
+        avant = _signature_stockage()
+        if config.utilise_sqlite():
+            stockage_sqlite.supprimer_produit(id_produit)
+        else:
+            actuels = charger_produits()
+            actuel = trouver_produit(actuels, id_produit)
+            if actuel:
+                actuels.remove(actuel)
+                sauvegarder_produits(actuels)
+        _mettre_a_jour_recherche(avant, lambda index: index.supprimer(id_produit))
+    return True
+
+
+# ==================== INDEX TRIÉS / PAGINATION ====================
+
+# Clés de tri : chaque index est une liste triée de (clé..., id), l'id départage les égalités
+TRIS_PRODUITS = {
+    "id": lambda p: (p["id"],),
+    "prix": lambda p: (p["prix"], p["id"]),
+    "nom": lambda p: (normaliser_texte(p["nom"]), p["id"]),
+}
+
+# Index triés du catalogue, reconstruits seulement quand le stockage change
+_index_catalogue = {"signature": None, "produits": None, "index": None}
+_verrou_index = threading.Lock()
+
+
+def _signature_stockage():
+    """Signature du stockage des produits (fichier CSV, ou base SQLite et son WAL)."""
+    if config.utilise_sqlite():
+        return (signature_fichier(config.FICHIER_BASE_SQLITE),
+                signature_fichier(config.FICHIER_BASE_SQLITE + "-wal"))
+    return signature_fichier(FICHIER_PRODUITS)
+
+
+def _index_tries():
+    """Retourne ({id: produit}, {tri: [clés triées]}) pour le catalogue courant."""
+    signature = _signature_stockage()
+    with _verrou_index:
+        if signature is None or signature != _index_catalogue["signature"]:
+            produits = {p["id"]: p for p in charger_produits()}
+            _index_catalogue["produits"] = produits
+            _index_catalogue["index"] = {
+                tri: sorted(cle(p) for p in produits.values())
+                for tri, cle in TRIS_PRODUITS.items()
+            }
+            _index_catalogue["signature"] = signature
+        return _index_catalogue["produits"], _index_catalogue["index"]
+
+
+def _plage_index(cles, tri, apres, prix_min, prix_max, prefixe):
+    """
+    Positions [debut, fin) à parcourir dans les clés triées `cles` : après le
+    curseur `apres` (exclu), puis bornées par le filtre qui porte sur la clé
+    de tri (prix pour tri=prix, préfixe normalisé pour tri=nom).
+    """
+    debut, fin = 0, len(cles)
+    if apres is not None:
+        try:
+            debut = bisect.bisect_right(cles, tuple(apres))
+        except TypeError:
+            raise ValueError(f"Curseur incompatible avec le tri {tri}")
+    if tri == "prix":
+        if prix_min is not None:
+            debut = max(debut, bisect.bisect_left(cles, (prix_min,)))
+        if prix_max is not None:
+            fin = bisect.bisect_right(cles, (prix_max, math.inf))
+    elif tri == "nom" and prefixe:
+        debut = max(debut, bisect.bisect_left(cles, (prefixe,)))
+        fin = bisect.bisect_left(cles, (prefixe + "\U0010ffff",))
+    return debut, fin
+
+
+def _correspond(produit, prix_min, prix_max, en_stock, prefixe):
+    """Indique si un produit passe les filtres (préfixe déjà normalisé)."""
+    if prix_min is not None and produit["prix"] < prix_min:
+        return False
+    if prix_max is not None and produit["prix"] > prix_max:
+        return False
+    if en_stock and produit["quantite"] <= 0:
+        return False
+    return not prefixe or normaliser_texte(produit["nom"]).startswith(prefixe)
+
+
+def _parcourir_index(tri, apres=None, prix_min=None, prix_max=None,
+                     en_stock=False, prefixe=None):
+    """
+    Parcourt les produits filtrés dans l'ordre de l'index `tri`, à partir de
+    la clé `apres` (exclue). On s'y positionne par bisection au lieu de
+    parcourir ce qui précède. Quand le filtre porte sur la clé de tri (prix
+    pour tri=prix, préfixe pour tri=nom), il borne directement la plage
+    parcourue ; les autres filtres sont testés produit par produit.
+    """
+    if tri not in TRIS_PRODUITS:
+        raise ValueError(f"Tri inconnu : {tri}")
+
+    produits, index = _index_tries()
+    cles = index[tri]
+    prefixe = normaliser_texte(prefixe) if prefixe else None
+
+    debut, fin = _plage_index(cles, tri, apres, prix_min, prix_max, prefixe)
+    for position in range(debut, fin):
+        produit = produits[cles[position][-1]]
+        if _correspond(produit, prix_min, prix_max, en_stock, prefixe):
+            yield produit
+
+
+def page_produits(tri="id", apres=None, limite=10, decalage=0, **filtres):
+    """
+    Une page de produits filtrés (prix_min, prix_max, en_stock, prefixe),
+    triés par `tri` ("id", "prix" ou "nom").
+
+    Pagination par clé (keyset) : `apres` est la clé de tri du dernier produit
+    de la page précédente. Retourne (produits, cle_suivante) ; cle_suivante
+    vaut None sur la dernière page. `decalage` ne sert qu'à l'ancienne
+    pagination par numéro de page.
+    """
+    selection = itertools.islice(
+        _parcourir_index(tri, apres, **filtres), decalage, decalage + limite + 1
+    )
+    page = [dict(produit) for produit in selection]
+    if len(page) > limite:
+        # Un produit de plus que demandé : la page suivante existe
+        page.pop()
+        return page, TRIS_PRODUITS[tri](page[-1])
+    return page, None
+
+
+# Nombres de produits par filtres, pour la signature du stockage qu'ils reflètent
+# (celle dont dérive version_donnees("produits")), du plus ancien au plus récent
+TAILLE_MAX_COMPTES = 256
+_comptes_produits = {"signature": None, "comptes": OrderedDict()}
+
+
+def compter_produits(**filtres):
+    """
+    Nombre de produits correspondant aux filtres de page_produits. Gardé tant
+    que le catalogue ne change pas : une liste déjà comptée ne reparcourt pas
+    l'index à chaque première page.
+    """
+    signature = _signature_stockage()
+    cle = tuple(sorted(filtres.items()))
+    with _verrou_index:
+        comptes = _comptes_produits["comptes"]
+        if signature is not None and signature == _comptes_produits["signature"] and cle in comptes:
+            comptes.move_to_end(cle)
+            return comptes[cle]
+
+    total = sum(1 for _produit in _parcourir_index("id", **filtres))
+
+    if signature is not None:
+        with _verrou_index:
+            if signature != _comptes_produits["signature"]:
+                _comptes_produits["comptes"] = OrderedDict()
+                _comptes_produits["signature"] = signature
+            comptes = _comptes_produits["comptes"]
+            comptes[cle] = total
+            while len(comptes) > TAILLE_MAX_COMPTES:
+                comptes.popitem(last=False)
+    return total
+
+
+def produits_par_ids(ids):
+    """Produits dont l'id est dans `ids`, triés par id (les ids inconnus sont ignorés)."""
+    produits, _index = _index_tries()
+    return [dict(produits[id_produit]) for id_produit in sorted(set(ids)) if id_produit in produits]
+
+
+# ==================== RECHERCHE PLEIN TEXTE ====================
+
+# Le nom pèse plus que la description dans le classement
+POIDS_RECHERCHE = {"nom": 3, "description": 1}
+
+# Index inversé du catalogue, avec la signature du stockage qu'il reflète
+_index_recherche = {"signature": None, "index": None}
+_verrou_recherche = threading.Lock()
+
+
+def _index_recherche_courant():
+    """Retourne l'index plein texte, reconstruit si le catalogue a changé ailleurs."""
+    signature = _signature_stockage()
+    with _verrou_recherche:
+        if _index_recherche["index"] is None or signature != _index_recherche["signature"]:
+            index = IndexTexte(POIDS_RECHERCHE)
+            for produit in charger_produits():
+                index.ajouter(produit["id"], produit)
+            _index_recherche["index"] = index
+            _index_recherche["signature"] = signature
+        return _index_recherche["index"]
+
+
+def _mettre_a_jour_recherche(signature_avant, modification):
+    """
+    Applique modification(index) après une écriture du catalogue par ce processus.
+    Si l'index ne reflétait pas le stockage d'avant l'écriture, il est laissé
+    périmé : il sera reconstruit en entier à la prochaine recherche.
+    """
+    with _verrou_recherche:
+        if _index_recherche["index"] is None or _index_recherche["signature"] != signature_avant:
+            return
+        modification(_index_recherche["index"])
+        _index_recherche["signature"] = _signature_stockage()
+
+
+def rechercher_produits(requete, limite=20):
+    """
+    Recherche plein texte dans le nom et la description des produits,
+    insensible aux accents et à la casse, chaque mot pouvant être un début
+    de mot ("ecr" trouve "Écran"). Retourne les produits (copies) classés
+    par pertinence, avec leur score.
+    """
+    resultats = _index_recherche_courant().rechercher(requete, limite)
+    produits, _index = _index_tries()
+
+    trouves = []
+    for id_produit, score in resultats:
+        produit = produits.get(id_produit)
+        if produit:
+            trouves.append({**produit, "score": round(score, 4)})
+    return trouves
@@ -0,0 +1,82 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from modules.stats import get_evolution_ventes_json, top_produits
+from modules.version import version_donnees
+
+FORMATS_IMAGES = {"png": "image/png", "svg": "image/svg+xml"}
+
+# Graphiques disponibles : nom -> (sources de données, calcul des données à dessiner)
+GRAPHIQUES = {
+    "evolution-ventes": (("agregats",), get_evolution_ventes_json),
+    "top-produits": (("produits", "agregats"), lambda: top_produits(5)),
+    "revenus-par-produit": (("produits", "agregats"), lambda: top_produits(5)),
+}
+
+# Images déjà rendues : {(nom, format): (version des données, octets)}
+_cache_images = {}
+_verrou_cache = threading.Lock()
+
+# Le rendu matplotlib se fait dans un processus dédié, créé à la demande :
+# le processus de l'API n'importe jamais matplotlib et n'est pas bloqué par le rendu
+_pool = {"executeur": None, "pid": None}
+_verrou_pool = threading.Lock()
+
+
+def _rendre(nom, format_image, donnees):
+    """Exécuté dans le processus de rendu."""
+    from modules.graphiques import rendre_graphique
+    return rendre_graphique(nom, format_image, donnees)
+
+
+def _executeur(casse=None):
+    """
+    Retourne le pool de rendu, créé à la demande dans chaque processus.
+    `casse` est un pool dont le processus est mort : il est remplacé
+    (sauf si un autre thread l'a déjà fait).
+    """
+    with _verrou_pool:
+        if casse is not None and _pool["executeur"] is casse:
+            casse.shutdown(wait=False)
+            _pool["executeur"] = None
+        if _pool["executeur"] is None or _pool["pid"] != os.getpid():
+            _pool["executeur"] = ProcessPoolExecutor(max_workers=1)
+            _pool["pid"] = os.getpid()
+        return _pool["executeur"]
+
+
+def _rendre_dans_pool(nom, format_image, donnees):
+    """Rend l'image dans le pool ; le recrée une fois si son processus est mort (OOM, kill)."""
+    executeur = _executeur()
+    try:
+        return executeur.submit(_rendre, nom, format_image, donnees).result()
+    except BrokenProcessPool:
+        return _executeur(casse=executeur).submit(_rendre, nom, format_image, donnees).result()
+
+
+def image_graphique(nom, format_image):
+    """
+    Retourne l'image (octets) du graphique `nom` au format "png" ou "svg".
+
+    L'image est mise en cache avec la version des données dont elle dépend
+    (voir modules.version) : elle n'est redessinée qu'après un changement.
+    Lève KeyError pour un graphique ou un format inconnu, ImportError si
+    matplotlib n'est pas installé.
+    """
+    sources, calculer_donnees = GRAPHIQUES[nom]
+    if format_image not in FORMATS_IMAGES:
+        raise KeyError(format_image)
+
+    version = version_donnees(*sources)
+    with _verrou_cache:
+        entree = _cache_images.get((nom, format_image))
+    if version is not None and entree and entree[0] == version:
+        return entree[1]
+
+    image = _rendre_dans_pool(nom, format_image, calculer_donnees())
+    if version is not None:
+        with _verrou_cache:
+            _cache_images[(nom, format_image)] = (version, image)
+    return image
@@ -1,25 +1,22 @@
-from collections import defaultdict
-from datetime import datetime
+from datetime import date, timedelta
 
-import matplotlib.pyplot as plt
-import seaborn as sns
+from modules.agregats import charger_agregats, jours_de_ventes, meilleures_ventes
+from modules.produits import charger_produits, trouver_produit
 
-from modules.commandes import charger_commandes
-from modules.produits import charger_produits
 
+def calculer_statistiques(agregats=None, produits=None):
+    """
+    Calcule les statistiques globales (depuis les agrégats de ventes).
+    Les données déjà chargées peuvent être passées pour éviter une relecture.
+    """
+    agregats = agregats if agregats is not None else charger_agregats()
+    produits = produits if produits is not None else charger_produits()
 
-def calculer_statistiques():
-    """Calcule les statistiques globales."""
-    commandes = charger_commandes()
-    produits = charger_produits()
-
-    # Filtrer les commandes validées uniquement
-    commandes_valides = [c for c in commandes if c["statut"] == "validee"]
-
+    # Seules les commandes validées comptent dans les ventes
     stats = {
-        "total_commandes": len(commandes_valides),
-        "chiffre_affaires": sum(c["total"] for c in commandes_valides),
-        "produits_vendus": sum(c["quantite"] for c in commandes_valides),
+        "total_commandes": agregats["commandes_par_statut"].get("validee", 0),
+        "chiffre_affaires": agregats["chiffre_affaires"],
+        "produits_vendus": agregats["produits_vendus"],
         "nombre_produits": len(produits),
         "valeur_stock": sum(p["prix"] * p["quantite"] for p in produits),
     }
@@ -27,112 +24,49 @@ def calculer_statistiques():
     return stats
 
 
-def top_produits(limite=5):
-    """Retourne les produits les plus vendus."""
-    commandes = charger_commandes()
-    produits = charger_produits()
-
-    # Compter les ventes par produit
-    ventes = defaultdict(int)
-    revenus = defaultdict(float)
+def top_produits(limite=5, agregats=None, produits=None):
+    """Retourne les produits les plus vendus (top-k par tas sur les agrégats)."""
+    agregats = agregats if agregats is not None else charger_agregats()
+    produits = produits if produits is not None else charger_produits()
+    ventes = agregats["ventes_par_produit"]
 
-    for c in commandes:
-        if c["statut"] == "validee":
-            ventes[c["produit_id"]] += c["quantite"]
-            revenus[c["produit_id"]] += c["total"]
+    # Ignorer les produits supprimés du catalogue avant de sélectionner le top
+    ventes = {
+        produit_id: vente for produit_id, vente in ventes.items()
+        if trouver_produit(produits, int(produit_id))
+    }
 
-    # Associer avec les noms des produits
     resultats = []
-    for produit_id, quantite in ventes.items():
-        produit = next((p for p in produits if p["id"] == produit_id), None)
-        if produit:
-            resultats.append(
-                {
-                    "id": produit_id,
-                    "nom": produit["nom"],
-                    "quantite_vendue": quantite,
-                    "revenus": revenus[produit_id],
-                }
-            )
-
-    # Trier par quantité vendue
-    resultats.sort(key=lambda x: x["quantite_vendue"], reverse=True)
+    for produit_id, vente in meilleures_ventes(ventes, limite):
+        produit = trouver_produit(produits, int(produit_id))
+        resultats.append(
+            {
+                "id": produit["id"],
+                "nom": produit["nom"],
+                "quantite_vendue": vente["quantite"],
+                "revenus": vente["revenus"],
+            }
+        )
 
-    return resultats[:limite]
+    return resultats
 
 
 def graphique_top_produits():
     """Génère un graphique des produits les plus vendus."""
-    top = top_produits(5)
-
-    if not top:
-        print("Aucune donnée à afficher.")
-        return
-
-    noms = [p["nom"] for p in top]
-    quantites = [p["quantite_vendue"] for p in top]
-
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=quantites, y=noms, palette="viridis")
-    plt.xlabel("Quantité vendue")
-    plt.ylabel("Produit")
-    plt.title("Top 5 des produits les plus vendus")
-    plt.tight_layout()
-    plt.show()
+    from modules import graphiques  # matplotlib n'est chargé qu'ici (voir modules.graphiques)
+    graphiques.graphique_top_produits()
 
 
 def graphique_revenus():
     """Génère un graphique des revenus par produit."""
-    top = top_produits(5)
-
-    if not top:
-        print("Aucune donnée à afficher.")
-        return
-
-    noms = [p["nom"] for p in top]
-    revenus = [p["revenus"] for p in top]
-
-    plt.figure(figsize=(10, 6))
-    colors = sns.color_palette("Blues_r", len(noms))
-    plt.pie(
-        revenus,
-        labels=noms,
-        autopct="%1.1f%%",
-        colors=colors,
-        startangle=90)
-    plt.title("Répartition du chiffre d'affaires par produit")
-    plt.tight_layout()
-    plt.show()
+    from modules import graphiques
+    graphiques.graphique_revenus()
 
 
 def graphique_evolution_ventes():
     """Génère un graphique de l'évolution des ventes."""
-    commandes = charger_commandes()
-    commandes_valides = [c for c in commandes if c["statut"] == "validee"]
-
-    if not commandes_valides:
-        print("Aucune donnée à afficher.")
-        return
-
-    # Grouper par date
-    ventes_par_jour = defaultdict(float)
-    for c in commandes_valides:
-        date = c["date"][:10]  # Garder seulement YYYY-MM-DD
-        ventes_par_jour[date] += c["total"]
-
-    # Trier par date
-    dates = sorted(ventes_par_jour.keys())
-    totaux = [ventes_par_jour[d] for d in dates]
-
-    plt.figure(figsize=(10, 6))
-    plt.plot(dates, totaux, marker="o", linewidth=2, markersize=8)
-    plt.xlabel("Date")
-    plt.ylabel("Chiffre d'affaires (€)")
-    plt.title("Évolution des ventes")
-    plt.xticks(rotation=45)
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plt.show()
+    from modules import graphiques
+    graphiques.graphique_evolution_ventes()
 
 
 def afficher_tableau_bord():
@@ -155,23 +89,55 @@ def afficher_tableau_bord():
             f"{i}. {p['nom']} : {p['quantite_vendue']} vendus ({p['revenus']:.2f}€)"
         )
 
-def get_evolution_ventes_json():
-    """Retourne les données d'évolution des ventes en format JSON."""
-    commandes = charger_commandes()
-    commandes_valides = [c for c in commandes if c["statut"] == "validee"]
 
-    # Grouper par date
-    ventes_par_jour = defaultdict(float)
-    for c in commandes_valides:
-        date = c["date"][:10]  # Garder seulement YYYY-MM-DD
-        ventes_par_jour[date] += c["total"]
+def _jour_valide(jour):
+    """Indique si `jour` est une date YYYY-MM-DD (une date mal formée dans le CSV est ignorée)."""
+    try:
+        return date.fromisoformat(jour).isoformat() == jour
+    except (TypeError, ValueError):
+        return False
+
+
+def _semaine(jour):
+    """Lundi de la semaine ISO du jour (YYYY-MM-DD)."""
+    debut = date.fromisoformat(jour)
+    return (debut - timedelta(days=debut.weekday())).isoformat()
+
+
+# Granularités de l'évolution des ventes : jour (YYYY-MM-DD) -> clé de la période
+GRANULARITES = {
+    "day": lambda jour: jour,
+    "week": _semaine,
+    "month": lambda jour: jour[:7],
+}
+
+
+def get_evolution_ventes_json(agregats=None, debut=None, fin=None, granularite="day"):
+    """
+    Retourne les données d'évolution des ventes en format JSON.
+
+    `debut` et `fin` (YYYY-MM-DD, inclus) restreignent la période ; `granularite`
+    ("day", "week" ou "month") regroupe les cumuls quotidiens par jour, par
+    semaine (lundi de la semaine) ou par mois (YYYY-MM). Les jours qui ne sont
+    pas des dates valides (commande à la date mal formée) sont ignorés.
+    """
+    agregats = agregats if agregats is not None else charger_agregats()
+    periode = GRANULARITES[granularite]
+
+    # Chiffre d'affaires par jour (YYYY-MM-DD), tenu à jour à chaque validation
+    ventes_par_jour = agregats["revenus_par_jour"]
+
+    # Jours de la période, triés, fusionnés dans leur période
+    totaux = {}
+    for jour in jours_de_ventes(agregats, debut, fin):
+        if not _jour_valide(jour):
+            continue
+        cle = periode(jour)
+        totaux[cle] = round(totaux.get(cle, 0) + ventes_par_jour[jour], 2)
 
-    # Trier par date
-    dates = sorted(ventes_par_jour.keys())
-    
     return {
-        "dates": dates,
-        "totaux": [ventes_par_jour[d] for d in dates]
+        "dates": list(totaux),
+        "totaux": list(totaux.values())
     }
 
 
@@ -180,10 +146,14 @@ def get_top_produits_json(limite=5):
     return top_produits(limite)
 
 
-def get_revenus_par_produit_json(limite=5):
-    """Retourne les revenus par produit en format JSON pour un graphique en secteurs."""
-    top = top_produits(limite)
-    
+def get_revenus_par_produit_json(limite=5, top=None):
+    """
+    Retourne les revenus par produit en format JSON pour un graphique en secteurs.
+    `top` : résultat de top_produits() déjà calculé, le cas échéant.
+    """
+    if top is None:
+        top = top_produits(limite)
+
     return {
         "noms": [p["nom"] for p in top],
         "revenus": [p["revenus"] for p in top]
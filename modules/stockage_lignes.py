@@ -0,0 +1,284 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+
+from modules import config
+from modules.fichiers import (ecrire_binaire_atomique, signature_fichier,
+                              verrou_donnees)
+
+# Stockage binaire des lignes de commandes (config.STOCKAGE_LIGNES = "binaire").
+#
+# Fichier de données (data/lignes_commandes.dat) : l'en-tête MAGIQUE_DONNEES puis
+# des enregistrements de taille fixe, dans l'ordre d'ajout. Ajouter une ligne est
+# une seule écriture en fin de fichier ; l'enregistrement n est à la position
+# TAILLE_EN_TETE + n * ENREGISTREMENT.size.
+#
+# Index secondaire (data/lignes_commandes.idx) : l'en-tête MAGIQUE_INDEX puis des
+# couples (commande_id, n) triés, un par enregistrement. Les lignes d'une commande
+# sont une tranche de l'index, trouvée par recherche dichotomique.
+MAGIQUE_DONNEES = b"LIGNES01"
+MAGIQUE_INDEX = b"INDEXC01"
+TAILLE_EN_TETE = 8
+ENREGISTREMENT = struct.Struct("<qqqqdd")
+ENTREE_INDEX = struct.Struct("<qq")
+COLONNES = ("id", "commande_id", "produit_id", "quantite", "prix_unitaire", "total")
+
+# Projections en lecture seule, remplacées quand un des fichiers change
+_cartes = {"signatures": None, "donnees": None, "index": None}
+_verrou_cartes = threading.Lock()
+
+
+def chemin_index():
+    """data/lignes_commandes.dat -> data/lignes_commandes.idx"""
+    return os.path.splitext(config.FICHIER_LIGNES_BINAIRES)[0] + ".idx"
+
+
+def _nombre(taille_fichier, taille_element):
+    # Un enregistrement incomplet en fin de fichier (écriture interrompue) est ignoré
+    return max(taille_fichier - TAILLE_EN_TETE, 0) // taille_element
+
+
+def _enregistrement(ligne):
+    return ENREGISTREMENT.pack(
+        int(ligne["id"]), int(ligne["commande_id"]), int(ligne["produit_id"]),
+        int(ligne["quantite"]), float(ligne["prix_unitaire"]), float(ligne["total"]),
+    )
+
+
+def _index(commande_ids, premier=0):
+    """Entrées d'index triées des enregistrements premier, premier + 1, ..."""
+    numeros = range(premier, premier + len(commande_ids))
+    entrees = array("q")
+    for commande_id, numero in sorted(zip(commande_ids, numeros)):
+        entrees.extend((commande_id, numero))
+    if sys.byteorder != "little":
+        entrees.byteswap()
+    return entrees.tobytes()
+
+
+def _projeter(chemin):
+    """Projette un fichier en mémoire (lecture seule), ou None s'il n'existe pas."""
+    try:
+        with open(chemin, mode="rb") as fichier:
+            return mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):  # ValueError : fichier vide
+        return None
+
+
+def _cartes_a_jour():
+    """
+    Retourne (données, index, nombre d'enregistrements), projetés à jour,
+    ou None si l'index ne couvre pas tous les enregistrements. Sous _verrou_cartes.
+    """
+    signatures = (signature_fichier(config.FICHIER_LIGNES_BINAIRES),
+                  signature_fichier(chemin_index()))
+    if signatures != _cartes["signatures"]:
+        for cle in ("donnees", "index"):
+            if _cartes[cle] is not None:
+                _cartes[cle].close()
+            _cartes[cle] = None
+        _cartes["signatures"] = None
+        _cartes["donnees"] = _projeter(config.FICHIER_LIGNES_BINAIRES)
+        _cartes["index"] = _projeter(chemin_index())
+        _cartes["signatures"] = signatures
+
+    donnees, index = _cartes["donnees"], _cartes["index"]
+    if donnees is None:
+        return None, None, 0
+    if donnees[:TAILLE_EN_TETE] != MAGIQUE_DONNEES:
+        raise ValueError(f"{config.FICHIER_LIGNES_BINAIRES} n'est pas un fichier de lignes")
+    nombre = _nombre(len(donnees), ENREGISTREMENT.size)
+    if (index is None or index[:TAILLE_EN_TETE] != MAGIQUE_INDEX
+            or _nombre(len(index), ENTREE_INDEX.size) != nombre):
+        return None
+    return donnees, index, nombre
+
+
+def _lire(operation):
+    """Exécute operation(données, index, nombre) sur des projections à jour."""
+    while True:
+        with _verrou_cartes:
+            cartes = _cartes_a_jour()
+            if cartes is not None:
+                return operation(*cartes)
+        # Index absent ou en retard (écriture interrompue) : reconstruit sous le
+        # verrou des données, pris hors de _verrou_cartes pour ne pas s'interbloquer
+        with verrou_donnees():
+            with _verrou_cartes:
+                cartes = _cartes_a_jour()
+            if cartes is None:
+                reconstruire_index()
+
+
+def reconstruire_index():
+    """Réécrit l'index à partir du fichier de données (sous verrou_donnees)."""
+    try:
+        with open(config.FICHIER_LIGNES_BINAIRES, mode="rb") as fichier:
+            contenu = fichier.read()
+    except FileNotFoundError:
+        return
+    nombre = _nombre(len(contenu), ENREGISTREMENT.size)
+    commande_ids = [
+        valeurs[1] for valeurs in ENREGISTREMENT.iter_unpack(
+            contenu[TAILLE_EN_TETE:TAILLE_EN_TETE + nombre * ENREGISTREMENT.size])
+    ]
+    ecrire_binaire_atomique(chemin_index(), MAGIQUE_INDEX + _index(commande_ids))
+
+
+def _en_ligne(valeurs):
+    return dict(zip(COLONNES, valeurs))
+
+
+def charger_lignes():
+    """Toutes les lignes, dans l'ordre d'ajout."""
+    def lire(donnees, _index_cartes, nombre):
+        if donnees is None:
+            return []
+        fin = TAILLE_EN_TETE + nombre * ENREGISTREMENT.size
+        return [_en_ligne(valeurs)
+                for valeurs in ENREGISTREMENT.iter_unpack(donnees[TAILLE_EN_TETE:fin])]
+    return _lire(lire)
+
+
+def _premiere_entree(index, nombre, commande_id):
+    """Position de la première entrée d'index dont la commande est >= commande_id."""
+    debut, fin = 0, nombre
+    while debut < fin:
+        milieu = (debut + fin) // 2
+        (cle,) = struct.unpack_from("<q", index, TAILLE_EN_TETE + milieu * ENTREE_INDEX.size)
+        if cle < commande_id:
+            debut = milieu + 1
+        else:
+            fin = milieu
+    return debut
+
+
+def _lignes_commande(donnees, index, nombre, commande_id):
+    lignes = []
+    position = _premiere_entree(index, nombre, commande_id)
+    while position < nombre:
+        cle, numero = ENTREE_INDEX.unpack_from(index, TAILLE_EN_TETE + position * ENTREE_INDEX.size)
+        if cle != commande_id:
+            break
+        lignes.append(_en_ligne(ENREGISTREMENT.unpack_from(
+            donnees, TAILLE_EN_TETE + numero * ENREGISTREMENT.size)))
+        position += 1
+    return lignes
+
+
+def charger_lignes_commande(commande_id):
+    """Lignes d'une commande : recherche dichotomique dans l'index puis lecture des enregistrements."""
+    def lire(donnees, index, nombre):
+        if donnees is None:
+            return []
+        return _lignes_commande(donnees, index, nombre, commande_id)
+    return _lire(lire)
+
+
+def charger_lignes_par_commande(commande_ids=None):
+    """Lignes regroupées par commande : {commande_id: [lignes]} (toutes si commande_ids est None)."""
+    if commande_ids is None:
+        lignes_par_commande = {}
+        for ligne in charger_lignes():
+            lignes_par_commande.setdefault(ligne["commande_id"], []).append(ligne)
+        return lignes_par_commande
+
+    commande_ids = set(commande_ids)
+
+    def lire(donnees, index, nombre):
+        lignes_par_commande = {}
+        if donnees is None:
+            return lignes_par_commande
+        for commande_id in commande_ids:
+            lignes = _lignes_commande(donnees, index, nombre, commande_id)
+            if lignes:
+                lignes_par_commande[commande_id] = lignes
+        return lignes_par_commande
+    return _lire(lire)
+
+
+def dernier_id():
+    """ID du dernier enregistrement ajouté (0 si aucun) ; les IDs sont croissants."""
+    def lire(donnees, _index_cartes, nombre):
+        if not nombre:
+            return 0
+        return ENREGISTREMENT.unpack_from(
+            donnees, TAILLE_EN_TETE + (nombre - 1) * ENREGISTREMENT.size)[0]
+    return _lire(lire)
+
+
+def ajouter_lignes(lignes):
+    """
+    Ajoute des lignes en une seule écriture en fin de fichier, puis leurs
+    entrées d'index (sous verrou_donnees). Les commandes nouvelles ayant les
+    plus grands IDs, l'index reste trié par simple ajout ; sinon il est
+    reconstruit, comme un index qui ne couvre pas exactement les données.
+    """
+    if not lignes:
+        return
+    with verrou_donnees():
+        premier = _preparer_donnees()
+        # Index absent, tronqué ou d'un autre format : reconstruit avant l'ajout,
+        # pour ne jamais lire une entrée incomplète ni ajouter derrière elle
+        if not _index_a_jour(premier):
+            reconstruire_index()
+        derniere_cle = None
+        if premier:
+            with open(chemin_index(), mode="rb") as index:
+                index.seek(TAILLE_EN_TETE + (premier - 1) * ENTREE_INDEX.size)
+                derniere_cle = ENTREE_INDEX.unpack(index.read(ENTREE_INDEX.size))[0]
+
+        with open(config.FICHIER_LIGNES_BINAIRES, mode="ab") as fichier:
+            fichier.write(b"".join(_enregistrement(ligne) for ligne in lignes))
+
+        commande_ids = [int(ligne["commande_id"]) for ligne in lignes]
+        if derniere_cle is not None and min(commande_ids) < derniere_cle:
+            reconstruire_index()
+            return
+        with open(chemin_index(), mode="ab") as index:
+            index.write(_index(commande_ids, premier))
+
+
+def _preparer_donnees():
+    """
+    Écrit l'en-tête du fichier de données s'il manque et retire un
+    enregistrement incomplet (écriture interrompue). Retourne le nombre
+    d'enregistrements complets.
+    """
+    with open(config.FICHIER_LIGNES_BINAIRES, mode="ab") as fichier:
+        taille = fichier.tell()
+        if taille < TAILLE_EN_TETE:
+            fichier.truncate(0)
+            fichier.write(MAGIQUE_DONNEES)
+            taille = TAILLE_EN_TETE
+        nombre = _nombre(taille, ENREGISTREMENT.size)
+        if taille != TAILLE_EN_TETE + nombre * ENREGISTREMENT.size:
+            fichier.truncate(TAILLE_EN_TETE + nombre * ENREGISTREMENT.size)
+    return nombre
+
+
+def _index_a_jour(nombre):
+    """Indique si l'index a son en-tête et exactement une entrée par enregistrement."""
+    try:
+        with open(chemin_index(), mode="rb") as index:
+            magique = index.read(TAILLE_EN_TETE)
+            taille = index.seek(0, os.SEEK_END)
+    except FileNotFoundError:
+        return False
+    return magique == MAGIQUE_INDEX and taille == TAILLE_EN_TETE + nombre * ENTREE_INDEX.size
+
+
+def sauvegarder_lignes(lignes):
+    """Réécrit toutes les lignes et l'index (sous verrou_donnees)."""
+    with verrou_donnees():
+        ecrire_binaire_atomique(
+            config.FICHIER_LIGNES_BINAIRES,
+            MAGIQUE_DONNEES + b"".join(_enregistrement(ligne) for ligne in lignes),
+        )
+        ecrire_binaire_atomique(
+            chemin_index(),
+            MAGIQUE_INDEX + _index([int(ligne["commande_id"]) for ligne in lignes]),
+        )
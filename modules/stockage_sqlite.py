@@ -0,0 +1,489 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from modules import config
+from modules.index import ListeIndexee
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS produits (
+    id INTEGER PRIMARY KEY,
+    nom TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    prix REAL NOT NULL,
+    quantite INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS commandes (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL,
+    statut TEXT NOT NULL,
+    total REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_commandes_username ON commandes(username);
+
+CREATE TABLE IF NOT EXISTS lignes_commandes (
+    id INTEGER PRIMARY KEY,
+    commande_id INTEGER NOT NULL REFERENCES commandes(id),
+    produit_id INTEGER NOT NULL,
+    quantite INTEGER NOT NULL,
+    prix_unitaire REAL NOT NULL,
+    total REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lignes_commande_id ON lignes_commandes(commande_id);
+
+CREATE TABLE IF NOT EXISTS utilisateurs (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    salt TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    role TEXT NOT NULL DEFAULT 'user',
+    hachage TEXT NOT NULL DEFAULT 'sha256'
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_utilisateurs_username ON utilisateurs(username);
+"""
+
+COLONNES_PRODUITS = ["id", "nom", "description", "prix", "quantite"]
+COLONNES_COMMANDES = ["id", "username", "date", "statut", "total"]
+COLONNES_LIGNES = ["id", "commande_id", "produit_id", "quantite", "prix_unitaire", "total"]
+COLONNES_UTILISATEURS = ["id", "username", "password_hash", "salt", "created_at", "role",
+                         "hachage"]
+
+# Nombre maximal de paramètres par requête "IN (...)"
+TAILLE_LOT_IN = 500
+
+_local = threading.local()
+
+
+class _Abandon(Exception):
+    """Interrompt une transaction avec un message destiné à l'utilisateur."""
+
+
+# ==================== CONNEXION ====================
+
+
+def connexion():
+    """Retourne la connexion SQLite du thread courant (créée à la demande)."""
+    connexions = getattr(_local, "connexions", None)
+    if connexions is None:
+        connexions = _local.connexions = {}
+
+    chemin = config.FICHIER_BASE_SQLITE
+    if chemin not in connexions:
+        # isolation_level=None : les transactions sont ouvertes explicitement
+        cnx = sqlite3.connect(chemin, timeout=10, isolation_level=None)
+        cnx.row_factory = sqlite3.Row
+        cnx.execute("PRAGMA journal_mode=WAL")
+        cnx.execute("PRAGMA synchronous=NORMAL")
+        cnx.executescript(SCHEMA)
+        _migrer_schema(cnx)
+        connexions[chemin] = cnx
+    return connexions[chemin]
+
+
+def _migrer_schema(cnx):
+    """Ajoute les colonnes apparues après la création d'une base existante."""
+    colonnes = {r["name"] for r in cnx.execute("PRAGMA table_info(utilisateurs)")}
+    if "hachage" not in colonnes:
+        cnx.execute("ALTER TABLE utilisateurs ADD COLUMN hachage TEXT NOT NULL DEFAULT 'sha256'")
+
+
+@contextmanager
+def transaction():
+    """Transaction d'écriture (BEGIN IMMEDIATE) validée ou annulée en bloc."""
+    cnx = connexion()
+    cnx.execute("BEGIN IMMEDIATE")
+    try:
+        yield cnx
+    except BaseException:
+        cnx.execute("ROLLBACK")
+        raise
+    cnx.execute("COMMIT")
+
+
+def _inserer(cnx, table, colonnes, lignes):
+    """INSERT OR REPLACE de plusieurs lignes (dicts) dans une table."""
+    requete = (
+        f"INSERT OR REPLACE INTO {table} ({', '.join(colonnes)}) "  # nosec B608 - noms internes
+        f"VALUES ({', '.join('?' for _ in colonnes)})"
+    )
+    cnx.executemany(requete, ([ligne[c] for c in colonnes] for ligne in lignes))
+
+
+def _synchroniser(table, colonnes, lignes):
+    """Remplace le contenu d'une table par `lignes` en une seule transaction."""
+    with transaction() as cnx:
+        ids_existants = {r[0] for r in cnx.execute(f"SELECT id FROM {table}")}  # nosec B608
+        ids_conserves = {ligne["id"] for ligne in lignes}
+        cnx.executemany(
+            f"DELETE FROM {table} WHERE id = ?",  # nosec B608
+            ((i,) for i in ids_existants - ids_conserves),
+        )
+        _inserer(cnx, table, colonnes, lignes)
+
+
+# ==================== PRODUITS ====================
+
+
+def charger_produits():
+    """Charge tous les produits."""
+    lignes = connexion().execute("SELECT * FROM produits ORDER BY id")
+    return ListeIndexee((dict(r) for r in lignes), cle="id")
+
+
+def parcourir_produits():
+    """Parcourt les produits un par un, sans tout charger en mémoire."""
+    for ligne in connexion().execute("SELECT * FROM produits ORDER BY id"):
+        yield dict(ligne)
+
+
+def sauvegarder_produits(produits):
+    """Remplace le catalogue complet."""
+    _synchroniser("produits", COLONNES_PRODUITS, produits)
+
+
+def inserer_produit(produit):
+    """Insère un nouveau produit ; son ID est attribué par la base."""
+    with transaction() as cnx:
+        curseur = cnx.execute(
+            "INSERT INTO produits (nom, description, prix, quantite) VALUES (?, ?, ?, ?)",
+            (produit["nom"], produit["description"], produit["prix"], produit["quantite"]),
+        )
+    produit["id"] = curseur.lastrowid
+    return produit
+
+
+def enregistrer_produit(produit):
+    """Insère ou met à jour un seul produit."""
+    with transaction() as cnx:
+        _inserer(cnx, "produits", COLONNES_PRODUITS, [produit])
+
+
+def supprimer_produit(id_produit):
+    """Supprime un produit par son ID."""
+    with transaction() as cnx:
+        cnx.execute("DELETE FROM produits WHERE id = ?", (id_produit,))
+
+
+# ==================== COMMANDES ====================
+
+
+def charger_commandes(username=None):
+    """Charge les commandes (requête sur l'index username si fourni)."""
+    cnx = connexion()
+    if username is None:
+        lignes = cnx.execute("SELECT * FROM commandes ORDER BY id")
+    else:
+        lignes = cnx.execute(
+            "SELECT * FROM commandes WHERE username = ? ORDER BY id", (username,)
+        )
+    return ListeIndexee((dict(r) for r in lignes), cle="id")
+
+
+def parcourir_commandes(depuis=None):
+    """Parcourt les commandes une par une (à partir de la date `depuis` si fournie)."""
+    if depuis is None:
+        lignes = connexion().execute("SELECT * FROM commandes ORDER BY id")
+    else:
+        lignes = connexion().execute(
+            "SELECT * FROM commandes WHERE date >= ? ORDER BY id", (depuis,)
+        )
+    for ligne in lignes:
+        yield dict(ligne)
+
+
+def charger_commande(commande_id):
+    """Charge une seule commande par son ID, ou None."""
+    ligne = connexion().execute(
+        "SELECT * FROM commandes WHERE id = ?", (commande_id,)
+    ).fetchone()
+    return dict(ligne) if ligne else None
+
+
+def charger_lignes_commandes(commande_id=None):
+    """Charge les lignes de commandes (requête sur l'index commande_id si fourni)."""
+    cnx = connexion()
+    if commande_id is None:
+        lignes = cnx.execute("SELECT * FROM lignes_commandes ORDER BY id")
+    else:
+        lignes = cnx.execute(
+            "SELECT * FROM lignes_commandes WHERE commande_id = ? ORDER BY id",
+            (commande_id,),
+        )
+    return [dict(r) for r in lignes]
+
+
+def charger_lignes_par_commande(commande_ids=None):
+    """Charge les lignes regroupées par commande_id : {commande_id: [lignes]}."""
+    cnx = connexion()
+    if commande_ids is None:
+        curseurs = [cnx.execute("SELECT * FROM lignes_commandes ORDER BY commande_id, id")]
+    else:
+        ids = list(set(commande_ids))
+        curseurs = []
+        for debut in range(0, len(ids), TAILLE_LOT_IN):
+            lot = ids[debut:debut + TAILLE_LOT_IN]
+            curseurs.append(cnx.execute(
+                "SELECT * FROM lignes_commandes "  # nosec B608 - uniquement des "?"
+                f"WHERE commande_id IN ({', '.join('?' for _ in lot)}) "
+                "ORDER BY commande_id, id",
+                lot,
+            ))
+
+    lignes_par_commande = {}
+    for curseur in curseurs:
+        for r in curseur:
+            lignes_par_commande.setdefault(r["commande_id"], []).append(dict(r))
+    return lignes_par_commande
+
+
+def sauvegarder_commandes(commandes):
+    """Remplace toutes les commandes."""
+    _synchroniser("commandes", COLONNES_COMMANDES, commandes)
+
+
+def sauvegarder_lignes_commandes(lignes):
+    """Remplace toutes les lignes de commandes."""
+    _synchroniser("lignes_commandes", COLONNES_LIGNES, lignes)
+
+
+def changer_statut_commande(id_commande, statut):
+    """Met à jour le statut d'une commande."""
+    with transaction() as cnx:
+        cnx.execute("UPDATE commandes SET statut = ? WHERE id = ?", (statut, id_commande))
+
+
+def creer_commande(items_panier, username):
+    """
+    Crée une commande en une seule transaction : réservation du stock
+    (UPDATE conditionnel), insertion de la commande et de ses lignes.
+
+    Returns:
+        tuple: (commande, message) ou (None, message_erreur)
+    """
+    try:
+        with transaction() as cnx:
+            nouvelles_lignes = []
+            for item in items_panier:
+                produit = cnx.execute(
+                    "SELECT id, nom, prix, quantite FROM produits WHERE id = ?",
+                    (item["produit_id"],),
+                ).fetchone()
+                if not produit:
+                    raise _Abandon(f"Produit #{item['produit_id']} introuvable.")
+
+                reserve = cnx.execute(
+                    "UPDATE produits SET quantite = quantite - ? WHERE id = ? AND quantite >= ?",
+                    (item["quantite"], produit["id"], item["quantite"]),
+                )
+                if reserve.rowcount == 0:
+                    disponible = cnx.execute(
+                        "SELECT quantite FROM produits WHERE id = ?", (produit["id"],)
+                    ).fetchone()[0]
+                    raise _Abandon(
+                        f"Stock insuffisant pour {produit['nom']}. Disponible : {disponible}"
+                    )
+
+                nouvelles_lignes.append({
+                    "produit_id": item["produit_id"],
+                    "quantite": item["quantite"],
+                    "prix_unitaire": produit["prix"],
+                    "total": produit["prix"] * item["quantite"],
+                })
+
+            nouvelle_commande = {
+                "username": username,
+                "date": datetime.now().isoformat(),
+                "statut": "en_attente",
+                "total": sum(ligne["total"] for ligne in nouvelles_lignes),
+            }
+            curseur = cnx.execute(
+                "INSERT INTO commandes (username, date, statut, total) VALUES (?, ?, ?, ?)",
+                (nouvelle_commande["username"], nouvelle_commande["date"],
+                 nouvelle_commande["statut"], nouvelle_commande["total"]),
+            )
+            nouvelle_commande = {"id": curseur.lastrowid, **nouvelle_commande}
+
+            for ligne in nouvelles_lignes:
+                ligne["commande_id"] = nouvelle_commande["id"]
+                curseur = cnx.execute(
+                    "INSERT INTO lignes_commandes "
+                    "(commande_id, produit_id, quantite, prix_unitaire, total) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (ligne["commande_id"], ligne["produit_id"], ligne["quantite"],
+                     ligne["prix_unitaire"], ligne["total"]),
+                )
+                ligne["id"] = curseur.lastrowid
+    except _Abandon as erreur:
+        return None, str(erreur)
+
+    nouvelle_commande["lignes"] = [
+        {c: ligne[c] for c in COLONNES_LIGNES} for ligne in nouvelles_lignes
+    ]
+    return nouvelle_commande, "Commande créée avec succès."
+
+
+def annuler_commande(id_commande):
+    """Annule une commande et restaure le stock, en une seule transaction."""
+    try:
+        with transaction() as cnx:
+            commande = cnx.execute(
+                "SELECT statut FROM commandes WHERE id = ?", (id_commande,)
+            ).fetchone()
+            if not commande:
+                raise _Abandon("Commande introuvable.")
+            if commande["statut"] == "annulee":
+                raise _Abandon("Commande déjà annulée.")
+
+            quantites = cnx.execute(
+                "SELECT produit_id, SUM(quantite) FROM lignes_commandes "
+                "WHERE commande_id = ? GROUP BY produit_id",
+                (id_commande,),
+            ).fetchall()
+            cnx.executemany(
+                "UPDATE produits SET quantite = quantite + ? WHERE id = ?",
+                ((quantite, produit_id) for produit_id, quantite in quantites),
+            )
+            cnx.execute(
+                "UPDATE commandes SET statut = 'annulee' WHERE id = ?", (id_commande,)
+            )
+    except _Abandon as erreur:
+        return False, str(erreur)
+
+    return True, "Commande annulée."
+
+
+def valider_commande(id_commande):
+    """Valide une commande en attente."""
+    with transaction() as cnx:
+        curseur = cnx.execute(
+            "UPDATE commandes SET statut = 'validee' WHERE id = ? AND statut = 'en_attente'",
+            (id_commande,),
+        )
+        if curseur.rowcount:
+            return True, "Commande validée."
+        existe = cnx.execute(
+            "SELECT 1 FROM commandes WHERE id = ?", (id_commande,)
+        ).fetchone()
+
+    if not existe:
+        return False, "Commande introuvable."
+    return False, "Cette commande ne peut pas être validée."
+
+
+def traiter_commandes(operations):
+    """
+    Valide ou annule plusieurs commandes [(id_commande, "valider" | "annuler")]
+    dans l'ordre, en une seule transaction. Retourne (résultats, traitées) :
+    un (succès, message) par opération et les (action, commande, ancien_statut) réussies.
+    """
+    resultats, traitees = [], []
+    with transaction() as cnx:
+        for id_commande, action in operations:
+            commande = cnx.execute("SELECT * FROM commandes WHERE id = ?", (id_commande,)).fetchone()
+            if not commande:
+                resultats.append((False, "Commande introuvable."))
+                continue
+
+            commande = dict(commande)
+            ancien_statut = commande["statut"]
+            if action == "valider":
+                if ancien_statut != "en_attente":
+                    resultats.append((False, "Cette commande ne peut pas être validée."))
+                    continue
+                commande["statut"] = "validee"
+                resultats.append((True, "Commande validée."))
+            else:
+                if ancien_statut == "annulee":
+                    resultats.append((False, "Commande déjà annulée."))
+                    continue
+                quantites = cnx.execute(
+                    "SELECT produit_id, SUM(quantite) FROM lignes_commandes "
+                    "WHERE commande_id = ? GROUP BY produit_id",
+                    (id_commande,),
+                ).fetchall()
+                cnx.executemany(
+                    "UPDATE produits SET quantite = quantite + ? WHERE id = ?",
+                    ((quantite, produit_id) for produit_id, quantite in quantites),
+                )
+                commande["statut"] = "annulee"
+                resultats.append((True, "Commande annulée."))
+
+            cnx.execute(
+                "UPDATE commandes SET statut = ? WHERE id = ?", (commande["statut"], id_commande)
+            )
+            traitees.append((action, commande, ancien_statut))
+    return resultats, traitees
+
+
+# ==================== UTILISATEURS ====================
+
+
+def charger_utilisateurs():
+    """Charge tous les utilisateurs (indexés par username)."""
+    lignes = connexion().execute("SELECT * FROM utilisateurs ORDER BY id")
+    return ListeIndexee((dict(r) for r in lignes), cle="username")
+
+
+def parcourir_utilisateurs(depuis=None):
+    """Parcourt les utilisateurs un par un (créés à partir de `depuis` si fourni)."""
+    if depuis is None:
+        lignes = connexion().execute("SELECT * FROM utilisateurs ORDER BY id")
+    else:
+        lignes = connexion().execute(
+            "SELECT * FROM utilisateurs WHERE created_at >= ? ORDER BY id", (depuis,)
+        )
+    for ligne in lignes:
+        yield dict(ligne)
+
+
+def charger_utilisateur(username):
+    """Charge un utilisateur par son nom (index unique), ou None."""
+    ligne = connexion().execute(
+        "SELECT * FROM utilisateurs WHERE username = ?", (username,)
+    ).fetchone()
+    return dict(ligne) if ligne else None
+
+
+def sauvegarder_utilisateurs(utilisateurs):
+    """Remplace tous les utilisateurs."""
+    _synchroniser("utilisateurs", COLONNES_UTILISATEURS, utilisateurs)
+
+
+def ajouter_utilisateur(utilisateur):
+    """Insère un utilisateur ; son ID est attribué par la base."""
+    with transaction() as cnx:
+        curseur = cnx.execute(
+            "INSERT INTO utilisateurs (username, password_hash, salt, created_at, role, hachage) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (utilisateur["username"], utilisateur["password_hash"], utilisateur["salt"],
+             utilisateur["created_at"], utilisateur["role"], utilisateur["hachage"]),
+        )
+    utilisateur["id"] = curseur.lastrowid
+    return utilisateur
+
+
+def changer_hash_utilisateur(username, password_hash, salt, hachage):
+    """Remplace le hash du mot de passe d'un utilisateur (rehachage)."""
+    with transaction() as cnx:
+        cnx.execute(
+            "UPDATE utilisateurs SET password_hash = ?, salt = ?, hachage = ? WHERE username = ?",
+            (password_hash, salt, hachage, username),
+        )
+
+
+# ==================== IMPORT ====================
+
+
+def importer_donnees(produits, commandes, lignes, utilisateurs):
+    """Remplit la base à partir de données chargées (ex. depuis les CSV)."""
+    with transaction() as cnx:
+        for table in ("lignes_commandes", "commandes", "produits", "utilisateurs"):
+            cnx.execute(f"DELETE FROM {table}")  # nosec B608 - noms internes
+        _inserer(cnx, "produits", COLONNES_PRODUITS, produits)
+        _inserer(cnx, "commandes", COLONNES_COMMANDES, commandes)
+        _inserer(cnx, "lignes_commandes", COLONNES_LIGNES, lignes)
+        _inserer(cnx, "utilisateurs", COLONNES_UTILISATEURS, utilisateurs)
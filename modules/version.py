@@ -0,0 +1,48 @@
+import hashlib
+
+from modules import agregats, auth, commandes, config, produits
+from modules.fichiers import signature_fichier
+
+
+def _fichiers_source(source):
+    """Fichiers dont dépend une source de données, le fichier principal en premier."""
+    if source == "agregats":
+        return [agregats.FICHIER_AGREGATS, agregats.FICHIER_JOURNAL_AGREGATS]
+    if config.utilise_sqlite():
+        return [config.FICHIER_BASE_SQLITE, config.FICHIER_BASE_SQLITE + "-wal"]
+    if source == "produits":
+        return [produits.FICHIER_PRODUITS]
+    if source == "commandes":
+        return [commandes.FICHIER_COMMANDES, commandes.FICHIER_STATUTS_COMMANDES]
+    if source == "lignes_commandes":
+        if config.utilise_lignes_binaires():
+            return [config.FICHIER_LIGNES_BINAIRES]
+        return [commandes.FICHIER_LIGNES_COMMANDES]
+    if source == "utilisateurs":
+        return [auth.FICHIER_UTILISATEURS]
+    raise ValueError(f"Source de données inconnue : {source}")
+
+
+def version_donnees(*sources):
+    """
+    Version opaque des sources de données ("produits", "commandes",
+    "lignes_commandes", "utilisateurs", "agregats").
+
+    Dérivée de la signature (inode, mtime, taille) des fichiers : elle change
+    à chaque sauvegarde, y compris par un autre processus, sans relire les données.
+
+    Retourne None si le fichier principal d'une source n'existe pas : la
+    version ne serait pas celle des données servies ensuite.
+    """
+    if "agregats" in sources:
+        # Reconstruits à la première lecture : ils doivent exister avant d'être versionnés
+        agregats.charger_agregats()
+
+    empreinte = hashlib.sha1(usedforsecurity=False)
+    for source in sources:
+        for numero, chemin in enumerate(_fichiers_source(source)):
+            signature = signature_fichier(chemin)
+            if signature is None and numero == 0:
+                return None
+            empreinte.update(f"{chemin}={signature};".encode())
+    return empreinte.hexdigest()
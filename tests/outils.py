@@ -0,0 +1,60 @@
+import os
+import tempfile
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+
+from modules import (agregats, auth, commandes, config, fichiers, jetons, produits,
+                     stockage_lignes)
+
+# Fichiers de données redirigés vers le dossier temporaire : (module, attribut)
+CHEMINS_DONNEES = [
+    (fichiers, "FICHIER_VERROU"),
+    (config, "FICHIER_BASE_SQLITE"),
+    (config, "FICHIER_LIGNES_BINAIRES"),
+    (produits, "FICHIER_PRODUITS"),
+    (commandes, "FICHIER_COMMANDES"),
+    (commandes, "FICHIER_LIGNES_COMMANDES"),
+    (commandes, "FICHIER_STATUTS_COMMANDES"),
+    (agregats, "FICHIER_AGREGATS"),
+    (agregats, "FICHIER_JOURNAL_AGREGATS"),
+    (auth, "FICHIER_UTILISATEURS"),
+    (jetons, "FICHIER_JETONS_REVOQUES"),
+]
+
+
+def vider_caches():
+    """Oublie les données gardées en mémoire par les modules (catalogue, agrégats, jetons, projections)."""
+    produits.vider_cache_produits()
+    jetons.vider_cache_jetons()
+    jetons._revocations["signature"] = None
+    agregats._cache_agregats["signatures"] = None
+    with stockage_lignes._verrou_cartes:
+        for cle in ("donnees", "index"):
+            if stockage_lignes._cartes[cle] is not None:
+                stockage_lignes._cartes[cle].close()
+        stockage_lignes._cartes.update(signatures=None, donnees=None, index=None)
+
+
+@contextmanager
+def donnees_temporaires(**reglages):
+    """
+    Redirige les fichiers de données vers un dossier temporaire vide, en
+    stockage CSV, et remet les modules dans leur état d'origine à la sortie,
+    même si le test échoue. `reglages` remplace des paramètres de
+    modules.config (ex. STOCKAGE_LIGNES="binaire"). Produit le dossier.
+    """
+    with tempfile.TemporaryDirectory() as dossier, ExitStack() as pile:
+        for module, attribut in CHEMINS_DONNEES:
+            chemin = os.path.join(dossier, os.path.basename(getattr(module, attribut)))
+            pile.enter_context(mock.patch.object(module, attribut, chemin))
+        pile.enter_context(mock.patch.object(auth._ecrivain_logs, "chemin",
+                                             os.path.join(dossier, "logs.csv")))
+        for nom, valeur in {"BACKEND_STOCKAGE": "csv", **reglages}.items():
+            pile.enter_context(mock.patch.object(config, nom, valeur))
+
+        # Exécutés à la sortie, avant la restauration des chemins (ordre inverse) :
+        # les logs en attente sont écrits dans le dossier temporaire
+        pile.callback(vider_caches)
+        pile.callback(auth._ecrivain_logs.vider)
+        vider_caches()
+        yield dossier
@@ -0,0 +1,109 @@
+import json
+import os
+import random
+from unittest import mock
+
+from modules import agregats, analytique, commandes, produits
+from modules.fichiers import ecrire_csv_atomique
+from tests.outils import donnees_temporaires
+
+
+def au_centime(donnees):
+    """Agrégats comparables : montants en centimes, sans la position dans le journal."""
+    if isinstance(donnees, dict):
+        return {cle: au_centime(valeur) for cle, valeur in donnees.items()
+                if cle not in ("journal", "position")}
+    if isinstance(donnees, float):
+        return round(donnees * 100)
+    return donnees
+
+
+def verifier(incremental):
+    """Les agrégats tenus par événements valent ceux recalculés depuis l'historique."""
+    historique = (commandes.charger_commandes(), commandes.charger_lignes_commandes())
+    attendu = au_centime(agregats._calculer_agregats_python(*historique))
+    assert au_centime(incremental) == attendu, (au_centime(incremental), attendu)
+    if analytique.disponible():
+        assert au_centime(agregats._calculer_agregats_colonnes(*historique)) == attendu
+    return attendu
+
+
+# Seuil du journal abaissé pour le replier plusieurs fois pendant le test
+with donnees_temporaires(STOCKAGE_LIGNES="csv"), \
+        mock.patch.object(agregats, "TAILLE_MAX_JOURNAL_AGREGATS", 8 * 1024):
+    ecrire_csv_atomique(produits.FICHIER_PRODUITS, produits.COLONNES_PRODUITS, [
+        {"id": i, "nom": f"Produit {i}", "description": "", "prix": i * 1.35 + 0.99,
+         "quantite": 100000}
+        for i in range(1, 11)
+    ])
+
+    print(f"Moteur NumPy : {'oui' if analytique.disponible() else 'non (NumPy absent)'}")
+    print("=== Test : agrégats vides ===")
+    verifier(agregats.charger_agregats())
+
+    print("=== Test : créations, validations et annulations ===")
+    aleatoire = random.Random(7)
+    creees = []
+    compactions = 0
+    for numero in range(600):
+        tirage = aleatoire.random()
+        if tirage < 0.5 or not creees:
+            panier = [{"produit_id": aleatoire.randint(1, 10), "quantite": aleatoire.randint(1, 4)}
+                      for _ in range(aleatoire.randint(1, 3))]
+            commande, _message = commandes.creer_commande(panier, f"client{numero % 5}")
+            creees.append(commande["id"])
+        elif tirage < 0.8:
+            commandes.valider_commande(aleatoire.choice(creees))
+        else:
+            commandes.annuler_commande(aleatoire.choice(creees))
+
+        # Les événements sont ajoutés au journal : agregats.json n'est réécrit qu'au repli
+        if not os.path.exists(agregats.FICHIER_JOURNAL_AGREGATS):
+            compactions += 1
+        if numero % 50 == 0:
+            verifier(agregats.charger_agregats())
+
+    print(f"Replis du journal : {compactions}")
+    assert compactions >= 2
+    attendu = verifier(agregats.charger_agregats())
+    assert attendu["commandes_par_statut"].get("validee")
+    assert attendu["commandes_par_statut"].get("annulee")
+
+    print("=== Test : traitement groupé ===")
+    resultats = commandes.traiter_commandes(
+        [(id_commande, "valider") for id_commande in creees[:100]]
+        + [(id_commande, "annuler") for id_commande in creees[50:80]]
+    )
+    assert any(resultat["succes"] for resultat in resultats)
+    verifier(agregats.charger_agregats())
+
+    print("=== Test : lecture par un autre processus (cache vide) ===")
+    agregats._cache_agregats["signatures"] = None
+    verifier(agregats.charger_agregats())
+
+    print("=== Test : arrêt entre l'écriture d'agregats.json et la suppression du journal ===")
+    commande, _message = commandes.creer_commande([{"produit_id": 2, "quantite": 1}], "client")
+    commandes.valider_commande(commande["id"])
+    with open(agregats.FICHIER_JOURNAL_AGREGATS, mode="rb") as fichier:
+        journal = fichier.read()
+    agregats.compacter_journal_agregats()
+    with open(agregats.FICHIER_JOURNAL_AGREGATS, mode="wb") as fichier:
+        fichier.write(journal)
+    agregats._cache_agregats["signatures"] = None
+    # Les événements du journal restauré sont déjà comptés : ils ne le sont pas deux fois
+    verifier(agregats.charger_agregats())
+
+    print("=== Test : ligne tronquée en fin de journal ===")
+    with open(agregats.FICHIER_JOURNAL_AGREGATS, mode="ab") as fichier:
+        fichier.write(json.dumps({"action": "creation", "statut": "en_attente"}).encode()[:20])
+    verifier(agregats.charger_agregats())
+    commande, _message = commandes.creer_commande([{"produit_id": 3, "quantite": 2}], "client")
+    commandes.valider_commande(commande["id"])
+    verifier(agregats.charger_agregats())
+
+    print("=== Test : reconstruction ===")
+    agregats.invalider_agregats()
+    assert not os.path.exists(agregats.FICHIER_JOURNAL_AGREGATS)
+    verifier(agregats.charger_agregats())
+
+print("Agrégats OK")
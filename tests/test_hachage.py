@@ -0,0 +1,63 @@
+import csv
+import hashlib
+
+from modules import auth, hachage
+from modules.fichiers import ecrire_csv_atomique
+from tests.outils import donnees_temporaires
+
+MOT_DE_PASSE = "Xk9mP2qL7nB4vR"
+
+
+def utilisateur_stocke(username):
+    """Ligne brute du CSV des utilisateurs (sans passer par le cache d'instantanés)."""
+    with open(auth.FICHIER_UTILISATEURS, mode="r", encoding="utf-8") as fichier:
+        for ligne in csv.DictReader(fichier):
+            if ligne["username"] == username:
+                return ligne
+    return None
+
+
+# Coût réduit pour garder le test rapide
+with donnees_temporaires(PROCESSUS_HACHAGE=0, ALGORITHME_HACHAGE="scrypt:n=1024,r=8,p=1"):
+    ecrire_csv_atomique(auth.FICHIER_UTILISATEURS, auth.COLONNES_UTILISATEURS, [
+        # Compte d'avant les hachages configurables : SHA-256 simple, colonne vide
+        {"id": 1, "username": "ancien", "salt": "sel1",
+         "password_hash": hashlib.sha256((MOT_DE_PASSE + "sel1").encode()).hexdigest(),
+         "created_at": "2024-01-01T00:00:00", "role": "user", "hachage": ""},
+        # Bon algorithme mais coût périmé
+        {"id": 2, "username": "cout", "salt": "sel2",
+         "password_hash": hachage.hacher(MOT_DE_PASSE, "sel2", "pbkdf2_sha256:iterations=1000"),
+         "created_at": "2024-01-01T00:00:00", "role": "user",
+         "hachage": "pbkdf2_sha256:iterations=1000"},
+    ])
+    courant = hachage.description_courante()
+
+    for username in ("ancien", "cout"):
+        print(f"=== Test : connexion avec un ancien hash ({username}) ===")
+        avant = utilisateur_stocke(username)
+        assert hachage.doit_rehacher(avant["hachage"] or hachage.ALGORITHME_HISTORIQUE)
+
+        # Mauvais mot de passe : refusé, hash inchangé
+        utilisateur, _message = auth.verifier_connexion(username, "Mauvais123")
+        assert utilisateur is None
+        assert utilisateur_stocke(username) == avant
+
+        utilisateur, message = auth.verifier_connexion(username, MOT_DE_PASSE)
+        assert utilisateur is not None, message
+
+        # Hash réécrit avec l'algorithme configuré et un nouveau salt
+        apres = utilisateur_stocke(username)
+        assert apres["hachage"] == courant
+        assert apres["salt"] != avant["salt"]
+        assert apres["password_hash"] == hachage.hacher(MOT_DE_PASSE, apres["salt"], courant)
+        assert not hachage.doit_rehacher(apres["hachage"])
+        # Les autres colonnes ne changent pas
+        for colonne in ("id", "username", "created_at", "role"):
+            assert apres[colonne] == avant[colonne], colonne
+
+        print(f"=== Test : connexion suivante sans rehachage ({username}) ===")
+        utilisateur, message = auth.verifier_connexion(username, MOT_DE_PASSE)
+        assert utilisateur is not None, message
+        assert utilisateur_stocke(username) == apres
+
+print("Hachage OK")
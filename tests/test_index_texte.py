@@ -0,0 +1,100 @@
+import random
+
+from modules import produits
+from modules.fichiers import ecrire_csv_atomique
+from modules.index import IndexTexte, decouper_mots
+from modules.produits import (POIDS_RECHERCHE, charger_produits,
+                              modifier_produit, rechercher_produits,
+                              supprimer_produit)
+from tests.outils import donnees_temporaires
+
+MOTS = ["Écran", "écrou", "clavier", "Clé", "câble", "cable", "souris", "sourdine",
+        "casque", "USB", "usb-c", "HDMI", "noir", "blanc", "27 pouces", "sans fil"]
+REQUETES = ["ecr", "écran", "cle", "CABLE", "sour", "usb c", "noir cla", "27", "sans fil",
+            "hdmi noir", "introuvable", "ca", "é"]
+
+
+def recherche_naive(documents, requete):
+    """Documents dont chaque mot de la requête commence un mot du nom ou de la description."""
+    mots_requete = decouper_mots(requete)
+    trouves = set()
+    for id_document, document in documents.items():
+        mots = decouper_mots(f"{document['nom']} {document['description']}")
+        if mots_requete and all(any(mot.startswith(m) for mot in mots) for m in mots_requete):
+            trouves.add(id_document)
+    return trouves
+
+
+def texte(aleatoire, nombre):
+    return " ".join(aleatoire.choice(MOTS) for _ in range(nombre))
+
+
+aleatoire = random.Random(3)
+
+print("=== Test : IndexTexte contre une recherche naïve ===")
+index = IndexTexte(POIDS_RECHERCHE)
+documents = {}
+for numero in range(300):
+    id_document = aleatoire.randint(1, 120)
+    if aleatoire.random() < 0.2:
+        index.supprimer(id_document)
+        documents.pop(id_document, None)
+    else:
+        documents[id_document] = {"nom": texte(aleatoire, 2), "description": texte(aleatoire, 4)}
+        index.ajouter(id_document, documents[id_document])
+
+    if numero % 25 == 0:
+        assert len(index) == len(documents)
+        for requete in REQUETES:
+            resultats = index.rechercher(requete, limite=1000)
+            assert {id_document for id_document, _score in resultats} \
+                == recherche_naive(documents, requete), requete
+            # Classement par score décroissant
+            scores = [score for _id, score in resultats]
+            assert scores == sorted(scores, reverse=True)
+
+# Un mot qui n'est plus indexé par aucun document disparaît de la liste triée
+for id_document in list(documents):
+    index.supprimer(id_document)
+assert len(index) == 0 and not index._mots_tries and not index._postings
+assert index.rechercher("ecran") == []
+
+print("=== Test : le nom pèse plus que la description ===")
+index = IndexTexte(POIDS_RECHERCHE)
+index.ajouter(1, {"nom": "Clavier", "description": "Écran"})
+index.ajouter(2, {"nom": "Écran", "description": "Clavier"})
+assert [id_document for id_document, _score in index.rechercher("ecran")] == [2, 1]
+
+print("=== Test : rechercher_produits après modifications et suppressions ===")
+with donnees_temporaires():
+    ecrire_csv_atomique(produits.FICHIER_PRODUITS, produits.COLONNES_PRODUITS, [
+        {"id": i, "nom": texte(aleatoire, 2), "description": texte(aleatoire, 3),
+         "prix": 10.0, "quantite": 5}
+        for i in range(1, 61)
+    ])
+
+    def verifier():
+        catalogue = {p["id"]: p for p in charger_produits()}
+        for requete in REQUETES:
+            trouves = {p["id"] for p in rechercher_produits(requete, limite=1000)}
+            assert trouves == recherche_naive(catalogue, requete), requete
+
+    verifier()
+    for numero in range(40):
+        actuels = charger_produits()
+        produit = aleatoire.choice(actuels)
+        if numero % 3 == 0:
+            supprimer_produit(actuels, produit["id"])
+        else:
+            modifier_produit(actuels, produit["id"], nom=texte(aleatoire, 2),
+                             description=texte(aleatoire, 3))
+        verifier()
+
+    # Catalogue réécrit sans passer par modifier/supprimer (autre processus) : index reconstruit
+    ecrire_csv_atomique(produits.FICHIER_PRODUITS, produits.COLONNES_PRODUITS, [
+        {"id": 1, "nom": "Câble HDMI", "description": "noir", "prix": 10.0, "quantite": 5}
+    ])
+    verifier()
+    assert [p["id"] for p in rechercher_produits("cable")] == [1]
+
+print("IndexTexte OK")
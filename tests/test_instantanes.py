@@ -0,0 +1,87 @@
+import csv
+import os
+
+from modules.instantanes import _lire_fichier, chemin_instantane, charger_csv, ecrire_instantane
+from tests.outils import donnees_temporaires
+
+COLONNES = ["id", "nom", "prix"]
+TYPES = {"id": int, "nom": str, "prix": float}
+conversions = []
+
+
+def convertir(ligne):
+    conversions.append(ligne["id"])
+    return {"id": int(ligne["id"]), "nom": ligne["nom"], "prix": float(ligne["prix"])}
+
+
+def ecrire_csv(chemin, lignes, mode="w"):
+    """Écrit le CSV en place (même inode), comme un éditeur ou un autre outil."""
+    with open(chemin, mode=mode, encoding="utf-8", newline="") as fichier:
+        ecrivain = csv.DictWriter(fichier, fieldnames=COLONNES)
+        if mode == "w":
+            ecrivain.writeheader()
+        ecrivain.writerows(lignes)
+
+
+def charger(chemin):
+    """Retourne (lignes, nombre de lignes parsées depuis le CSV)."""
+    conversions.clear()
+    lignes = charger_csv(chemin, COLONNES, TYPES, convertir)
+    return lignes, len(conversions)
+
+
+def lignes_de(nombre, nom="Produit", prix=1.5):
+    return [{"id": i, "nom": f"{nom} {i}", "prix": prix * i} for i in range(1, nombre + 1)]
+
+
+with donnees_temporaires(INSTANTANES_BINAIRES=True) as dossier:
+    chemin = os.path.join(dossier, "produits.csv")
+
+    print("=== Test : instantané à jour ===")
+    initiales = lignes_de(50)
+    ecrire_csv(chemin, initiales)
+    ecrire_instantane(chemin, COLONNES, TYPES, initiales)
+    assert os.path.exists(chemin_instantane(chemin))
+    assert charger(chemin) == (initiales, 0)
+
+    print("=== Test : CSV réécrit après l'instantané ===")
+    # Même nombre de lignes, même taille : seul le contenu (et le mtime) change
+    modifiees = lignes_de(50, nom="Produiz")
+    etat = os.stat(chemin)
+    ecrire_csv(chemin, modifiees)
+    os.utime(chemin, ns=(etat.st_atime_ns, etat.st_mtime_ns + 1000000))
+    assert os.path.getsize(chemin) == etat.st_size
+    # L'empreinte ne correspond plus : l'instantané est ignoré, tout le CSV est relu
+    assert charger(chemin) == (modifiees, 50)
+    # ... et l'instantané est régénéré pour le nouveau contenu
+    signature, _empreinte, lignes = _lire_fichier(chemin, COLONNES, TYPES)
+    etat = os.stat(chemin)
+    assert signature == (etat.st_ino, etat.st_mtime_ns, etat.st_size)
+    assert lignes == modifiees
+    assert charger(chemin) == (modifiees, 0)
+
+    print("=== Test : CSV raccourci ===")
+    courtes = lignes_de(10, nom="Court")
+    ecrire_csv(chemin, courtes)
+    assert charger(chemin) == (courtes, 10)
+    assert charger(chemin) == (courtes, 0)
+
+    print("=== Test : CSV réécrit puis rallongé ===")
+    # Plus long que la partie couverte, mais le début a changé : pas de lecture partielle
+    longues = lignes_de(30, nom="Long")
+    ecrire_csv(chemin, longues)
+    assert charger(chemin) == (longues, 30)
+
+    print("=== Test : ajouts en fin de fichier ===")
+    ajout = [{"id": 31, "nom": "Ajout", "prix": 9.0}]
+    ecrire_csv(chemin, ajout, mode="a")
+    # Seule la ligne ajoutée est parsée
+    assert charger(chemin) == (longues + ajout, 1)
+
+    print("=== Test : instantané corrompu ===")
+    with open(chemin_instantane(chemin), mode="r+b") as fichier:
+        fichier.truncate(20)
+    assert charger(chemin) == (longues + ajout, 31)
+    assert charger(chemin) == (longues + ajout, 0)
+
+print("Instantanés OK")
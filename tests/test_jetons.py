@@ -0,0 +1,88 @@
+import csv
+import time
+from datetime import timedelta
+from unittest import mock
+
+import jwt
+
+from modules import jetons
+from modules.jetons import (creer_jeton, empreinte_jeton, revoquer_jeton,
+                            statistiques_cache_jetons, verifier_jeton)
+from tests.outils import donnees_temporaires
+
+SECRET = "secret-de-test-assez-long-pour-hmac-sha256"
+
+
+def compteurs():
+    stats = statistiques_cache_jetons()
+    return stats["hits"], stats["misses"]
+
+
+def rejete(jeton, erreur):
+    try:
+        verifier_jeton(jeton, SECRET)
+    except erreur:
+        return True
+    return False
+
+
+with donnees_temporaires():
+    print("=== Test : hits du cache ===")
+    jeton = creer_jeton("marie", "user", SECRET)
+    hits, misses = compteurs()
+    donnees = verifier_jeton(jeton, SECRET)
+    assert (donnees["username"], donnees["role"]) == ("marie", "user")
+    assert compteurs() == (hits, misses + 1)
+    assert verifier_jeton(jeton, SECRET) == donnees
+    assert compteurs() == (hits + 1, misses + 1)
+
+    print("=== Test : jeton invalide jamais mis en cache ===")
+    faux = creer_jeton("marie", "admin", "autre-secret-assez-long-pour-hmac-sha256")
+    assert rejete(faux, jwt.InvalidTokenError)
+    assert rejete(faux, jwt.InvalidTokenError)
+    assert empreinte_jeton(faux) not in jetons._cache_jetons
+
+    print("=== Test : éviction LRU ===")
+    with mock.patch.object(jetons, "TAILLE_MAX_CACHE_JETONS", 3):
+        jetons.vider_cache_jetons()
+        a, b, c, d = (creer_jeton(nom, "user", SECRET) for nom in ("a", "b", "c", "d"))
+        for j in (a, b, c):
+            verifier_jeton(j, SECRET)
+        verifier_jeton(a, SECRET)  # a redevient le plus récent : b est le plus ancien
+        verifier_jeton(d, SECRET)
+        assert list(jetons._cache_jetons) == [empreinte_jeton(j) for j in (c, a, d)]
+        hits, misses = compteurs()
+        verifier_jeton(b, SECRET)
+        assert compteurs() == (hits, misses + 1)
+
+    print("=== Test : expiration d'un jeton en cache ===")
+    with mock.patch.object(jetons, "DUREE_JETON", timedelta(seconds=1)):
+        court = creer_jeton("paul", "user", SECRET)
+    verifier_jeton(court, SECRET)
+    assert empreinte_jeton(court) in jetons._cache_jetons
+    time.sleep(1.1)
+    assert rejete(court, jwt.ExpiredSignatureError)
+    # L'entrée expirée est retirée ; le décodage refuse aussi le jeton
+    assert empreinte_jeton(court) not in jetons._cache_jetons
+    assert rejete(court, jwt.ExpiredSignatureError)
+
+    print("=== Test : révocation d'un jeton en cache ===")
+    jeton = creer_jeton("admin", "admin", SECRET)
+    verifier_jeton(jeton, SECRET)
+    revoquer_jeton(jeton, SECRET)
+    assert rejete(jeton, jwt.InvalidTokenError)
+
+    print("=== Test : révocation par un autre processus ===")
+    jeton = creer_jeton("julie", "user", SECRET)
+    verifier_jeton(jeton, SECRET)
+    assert empreinte_jeton(jeton) in jetons._cache_jetons
+    # Un autre worker ajoute la révocation au fichier : le cache ne la masque pas
+    with open(jetons.FICHIER_JETONS_REVOQUES, mode="a", encoding="utf-8", newline="") as fichier:
+        csv.writer(fichier).writerow([empreinte_jeton(jeton), time.time() + 3600])
+    assert rejete(jeton, jwt.InvalidTokenError)
+    assert empreinte_jeton(jeton) not in jetons._cache_jetons
+
+    # Les autres jetons restent valides
+    assert verifier_jeton(a, SECRET)["username"] == "a"
+
+print("Jetons OK")
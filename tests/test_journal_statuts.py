@@ -0,0 +1,76 @@
+import csv
+import os
+import random
+
+from modules import commandes
+from modules.fichiers import ecrire_csv_atomique
+from tests.outils import donnees_temporaires
+
+STATUTS = ["en_attente", "validee", "annulee"]
+
+
+def rejouer_journal(statuts_initiaux, chemin_journal):
+    """Statuts obtenus en rejouant le journal ligne par ligne sur les statuts du CSV."""
+    statuts = dict(statuts_initiaux)
+    if os.path.exists(chemin_journal):
+        with open(chemin_journal, mode="r", encoding="utf-8") as fichier:
+            for ligne in csv.DictReader(fichier):
+                statuts[int(ligne["commande_id"])] = ligne["statut"]
+    return statuts
+
+
+def statuts_du_csv():
+    with open(commandes.FICHIER_COMMANDES, mode="r", encoding="utf-8") as fichier:
+        return {int(ligne["id"]): ligne["statut"] for ligne in csv.DictReader(fichier)}
+
+
+def statuts_charges():
+    return {commande["id"]: commande["statut"] for commande in commandes.charger_commandes()}
+
+
+with donnees_temporaires():
+    ecrire_csv_atomique(commandes.FICHIER_COMMANDES, commandes.COLONNES_COMMANDES, [
+        {"id": i, "username": f"client{i % 7}", "date": f"2026-01-{i % 28 + 1:02d}T10:00:00",
+         "statut": "en_attente", "total": 10.0 * i}
+        for i in range(1, 201)
+    ])
+
+    print("=== Test : journal avant compaction ===")
+    aleatoire = random.Random(4)
+    attendu = statuts_du_csv()
+    compactions = 0
+    taille_precedente = 0
+    for numero in range(5000):
+        if numero % 500 == 0:
+            # Le journal relu par charger_commandes() équivaut au rejeu ligne à ligne
+            assert statuts_charges() == rejouer_journal(statuts_du_csv(),
+                                                        commandes.FICHIER_STATUTS_COMMANDES)
+
+        id_commande, statut = aleatoire.randint(1, 200), aleatoire.choice(STATUTS)
+        commandes.changer_statut_commande(id_commande, statut)
+        attendu[id_commande] = statut
+
+        taille = os.path.getsize(commandes.FICHIER_STATUTS_COMMANDES) \
+            if os.path.exists(commandes.FICHIER_STATUTS_COMMANDES) else 0
+        assert taille <= commandes.TAILLE_MAX_JOURNAL_STATUTS
+        if taille < taille_precedente:
+            compactions += 1
+        taille_precedente = taille
+
+    print(f"Compactions : {compactions}")
+    # 5000 changements dépassent plusieurs fois le seuil de 64 Ko
+    assert compactions >= 2
+
+    print("=== Test : statuts après compaction ===")
+    assert statuts_charges() == attendu
+    assert rejouer_journal(statuts_du_csv(), commandes.FICHIER_STATUTS_COMMANDES) == attendu
+
+    print("=== Test : compaction explicite ===")
+    commandes.compacter_journal_statuts()
+    assert not os.path.exists(commandes.FICHIER_STATUTS_COMMANDES)
+    assert statuts_du_csv() == attendu
+    assert statuts_charges() == attendu
+    # Les autres colonnes ne sont pas touchées par le repli
+    assert [c["total"] for c in commandes.charger_commandes()] == [10.0 * i for i in range(1, 201)]
+
+print("Journal des statuts OK")
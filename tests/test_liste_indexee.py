@@ -0,0 +1,81 @@
+from modules.index import ListeIndexee
+
+
+def verifier_index(liste):
+    """L'index doit correspondre exactement au premier enregistrement de chaque clé."""
+    attendu = {}
+    for element in liste:
+        attendu.setdefault(element["id"], element)
+    assert liste._index == attendu, (liste._index, attendu)
+    for valeur, element in attendu.items():
+        assert liste.obtenir(valeur) is element
+        assert liste.contient_cle(valeur)
+
+
+def produit(id_produit, nom=None):
+    return {"id": id_produit, "nom": nom or f"Produit {id_produit}"}
+
+
+print("=== Test : construction ===")
+produits = ListeIndexee((produit(i) for i in range(1, 6)), cle="id")
+verifier_index(produits)
+assert produits.obtenir(42) is None and not produits.contient_cle(42)
+assert produits == [produit(i) for i in range(1, 6)]
+
+print("=== Test : ajouts ===")
+produits.append(produit(6))
+produits.extend(produit(i) for i in (7, 8))
+produits += [produit(9)]
+produits.insert(0, produit(0))
+verifier_index(produits)
+assert [p["id"] for p in produits] == list(range(10))
+
+print("=== Test : suppressions ===")
+produits.remove(produits.obtenir(3))
+assert produits.pop()["id"] == 9
+assert produits.pop(0)["id"] == 0
+del produits[0]
+verifier_index(produits)
+assert [p["id"] for p in produits] == [2, 4, 5, 6, 7, 8]
+assert produits.obtenir(3) is None and produits.obtenir(1) is None
+
+print("=== Test : affectations ===")
+produits[0] = produit(20)
+verifier_index(produits)
+assert produits.obtenir(2) is None and produits.obtenir(20)["nom"] == "Produit 20"
+
+print("=== Test : tranches ===")
+produits[1:3] = [produit(30), produit(31), produit(32)]
+verifier_index(produits)
+assert [p["id"] for p in produits] == [20, 30, 31, 32, 6, 7, 8]
+del produits[::2]
+verifier_index(produits)
+assert [p["id"] for p in produits] == [30, 32, 7]
+assert produits.obtenir(20) is None and produits.obtenir(8) is None
+# Une tranche lue est une liste ordinaire, sans effet sur l'index
+assert produits[:2] == [produit(30), produit(32)]
+
+print("=== Test : doublons de clé ===")
+premier, second = produit(50, "premier"), produit(50, "second")
+produits.extend([premier, second])
+assert produits.obtenir(50) is premier
+produits.remove(premier)
+# Le doublon restant reprend la place dans l'index
+assert produits.obtenir(50) is second
+verifier_index(produits)
+produits.pop()
+assert not produits.contient_cle(50)
+verifier_index(produits)
+
+print("=== Test : clé modifiée sur place puis reindexer() ===")
+produits[0]["id"] = 99
+produits.reindexer()
+verifier_index(produits)
+assert produits.obtenir(99) is produits[0] and produits.obtenir(30) is None
+
+print("=== Test : vidage ===")
+produits.clear()
+verifier_index(produits)
+assert len(produits) == 0 and produits.obtenir(99) is None
+
+print("ListeIndexee OK")
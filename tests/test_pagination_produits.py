@@ -0,0 +1,103 @@
+import random
+
+from modules import produits
+from modules.fichiers import ecrire_csv_atomique
+from modules.produits import (TRIS_PRODUITS, ajouter_produit, charger_produits,
+                              page_produits, supprimer_produit)
+from tests.outils import donnees_temporaires
+
+NOMS = ["Écran", "clavier", "Souris", "câble", "Casque", "écouteurs", "Tapis", "Webcam"]
+
+
+def parcourir(tri, limite, entre_pages=None, **filtres):
+    """Suit les curseurs jusqu'à la dernière page ; entre_pages(numéro) est appelé entre deux pages."""
+    vus, apres, numero = [], None, 0
+    while True:
+        page, apres = page_produits(tri, apres=apres, limite=limite, **filtres)
+        assert len(page) <= limite
+        vus.extend(page)
+        if apres is None:
+            return vus
+        # Le curseur est la clé de tri du dernier produit de la page
+        assert apres == TRIS_PRODUITS[tri](page[-1])
+        if entre_pages:
+            entre_pages(numero)
+        numero += 1
+
+
+def ids(liste):
+    return [p["id"] for p in liste]
+
+
+with donnees_temporaires():
+    aleatoire = random.Random(12)
+    ecrire_csv_atomique(produits.FICHIER_PRODUITS, produits.COLONNES_PRODUITS, [
+        {"id": i, "nom": f"{aleatoire.choice(NOMS)} {i}", "description": "",
+         # Prix en double pour vérifier le départage des égalités par id
+         "prix": aleatoire.randint(1, 20) * 5.0, "quantite": aleatoire.randint(0, 3)}
+        for i in range(1, 201)
+    ])
+    catalogue = charger_produits()
+
+    print("=== Test : chaque produit exactement une fois, dans l'ordre du tri ===")
+    for tri, cle in TRIS_PRODUITS.items():
+        for limite in (1, 7, 50, 500):
+            vus = parcourir(tri, limite)
+            assert ids(vus) == ids(sorted(catalogue, key=cle)), (tri, limite)
+
+    print("=== Test : filtres ===")
+    filtres = {"prix_min": 20.0, "prix_max": 60.0, "en_stock": True, "prefixe": "ec"}
+    attendus = [p for p in catalogue if 20.0 <= p["prix"] <= 60.0 and p["quantite"] > 0
+                and p["nom"].lower().replace("é", "e").startswith("ec")]
+    assert attendus
+    for tri, cle in TRIS_PRODUITS.items():
+        assert ids(parcourir(tri, 3, **filtres)) == ids(sorted(attendus, key=cle)), tri
+    assert produits.compter_produits(**filtres) == len(attendus)
+
+    print("=== Test : comptage gardé jusqu'au changement du catalogue ===")
+    assert produits.compter_produits(**filtres) == len(attendus)
+    assert produits.compter_produits() == len(catalogue)
+    nouveau = ajouter_produit(charger_produits(), "Écran ajouté", "", 40.0, 2)
+    assert produits.compter_produits(**filtres) == len(attendus) + 1
+    assert produits.compter_produits() == len(catalogue) + 1
+    supprimer_produit(charger_produits(), nouveau["id"])
+    assert produits.compter_produits(**filtres) == len(attendus)
+
+    print("=== Test : produits par ids ===")
+    assert ids(produits.produits_par_ids([5, 3, 3, 10 ** 6])) == [3, 5]
+    assert produits.produits_par_ids([]) == []
+
+    print("=== Test : ajouts et suppressions entre deux pages ===")
+    for tri, cle in TRIS_PRODUITS.items():
+        depart = charger_produits()
+        supprimes, ajoutes = set(), set()
+
+        def modifier(_numero):
+            actuels = charger_produits()
+            victime = aleatoire.choice(actuels)
+            supprimer_produit(actuels, victime["id"])
+            supprimes.add(victime["id"])
+            nouveau = ajouter_produit(actuels, f"{aleatoire.choice(NOMS)} ajout", "",
+                                      aleatoire.randint(1, 20) * 5.0, 1)
+            ajoutes.add(nouveau["id"])
+
+        vus = parcourir(tri, 15, entre_pages=modifier)
+        vus_ids = ids(vus)
+        # Jamais de doublon, et toujours dans l'ordre du tri
+        assert len(vus_ids) == len(set(vus_ids)), tri
+        assert [cle(p) for p in vus] == sorted(cle(p) for p in vus), tri
+        # Les produits présents du début à la fin sont tous vus une fois
+        stables = {p["id"] for p in depart} - supprimes
+        assert stables <= set(vus_ids), tri
+        # Un produit vu est un produit qui existait à un moment du parcours
+        assert set(vus_ids) <= {p["id"] for p in depart} | ajoutes, tri
+
+    print("=== Test : curseur incompatible ===")
+    for tri, apres in (("nom", [12]), ("id", ["texte"])):
+        try:
+            page_produits(tri, apres=apres, limite=5)
+        except ValueError:
+            continue
+        raise AssertionError(f"curseur {apres} accepté pour le tri {tri}")
+
+print("Pagination OK")
@@ -1,25 +1,103 @@
-from modules.password_check import verifier_mot_de_passe_compromis
+import hashlib
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from modules import password_check
+from modules.password_check import (chercher_hash_local,
+                                    verifier_mot_de_passe_compromis)
+
+# Faux service "range" local : aucun appel réseau réel pendant les tests
+COMPROMIS = {"password": 9659365, "123456": 37359195}
+
+
+def sha1(mot_de_passe):
+    return hashlib.sha1(mot_de_passe.encode()).hexdigest().upper()  # nosec
+
+
+class FauxServiceRange(BaseHTTPRequestHandler):
+    requetes = []
+
+    def do_GET(self):
+        prefixe = self.path.rsplit("/", 1)[-1]
+        FauxServiceRange.requetes.append(prefixe)
+        lignes = [f"{sha1(mdp)[5:]}:{count}" for mdp, count in COMPROMIS.items()
+                  if sha1(mdp).startswith(prefixe)]
+        lignes.append("0" * 35 + ":0")  # ligne de remplissage (Add-Padding)
+        corps = "\r\n".join(lignes).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def log_message(self, *args):
+        pass
+
+
+serveur = ThreadingHTTPServer(("127.0.0.1", 0), FauxServiceRange)
+threading.Thread(target=serveur.serve_forever, daemon=True).start()
+password_check.URL_API_PWNED = f"http://127.0.0.1:{serveur.server_port}/range/"
+password_check.FICHIER_HASHES_LOCAL = None
+password_check.vider_cache_plages()
 
 # Test avec un mot de passe très courant (compromis)
 print("=== Test : 'password' ===")
 compromis, count = verifier_mot_de_passe_compromis("password")
-if compromis:
-    print(f"COMPROMIS ! Trouvé {count} fois dans des fuites.")
-else:
-    print("Non compromis.")
+print(f"COMPROMIS ! Trouvé {count} fois dans des fuites." if compromis else "Non compromis.")
+assert (compromis, count) == (True, 9659365)
+# Le préfixe demandé est bien le vrai préfixe du hash
+assert FauxServiceRange.requetes == [sha1("password")[:5]]
+
+# Deuxième vérification : la plage vient du cache
+print("\n=== Test : 'password' (cache) ===")
+compromis, count = verifier_mot_de_passe_compromis("password")
+print(f"Requêtes envoyées : {len(FauxServiceRange.requetes)}")
+assert compromis and len(FauxServiceRange.requetes) == 1
 
 # Test avec '123456'
 print("\n=== Test : '123456' ===")
 compromis, count = verifier_mot_de_passe_compromis("123456")
-if compromis:
-    print(f"COMPROMIS ! Trouvé {count} fois dans des fuites.")
-else:
-    print("Non compromis.")
+print(f"COMPROMIS ! Trouvé {count} fois dans des fuites." if compromis else "Non compromis.")
+assert (compromis, count) == (True, 37359195)
 
 # Test avec un mot de passe unique
 print("\n=== Test : 'Xk9$mP2@qL7nB4vR' ===")
 compromis, count = verifier_mot_de_passe_compromis("Xk9$mP2@qL7nB4vR")
-if compromis:
-    print(f"COMPROMIS ! Trouvé {count} fois.")
-else:
-    print("Non compromis - Ce mot de passe est sûr.")
+print("COMPROMIS !" if compromis else "Non compromis - Ce mot de passe est sûr.")
+assert (compromis, count) == (False, 0)
+
+# Éviction LRU : le cache ne garde que les plages les plus récentes
+print("\n=== Test : éviction du cache ===")
+password_check.TAILLE_MAX_CACHE_PLAGES = 2
+verifier_mot_de_passe_compromis("autre-mot-de-passe")
+nombre = len(FauxServiceRange.requetes)
+verifier_mot_de_passe_compromis("password")
+print(f"Plages en cache : {len(password_check._cache_plages)}")
+assert len(password_check._cache_plages) == 2
+assert len(FauxServiceRange.requetes) == nombre + 1
+
+# Service injoignable : résultat indéterminé, rien n'est mis en cache
+print("\n=== Test : service injoignable ===")
+serveur.shutdown()
+serveur.server_close()
+password_check.vider_cache_plages()
+compromis, message = verifier_mot_de_passe_compromis("password")
+print(message)
+assert compromis is None and not password_check._cache_plages
+
+# Mode hors ligne : fichier local trié, recherche dichotomique
+print("\n=== Test : fichier local ===")
+hashes = sorted([f"{sha1(mdp)}:{count}" for mdp, count in COMPROMIS.items()]
+                + [f"{sha1(str(i))}:{i + 1}" for i in range(1000)])
+with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as fichier:
+    fichier.write("\r\n".join(hashes) + "\r\n")
+try:
+    password_check.FICHIER_HASHES_LOCAL = fichier.name
+    assert verifier_mot_de_passe_compromis("password") == (True, 9659365)
+    assert verifier_mot_de_passe_compromis("Xk9$mP2@qL7nB4vR") == (False, 0)
+    assert all(chercher_hash_local(fichier.name, sha1(str(i))) == i + 1 for i in range(1000))
+    print("Recherche locale OK")
+finally:
+    password_check.FICHIER_HASHES_LOCAL = None
+    os.remove(fichier.name)
@@ -0,0 +1,99 @@
+import os
+import random
+
+from modules import config
+from modules.stockage_lignes import (ENREGISTREMENT, ENTREE_INDEX, TAILLE_EN_TETE,
+                                     ajouter_lignes, charger_lignes,
+                                     charger_lignes_commande,
+                                     charger_lignes_par_commande, chemin_index,
+                                     sauvegarder_lignes)
+from tests.outils import donnees_temporaires
+
+
+def ligne(aleatoire, id_ligne, commande_id):
+    quantite = aleatoire.randint(1, 5)
+    prix = aleatoire.randint(100, 9999) / 100
+    return {"id": id_ligne, "commande_id": commande_id, "produit_id": aleatoire.randint(1, 30),
+            "quantite": quantite, "prix_unitaire": prix, "total": prix * quantite}
+
+
+def verifier(attendues):
+    """Les lectures (par commande, groupées, complètes) valent celles d'un parcours naïf."""
+    assert charger_lignes() == attendues
+    par_commande = {}
+    for attendue in attendues:
+        par_commande.setdefault(attendue["commande_id"], []).append(attendue)
+    for commande_id in range(0, max(par_commande, default=0) + 2):
+        assert charger_lignes_commande(commande_id) == par_commande.get(commande_id, []), commande_id
+    assert charger_lignes_par_commande() == par_commande
+    choisies = list(par_commande)[::3] + [-1]
+    assert charger_lignes_par_commande(choisies) == \
+        {commande_id: par_commande[commande_id] for commande_id in choisies if commande_id in par_commande}
+
+
+def lire_index():
+    with open(chemin_index(), mode="rb") as fichier:
+        return fichier.read()
+
+
+with donnees_temporaires(STOCKAGE_LIGNES="binaire"):
+    aleatoire = random.Random(23)
+    # Commandes dans le désordre : l'index doit les trier
+    lignes = [ligne(aleatoire, i, aleatoire.randint(1, 80)) for i in range(1, 501)]
+    sauvegarder_lignes(lignes)
+    index_complet = lire_index()
+    verifier(lignes)
+
+    print("=== Test : index absent ===")
+    os.remove(chemin_index())
+    verifier(lignes)
+    assert lire_index() == index_complet
+
+    print("=== Test : index tronqué ===")
+    for taille in (len(index_complet) - ENTREE_INDEX.size,  # entrées manquantes
+                   len(index_complet) - 5,                   # entrée coupée
+                   TAILLE_EN_TETE,                           # en-tête seul
+                   3):                                       # en-tête coupé
+        with open(chemin_index(), mode="r+b") as fichier:
+            fichier.truncate(taille)
+        verifier(lignes)
+        assert lire_index() == index_complet, taille
+
+    print("=== Test : index d'un autre format ===")
+    with open(chemin_index(), mode="r+b") as fichier:
+        fichier.write(b"XXXXXXXX")
+    verifier(lignes)
+    assert lire_index() == index_complet
+
+    print("=== Test : ajouts après un index tronqué ===")
+    for taille in (TAILLE_EN_TETE, 3, len(index_complet) - 5):
+        with open(chemin_index(), mode="r+b") as fichier:
+            fichier.truncate(taille)
+        id_ligne = lignes[-1]["id"] + 1
+        ajout = [ligne(aleatoire, id_ligne, aleatoire.randint(1, 90))]
+        ajouter_lignes(ajout)
+        lignes += ajout
+        verifier(lignes)
+        index_complet = lire_index()
+        assert len(index_complet) == TAILLE_EN_TETE + len(lignes) * ENTREE_INDEX.size, taille
+
+    print("=== Test : ajouts après un index perdu ===")
+    os.remove(chemin_index())
+    nouvelles = [ligne(aleatoire, 500 + i, aleatoire.randint(1, 90)) for i in range(1, 41)]
+    ajouter_lignes(nouvelles[:20])
+    ajouter_lignes(nouvelles[20:])
+    lignes += nouvelles
+    verifier(lignes)
+    index_complet = lire_index()
+    os.remove(chemin_index())
+    verifier(lignes)
+    assert lire_index() == index_complet
+
+    print("=== Test : enregistrement incomplet en fin de données ===")
+    with open(config.FICHIER_LIGNES_BINAIRES, mode="ab") as fichier:
+        fichier.write(ENREGISTREMENT.pack(999, 1, 1, 1, 1.0, 1.0)[:17])
+    os.remove(chemin_index())
+    verifier(lignes)
+    assert lire_index() == index_complet
+
+print("Stockage des lignes OK")